@@ -1,6 +1,10 @@
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
 def get_openai():
     key = os.getenv("OPENAI_API_KEY")
     return OpenAI(api_key=key) if key else None
+
+def get_async_openai():
+    key = os.getenv("OPENAI_API_KEY")
+    return AsyncOpenAI(api_key=key) if key else None
@@ -17,3 +17,24 @@
 #     # result = client.chat.completions.create(model='gpt-4o-mini', messages=[{"role":"user","content":prompt}])
 #     # return JsonResponse({ 'text': result.choices[0].message['content'] })
 #     return JsonResponse({ 'ok': True })
+#
+# Async variant for ASGI (see settings.ASYNC_VIEWS): the slow model call
+# awaits instead of holding a worker thread.
+#
+# from core.fastjson import FastJsonResponse, JsonBodyError, read_json
+# from .services import get_async_openai
+#
+# @login_required
+# @require_POST
+# async def generate_example_async(request):
+#     client = get_async_openai()
+#     if client is None:
+#         return FastJsonResponse({ 'error': 'OPENAI_API_KEY not configured' }, status=400)
+#     try:
+#         data = read_json(request)
+#     except JsonBodyError as e:
+#         return e.response()
+#     prompt = data.get('prompt', 'Hello')
+#     # result = await client.chat.completions.create(model='gpt-4o-mini', messages=[{"role":"user","content":prompt}])
+#     # return FastJsonResponse({ 'text': result.choices[0].message.content })
+#     return FastJsonResponse({ 'ok': True })
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+"""
+Offline benchmark harness for the JSON API and page views.
+
+Seeds a throwaway SQLite database with users owning 10 / 1k / 100k projects
+and measures throughput plus p50/p99 latency through the full middleware
+stack using Django's test client. Results are written as JSON so runs from
+different commits can be compared with --compare.
+
+    cd backend
+    python benchmarks/run_benchmarks.py --sizes 10,1000 --output bench.json
+    python benchmarks/run_benchmarks.py --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Sizes (bytes of JSON) cycled through when generating Project.data
+DATA_PROFILES = {
+    'small': (64,),
+    'mixed': (64, 512, 4096),
+    'large': (4096, 65536),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,1000,100000', help='comma-separated project counts per user')
+    parser.add_argument('--data-profile', default='mixed', choices=sorted(DATA_PROFILES))
+    parser.add_argument('--iterations', type=int, default=50, help='max requests per scenario')
+    parser.add_argument('--time-budget', type=float, default=10.0, help='max seconds per scenario')
+    parser.add_argument('--burst', type=int, default=25, help='preferences POSTs per burst')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='previous results file to diff against')
+    return parser.parse_args(argv)
+
+
+def setup_django(db_path: Path) -> None:
+    sys.path.insert(0, str(BACKEND_DIR))
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['DEBUG'] = '0'
+    os.environ['ALLOWED_HOSTS'] = 'testserver'
+    # Measure the views, not the admission limits
+    os.environ['RATE_LIMIT_READ'] = os.environ['RATE_LIMIT_WRITE'] = '0'
+    os.environ['MAX_IN_FLIGHT'] = '0'
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+    from django.core.management import call_command
+    call_command('migrate', verbosity=0)
+
+
+def make_data(rng: random.Random, size: int) -> dict:
+    """A JSON object of roughly ``size`` bytes with a realistic mix of types."""
+    data = {'status': rng.choice(['active', 'draft', 'archived']), 'tags': rng.sample(['a', 'b', 'c', 'd', 'e'], 2)}
+    items = []
+    while len(json.dumps(data)) + len(json.dumps(items)) < size:
+        items.append({'id': rng.randrange(1 << 30), 'label': f'item-{rng.randrange(10**6)}', 'value': rng.random()})
+    data['items'] = items
+    return data
+
+
+def seed_user(username: str, count: int, profile: str, rng: random.Random):
+    from django.contrib.auth.models import User
+    from projects import search
+    from projects.models import Project
+
+    user = User.objects.create_user(username, password='bench')
+    sizes = DATA_PROFILES[profile]
+    templates = [make_data(rng, s) for s in sizes]
+    batch = []
+    for i in range(count):
+        project = Project(
+            user=user,
+            title=f'Project {i}',
+            description=f'Benchmark project {i} of {count}',
+            data=templates[i % len(templates)],
+        )
+        # bulk_create bypasses save(), which maintains the summary columns
+        project.update_summary()
+        batch.append(project)
+        if len(batch) >= 2000:
+            Project.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        Project.objects.bulk_create(batch)
+    # bulk_create skips the save signals that keep the search index in sync
+    search.rebuild()
+    return user
+
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def measure(name, request_fn, iterations, time_budget):
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    while len(latencies) < iterations:
+        t0 = time.perf_counter()
+        response = request_fn()
+        latencies.append(time.perf_counter() - t0)
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        if len(latencies) >= 3 and time.perf_counter() - started > time_budget:
+            break
+    elapsed = time.perf_counter() - started
+    return {
+        'scenario': name,
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'max_ms': max(latencies) * 1000,
+        'statuses': statuses,
+    }
+
+
+def run_scenarios(user, args, rng: random.Random):
+    from django.test import Client
+    from projects.models import Project
+
+    client = Client()
+    client.force_login(user)
+    pks = list(Project.objects.filter(user=user).values_list('pk', flat=True))
+    update = json.dumps({'data': make_data(rng, DATA_PROFILES[args.data_profile][-1])})
+
+    def burst():
+        response = None
+        for i in range(args.burst):
+            response = client.post('/api/preferences/', json.dumps({'theme': 'dark' if i % 2 else 'light'}),
+                                   content_type='application/json')
+        return response
+
+    scenarios = [
+        ('project_list_api GET', lambda: client.get('/api/projects/')),
+        ('project_detail_api GET', lambda: client.get(f'/api/projects/{rng.choice(pks)}/')),
+        ('project_detail_api PUT', lambda: client.put(f'/api/projects/{rng.choice(pks)}/', update,
+                                                      content_type='application/json')),
+        ('project_search_api GET', lambda: client.get('/api/projects/search/', {'q': f'project {rng.randrange(1000)}'})),
+        (f'preferences_view POST x{args.burst}', burst),
+        ('project_list HTML GET', lambda: client.get('/projects/')),
+    ]
+    for name, fn in scenarios:
+        yield measure(name, fn, args.iterations, args.time_budget)
+
+
+def environment_info() -> dict:
+    import django
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+    }
+
+
+def compare(current: dict, previous: dict, previous_path: str) -> None:
+    before = {(r['projects'], r['scenario']): r for r in previous['results']}
+    print(f"\nvs {previous_path} ({previous['meta'].get('commit')})")
+    for row in current['results']:
+        old = before.get((row['projects'], row['scenario']))
+        if not old:
+            continue
+        delta = (row['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0.0
+        print(f"{row['projects']:>7} {row['scenario']:<32} p50 {old['p50_ms']:9.2f} -> {row['p50_ms']:9.2f} ms ({delta:+.1f}%)")
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    rng = random.Random(args.seed)
+    previous = json.loads(Path(args.compare).read_text()) if args.compare else None
+    with tempfile.TemporaryDirectory(prefix='bench-') as tmp:
+        setup_django(Path(tmp) / 'bench.sqlite3')
+        results = []
+        for count in sizes:
+            t0 = time.perf_counter()
+            user = seed_user(f'bench{count}', count, args.data_profile, rng)
+            print(f'seeded {count} projects in {time.perf_counter() - t0:.1f}s')
+            for row in run_scenarios(user, args, rng):
+                row.update(projects=count, data_profile=args.data_profile)
+                results.append(row)
+                print(f"{count:>7} {row['scenario']:<32} {row['rps']:9.1f} req/s  "
+                      f"p50 {row['p50_ms']:9.2f} ms  p99 {row['p99_ms']:9.2f} ms")
+        report = {'meta': {**environment_info(), 'args': vars(args)}, 'results': results}
+        from django.db import connections
+        connections.close_all()
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f'wrote {args.output}')
+    if previous is not None:
+        compare(report, previous, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,9 @@
+import os
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
+application = get_asgi_application()
+
+from core import maintenance  # noqa: E402
+maintenance.start_scheduler()
@@ -1,5 +1,8 @@
+import importlib.util
 import os
 from pathlib import Path
+from urllib.parse import urlsplit
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=Path(__file__).resolve().parent.parent / '.env')
@@ -15,6 +18,8 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # Before staticfiles, whose runserver command core's extends
+    'core',
     'django.contrib.staticfiles',
     'rest_framework',
     'corsheaders',
@@ -23,15 +28,25 @@ INSTALLED_APPS = [
     'projects',
 ]
 
+# Route the JSON API to its async views; config.asgi turns this on by default
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', '0') == '1'
+
 MIDDLEWARE = [
+    'core.metrics.MetricsMiddleware',
+    'core.compression.CompressionMiddleware',
+    'core.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.caching.CachedAuthenticationMiddleware',
+    'core.caching.SessionRefreshMiddleware',
+    'core.ratelimit.AdmissionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Keep last: it calls the view itself for profiled requests
+    'core.profiling.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -53,6 +68,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
+ASGI_APPLICATION = 'config.asgi.application'
 
 DATABASE_URL = os.getenv('DATABASE_URL')
 if DATABASE_URL and DATABASE_URL.startswith('sqlite:///'):
@@ -71,6 +87,56 @@ else:
         }
     }
 
+# Optional per-user sharding of project/preference rows over DB_SHARDS SQLite
+# files (see core.sharding); auth and sessions stay in 'default'
+DB_SHARDS = int(os.getenv('DB_SHARDS', '0'))
+DB_SHARD_DIR = Path(os.getenv('DB_SHARD_DIR') or BASE_DIR)
+for n in range(DB_SHARDS):
+    DATABASES[f'shard{n}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': DB_SHARD_DIR / f'db_shard{n}.sqlite3',
+    }
+
+# Optional read replicas of 'default': comma-separated DATABASE_URL-style
+# values, one per replica (see core.replicas)
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for n, url in enumerate(DATABASE_REPLICA_URLS):
+    if not url.startswith('sqlite:///'):
+        raise ImproperlyConfigured(f'DATABASE_REPLICA_URLS: unsupported database URL {url!r}')
+    DATABASES[f'replica{n}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / url.replace('sqlite:///', ''),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Cache shared by all workers (see core.caching): locmem:// (per process, the
+# default), file:///path/to/dir, sqlite:///cache.sqlite3 or redis://host:6379/0
+CACHE_URL = os.getenv('CACHE_URL', 'locmem://')
+_cache_url = urlsplit(CACHE_URL)
+if _cache_url.scheme == 'locmem':
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+elif _cache_url.scheme == 'file':
+    CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / (_cache_url.netloc + _cache_url.path),
+    }}
+elif _cache_url.scheme == 'sqlite':
+    # Its own file, so cache writes never wait on the main database's lock
+    DATABASES['cache'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / CACHE_URL.replace('sqlite:///', ''),
+    }
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'django_cache'}}
+elif _cache_url.scheme in ('redis', 'rediss'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+else:
+    raise ImproperlyConfigured(f'CACHE_URL: unsupported cache URL {CACHE_URL!r}')
+CACHE_SHARED = _cache_url.scheme != 'locmem'
+
+DATABASE_ROUTERS = (['core.caching.CacheRouter'] if 'cache' in DATABASES else []) + (
+    ['core.sharding.ShardRouter'] if DB_SHARDS else []) + (
+    ['core.replicas.ReplicaRouter'] if DATABASE_REPLICA_URLS else [])
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -80,10 +146,17 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Project attachments and in-progress uploads (see projects.attachments)
+MEDIA_ROOT = Path(os.getenv('MEDIA_ROOT') or BASE_DIR / 'media')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 30
-SESSION_SAVE_EVERY_REQUEST = True
+# Sliding expiry without a session write per request: core.caching's
+# SessionRefreshMiddleware re-saves a session at most every SESSION_REFRESH_INTERVAL
+SESSION_SAVE_EVERY_REQUEST = False
+# Sessions are read from the shared cache, falling back to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db' if CACHE_SHARED else 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_HTTPONLY = True
 
 # Auth redirects
@@ -111,5 +184,20 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
-    ]
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.drf.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.drf.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+
+# MessagePack / CBOR are negotiated only when their packages are installed
+for _module, _name in (('msgpack', 'MessagePack'), ('cbor2', 'CBOR')):
+    if importlib.util.find_spec(_module):
+        REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(-1, f'core.drf.{_name}Renderer')
+        REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(-2, f'core.drf.{_name}Parser')
@@ -3,3 +3,6 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 application = get_wsgi_application()
+
+from core import maintenance  # noqa: E402
+maintenance.start_scheduler()
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import profile_detail_view, profile_download_view, profile_list_view
+
+app_name = 'core_admin'
+
+urlpatterns = [
+    path('profiles/', profile_list_view, name='profiles'),
+    path('profiles/<str:name>/', profile_detail_view, name='profile_detail'),
+    path('profiles/<str:name>/download/', profile_download_view, name='profile_download'),
+]
@@ -0,0 +1,163 @@
+"""
+Building blocks for admin changelists over large tables.
+
+``ModelAdmin`` normally runs ``COUNT(*)`` twice per page (filtered and total)
+and ``SELECT DISTINCT`` over the date-hierarchy column; on millions of rows
+those dominate the page. ``LargeTableAdmin`` swaps them for planner-statistic
+estimates, bounded counts and MIN/MAX lookups that an index answers directly.
+"""
+import os
+from datetime import datetime
+
+from django.contrib import admin
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import DatabaseError, connections, models
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from . import sharding
+
+# Exact counts stop here; larger results report this many rows
+COUNT_LIMIT = int(os.getenv('ADMIN_COUNT_LIMIT', '10000'))
+
+
+def estimated_count(model, using: str = 'default') -> int | None:
+    """Row count from the planner statistics, or None when there are none.
+
+    SQLite keeps them in ``sqlite_stat1`` (refreshed by ANALYZE / ``PRAGMA
+    optimize``, see ``core.maintenance``); PostgreSQL in ``pg_class``.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+                counts = [int(row[0].split()[0]) for row in cursor.fetchall() if row[0]]
+                return max(counts) if counts else None
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+                row = cursor.fetchone()
+                return row[0] if row and row[0] >= 0 else None
+    except DatabaseError:  # no statistics table yet
+        return None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator whose ``count`` never scans a large table.
+
+    Unfiltered querysets use the planner's estimate once it passes
+    COUNT_LIMIT; anything else is counted exactly up to COUNT_LIMIT rows.
+    """
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if not isinstance(qs, models.QuerySet):
+            return super().count
+        if not qs.query.where:
+            estimate = estimated_count(qs.model, qs.db)
+            if estimate is not None and estimate > COUNT_LIMIT:
+                return estimate
+        return qs.order_by()[:COUNT_LIMIT].count()
+
+
+class IndexedDateQuerySet(models.QuerySet):
+    """QuerySet whose year/month ``datetimes()`` come from MIN/MAX, not DISTINCT.
+
+    The date hierarchy lists every year (or month of a year) between the
+    oldest and newest row instead of only the ones that have rows, which
+    turns a full scan into two index lookups.
+    """
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        bounds = self.aggregate(first=models.Min(field_name), last=models.Max(field_name))
+        if bounds['first'] is None:
+            return []
+        first, last = (timezone.localtime(v, tzinfo) if timezone.is_aware(v) else v for v in bounds.values())
+        step = 12 if kind == 'year' else 1
+        start, end = first.year * 12 + (first.month - 1), last.year * 12 + (last.month - 1)
+        if kind == 'year':
+            start -= start % 12
+        points = [
+            datetime(m // 12, m % 12 + 1, 1, tzinfo=first.tzinfo)
+            for m in range(start, end + 1, step)
+        ]
+        return points[::-1] if order == 'DESC' else points
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """Picks the shard a changelist reads from (the first one by default)."""
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in sharding.SHARD_ALIASES]
+
+    def value(self):
+        value = super().value()
+        return value if value in sharding.SHARD_ALIASES else sharding.SHARD_ALIASES[0]
+
+    def choices(self, changelist):
+        for lookup, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == lookup,
+                'query_string': changelist.get_query_string({self.parameter_name: lookup}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        return queryset.using(self.value())
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin defaults for tables too large to count or scan per request."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+    def _sharded(self) -> bool:
+        return sharding.enabled() and sharding.is_sharded(self.model)
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if self.date_hierarchy:
+            qs = IndexedDateQuerySet(model=qs.model, query=qs.query.chain(), using=qs._db, hints=qs._hints)
+        if self._sharded() and isinstance(self.list_select_related, (list, tuple)):
+            # Users live in another database; fetch them in one extra query
+            qs = qs.prefetch_related(*self.list_select_related)
+        return qs
+
+    def get_list_select_related(self, request):
+        return () if self._sharded() else super().get_list_select_related(request)
+
+    def get_list_filter(self, request):
+        list_filter = super().get_list_filter(request)
+        return (ShardListFilter, *list_filter) if self._sharded() else list_filter
+
+    def get_object(self, request, object_id, from_field=None):
+        if not self._sharded():
+            return super().get_object(request, object_id, from_field)
+        # Ids are unique across shards (see sharding.ID_BLOCK); look in each
+        queryset = self.get_queryset(request)
+        field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except (ValidationError, ValueError):
+            return None
+        for alias in sharding.SHARD_ALIASES:
+            obj = queryset.using(alias).filter(**{field.name: object_id}).first()
+            if obj is not None:
+                return obj
+        return None
+
+    def get_deleted_objects(self, objs, request):
+        if not self._sharded() or not objs:
+            return super().get_deleted_objects(objs, request)
+        # The admin collects related rows on the router's hint-less database
+        with sharding.pinned(getattr(objs, 'db', None) or objs[0]._state.db):
+            return super().get_deleted_objects(objs, request)
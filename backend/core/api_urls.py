@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.urls import path
+from .views import async_events_view, events_view, liveness_view, metrics_view, readiness_view
+
+urlpatterns = [
+    path('health/', liveness_view, name='health'),
+    path('health/live/', liveness_view, name='health_live'),
+    path('health/ready/', readiness_view, name='health_ready'),
+    path('metrics/', metrics_view, name='metrics'),
+    path('events/', async_events_view if settings.ASYNC_VIEWS else events_view, name='events'),
+]
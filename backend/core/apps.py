@@ -0,0 +1,21 @@
+from django.apps import AppConfig
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_migrate
+
+from . import maintenance, metrics, sharding
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        # Imports auth models, so not before the app registry is ready
+        from . import caching
+
+        metrics.registry.mark_started()
+        pre_migrate.connect(maintenance.prepare_database)
+        post_migrate.connect(sharding.seed_sequences)
+        post_migrate.connect(caching.create_cache_table)
+        post_save.connect(caching.forget_user, sender=settings.AUTH_USER_MODEL)
+        post_delete.connect(caching.forget_user, sender=settings.AUTH_USER_MODEL)
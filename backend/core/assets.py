@@ -0,0 +1,70 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+
+STATIC_DIR = Path(settings.BASE_DIR) / 'static'
+NPM_DIR = STATIC_DIR / 'js'
+COMPILED_CSS = STATIC_DIR / 'css' / 'compiled.css'
+MANIFEST = STATIC_DIR / 'css' / 'manifest.json'
+BUNDLE_NAME = 'css/app.css'
+
+_manifest_cache = (None, {})
+
+
+class AssetBuildError(Exception):
+    pass
+
+
+def _npm() -> str:
+    exe = shutil.which('npm.cmd' if os.name == 'nt' else 'npm')
+    if exe is None:
+        raise AssetBuildError('npm not found on PATH; install Node 20+ to build CSS')
+    return exe
+
+
+def compile_css() -> None:
+    """Run the Tailwind/DaisyUI build, purging against templates/**."""
+    npm = _npm()
+    if not (NPM_DIR / 'node_modules').exists():
+        if subprocess.call([npm, 'ci', '--no-fund', '--no-audit'], cwd=NPM_DIR) != 0:
+            raise AssetBuildError('npm ci failed')
+    if subprocess.call([npm, 'run', 'build', '--silent'], cwd=NPM_DIR) != 0:
+        raise AssetBuildError('npm run build failed')
+
+
+def publish_bundle() -> str:
+    """Copy compiled.css to a content-hashed name and record it in the manifest."""
+    if not COMPILED_CSS.exists():
+        raise AssetBuildError(f'{COMPILED_CSS} does not exist')
+    content = COMPILED_CSS.read_bytes()
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    hashed = f'css/app.{digest}.css'
+    target = STATIC_DIR / hashed
+    if not target.exists():
+        target.write_bytes(content)
+    for old in (STATIC_DIR / 'css').glob('app.*.css'):
+        if old != target:
+            old.unlink()
+    MANIFEST.write_text(json.dumps({BUNDLE_NAME: hashed}, indent=2))
+    return hashed
+
+
+def bundle_path(name: str = BUNDLE_NAME) -> str | None:
+    """Hashed static path for ``name``, or None if no bundle has been built."""
+    global _manifest_cache
+    try:
+        mtime = MANIFEST.stat().st_mtime
+    except OSError:
+        return None
+    if _manifest_cache[0] != mtime:
+        try:
+            _manifest_cache = (mtime, json.loads(MANIFEST.read_text()))
+        except (OSError, ValueError):
+            return None
+    path = _manifest_cache[1].get(name)
+    return path if path and (STATIC_DIR / path).exists() else None
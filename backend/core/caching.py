@@ -0,0 +1,128 @@
+"""
+Cached resolution of ``request.user`` and sessions over the shared cache.
+
+``AuthenticationMiddleware`` loads the logged-in user with one query per
+request. ``CachedAuthenticationMiddleware`` keeps the user in the cache
+configured by CACHE_URL instead. Saving or deleting a user evicts them, and
+the session's auth hash is still checked against the cached user, so a
+password change logs other sessions out as before. Changes that skip
+signals (``QuerySet.update()``) show up within USER_CACHE_TIMEOUT.
+
+With the per-process ``locmem://`` cache, one worker could not evict another
+worker's copy, so users are then loaded from the database as usual.
+
+``SessionRefreshMiddleware`` keeps session expiry sliding while writing a
+session at most once per SESSION_REFRESH_INTERVAL, instead of on every
+request (SESSION_SAVE_EVERY_REQUEST).
+"""
+import os
+import time
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils.crypto import constant_time_compare
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import registry
+
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', '300'))
+SESSION_REFRESH_INTERVAL = int(os.getenv('SESSION_REFRESH_INTERVAL', '3600'))
+CACHE_DB = 'cache'
+_REFRESHED_KEY = '_refreshed_at'
+
+
+def users_cached() -> bool:
+    return USER_CACHE_TIMEOUT > 0 and settings.CACHE_SHARED
+
+
+def _user_key(user_id) -> str:
+    return f'auth:user:{user_id}'
+
+
+def forget_user(sender, instance, **kwargs) -> None:
+    """``post_save``/``post_delete`` hook for the user model."""
+    if users_cached():
+        cache.delete(_user_key(instance.pk))
+
+
+def get_user(request):
+    """``auth.get_user`` served from the cache when it can be."""
+    session = request.session
+    user_id = session.get(auth.SESSION_KEY)
+    if not users_cached() or user_id is None or session.get(auth.BACKEND_SESSION_KEY) not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+    key = _user_key(user_id)
+    user = cache.get(key)
+    registry.record_lookup('user', user is not None)
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            cache.set(key, user, USER_CACHE_TIMEOUT)
+        return user
+    session_hash = session.get(auth.HASH_SESSION_KEY)
+    if not (session_hash and constant_time_compare(session_hash, user.get_session_auth_hash())):
+        # Let auth decide (fallback secrets, flushing the session)
+        return auth.get_user(request)
+    return user
+
+
+def _cached_user(request):
+    if not hasattr(request, '_cached_user'):
+        request._cached_user = get_user(request)
+    return request._cached_user
+
+
+async def _acached_user(request):
+    if not hasattr(request, '_acached_user'):
+        request._acached_user = await sync_to_async(get_user)(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """``AuthenticationMiddleware`` whose user comes from ``get_user`` above."""
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: _cached_user(request))
+        request.auser = partial(_acached_user, request)
+
+
+class SessionRefreshMiddleware(MiddlewareMixin):
+    """Re-saves a non-empty session once SESSION_REFRESH_INTERVAL has passed
+    since it was last saved, which also renews the cookie's expiry."""
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is None or not (session.modified or settings.SESSION_COOKIE_NAME in request.COOKIES):
+            return response
+        now = int(time.time())
+        if now - session.get(_REFRESHED_KEY, 0) >= SESSION_REFRESH_INTERVAL and not session.is_empty():
+            session[_REFRESHED_KEY] = now
+        return response
+
+
+class CacheRouter:
+    """Sends the database cache (CACHE_URL=sqlite:///...) to its own file."""
+
+    def _db_for(self, model, **hints):
+        return CACHE_DB if model._meta.app_label == 'django_cache' else None
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == CACHE_DB:
+            return app_label == 'django_cache'
+        return False if app_label == 'django_cache' else None
+
+
+def create_cache_table(sender, using='default', **kwargs) -> None:
+    """``post_migrate`` hook: create the database cache's table."""
+    if using == 'default' and sender.label == 'sessions' and CACHE_DB in settings.DATABASES:
+        call_command('createcachetable', database=CACHE_DB, verbosity=0)
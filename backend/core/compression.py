@@ -0,0 +1,190 @@
+import os
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import FileResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', '5'))
+ZSTD_LEVEL = int(os.getenv('COMPRESSION_ZSTD_LEVEL', '3'))
+
+# HTML is left alone: pages embed the CSRF token, and compressing secrets next
+# to attacker-influenced text opens BREACH-style attacks.
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/msgpack',
+    'application/cbor',
+    'application/javascript',
+    'text/javascript',
+    'text/css',
+    'text/plain',
+    'text/csv',
+    'image/svg+xml',
+}
+SKIP_TYPES = {'text/event-stream'}
+
+
+class _Gzip:
+    def __init__(self):
+        self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._c.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.process(data)
+
+    def finish(self) -> bytes:
+        return self._c.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._c = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._c.compress(data)
+
+    def finish(self) -> bytes:
+        return self._c.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# Server preference, best first; only installed codecs are offered
+CODECS = {
+    name: codec for name, codec in (
+        ('zstd', _Zstd if zstandard is not None else None),
+        ('br', _Brotli if brotli is not None else None),
+        ('gzip', _Gzip),
+    ) if codec is not None
+}
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick a codec from an Accept-Encoding header (highest q, then our preference)."""
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for name in CODECS:
+        q = weights.get(name, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _compressible(response) -> bool:
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    if content_type in SKIP_TYPES:
+        return False
+    return content_type in COMPRESSIBLE_TYPES or content_type.endswith('+json')
+
+
+def _weaken_etag(response) -> None:
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+
+
+class CompressionMiddleware:
+    """gzip/brotli/zstd response compression for API and static text content.
+
+    Bodies under COMPRESSION_MIN_BYTES are sent as-is; streaming responses
+    are compressed incrementally and emitted whenever the compressor has
+    output, so they are never buffered whole. Event streams, partial content,
+    file downloads (left to sendfile) and already-encoded responses are
+    skipped. brotli and zstd are offered when their packages are installed.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (response.has_header('Content-Encoding') or response.has_header('Content-Range')
+                or response.status_code == 206 or isinstance(response, FileResponse)
+                or not _compressible(response)):
+            return response
+        if not response.streaming and len(response.content) < MIN_BYTES:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        name = negotiate(request.headers.get('Accept-Encoding', ''))
+        if name is None:
+            return response
+        codec = CODECS[name]
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self._compress_async(codec(), response.streaming_content)
+            else:
+                response.streaming_content = self._compress_stream(codec(), response.streaming_content)
+            del response['Content-Length']
+        else:
+            c = codec()
+            compressed = c.compress(response.content) + c.finish()
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+        _weaken_etag(response)
+        response['Content-Encoding'] = name
+        return response
+
+    @staticmethod
+    def _compress_stream(c, chunks):
+        for chunk in chunks:
+            data = c.compress(chunk)
+            if data:
+                yield data
+        yield c.finish()
+
+    @staticmethod
+    async def _compress_async(c, chunks):
+        async for chunk in chunks:
+            data = c.compress(chunk)
+            if data:
+                yield data
+        yield c.finish()
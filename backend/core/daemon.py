@@ -0,0 +1,173 @@
+"""
+Resident backend shared by desktop app launches.
+
+Each Electron launch used to start Django from scratch: import every app,
+check migrations, warm the caches, and only then open the window.
+``python manage.py serve_daemon`` keeps one warm backend running instead. Once
+it can serve, it writes its pid, URL and launcher tag to DAEMON_FILE. Later
+launches read that file and attach to it, so they skip startup entirely.
+The daemon exits after DAEMON_IDLE_TIMEOUT seconds without requests. Open
+event streams count as requests, so an open window keeps it alive.
+
+DAEMON_FILE is only valid while its daemon holds the exclusive lock on
+``<DAEMON_FILE>.lock``. That lock also keeps two launches from starting two
+daemons.
+"""
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.handlers import StaticFilesHandler
+from django.core.management import call_command
+from django.core.servers import basehttp
+from django.core.servers.basehttp import get_internal_wsgi_application
+from django.urls import get_resolver
+
+from .health import readiness
+from .locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+DAEMON_FILE = Path(os.getenv('DAEMON_FILE') or settings.BASE_DIR / 'daemon.json')
+# Seconds without any request before the daemon exits; 0 keeps it running
+IDLE_TIMEOUT = float(os.getenv('DAEMON_IDLE_TIMEOUT', '900'))
+LOCK_WAIT = 10.0
+
+
+class AlreadyRunning(Exception):
+    pass
+
+
+def _lock_path(path: Path) -> Path:
+    return path.with_name(path.name + '.lock')
+
+
+def read_state(path: Path = DAEMON_FILE) -> dict | None:
+    """The running daemon's state, or None if no daemon holds the lock."""
+    probe = FileLock(_lock_path(path))
+    if probe.acquire():
+        probe.release()
+        return None
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):  # still starting up
+        return None
+
+
+def _write_state(path: Path, state: dict) -> None:
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+class Activity:
+    """WSGI wrapper recording when the last request finished.
+
+    A request counts as active until its response is closed, so streaming
+    responses (``/api/events/``) keep the daemon alive while they are open.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._lock = threading.Lock()
+        self.active = 0
+        self.last_seen = time.monotonic()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.active += 1
+        try:
+            result = self.app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        return _ClosingIterator(result, self._done)
+
+    def _done(self) -> None:
+        with self._lock:
+            self.active -= 1
+            self.last_seen = time.monotonic()
+
+    def idle_for(self) -> float:
+        with self._lock:
+            return 0.0 if self.active else time.monotonic() - self.last_seen
+
+
+class _ClosingIterator:
+    def __init__(self, result, on_close):
+        self._result = result
+        self._on_close = on_close
+
+    def __iter__(self):
+        return iter(self._result)
+
+    def close(self):
+        try:
+            close = getattr(self._result, 'close', None)
+            if close is not None:
+                close()
+        finally:
+            self._on_close()
+
+
+def warm_up() -> None:
+    """Do the work of a first request before announcing the daemon."""
+    get_resolver().url_patterns  # imports every view module
+    result = readiness.status()
+    if not result['ok']:
+        logger.warning('Backend not ready: %s', result['checks'])
+
+
+def serve(addr: str = '127.0.0.1', port: int = 0, tag: str = '', idle_timeout: float = IDLE_TIMEOUT,
+          migrate: bool = False, path: Path = DAEMON_FILE, on_ready=None) -> None:
+    """Serve until idle for ``idle_timeout`` seconds, announcing the daemon in
+    ``path`` meanwhile. Raises AlreadyRunning if another daemon owns it."""
+    lock = FileLock(_lock_path(path))
+    # A replaced daemon (see the launchers) may still be shutting down
+    if not lock.acquire(wait=LOCK_WAIT):
+        raise AlreadyRunning(f'Another backend daemon owns {path}')
+    try:
+        if migrate:
+            call_command('migrate', interactive=False, verbosity=0)
+        # Same handler as `runserver --insecure`: static files without DEBUG
+        activity = Activity(StaticFilesHandler(get_internal_wsgi_application()))
+        server_cls = type('WSGIServer', (socketserver.ThreadingMixIn, basehttp.WSGIServer), {})
+        httpd = server_cls((addr, port), basehttp.WSGIRequestHandler)
+        httpd.daemon_threads = True
+        httpd.set_app(activity)
+        warm_up()
+        host, port = httpd.server_address[:2]
+        state = {
+            'pid': os.getpid(),
+            'port': port,
+            'url': f'http://{host}:{port}',
+            'tag': tag,
+            'started_at': time.time(),
+        }
+        _write_state(path, state)
+        if on_ready is not None:
+            on_ready(state)
+        if idle_timeout > 0:
+            threading.Thread(target=_shutdown_when_idle, args=(httpd, activity, idle_timeout), daemon=True).start()
+        try:
+            httpd.serve_forever(poll_interval=0.5)
+        finally:
+            httpd.server_close()
+            path.unlink(missing_ok=True)
+    finally:
+        lock.release()
+
+
+def _shutdown_when_idle(httpd, activity: Activity, idle_timeout: float) -> None:
+    while True:
+        idle = activity.idle_for()
+        if idle >= idle_timeout:
+            logger.info('Idle for %.0fs, shutting down', idle)
+            httpd.shutdown()
+            return
+        time.sleep(min(5.0, idle_timeout - idle + 0.1))
@@ -0,0 +1,85 @@
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from . import fastjson, formats
+
+_drf_default = JSONEncoder().default
+
+
+class RequestTooLarge(APIException):
+    status_code = 413
+    default_detail = 'Request body too large.'
+    default_code = 'request_too_large'
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Indented output (browsable API, ?indent) keeps the stock encoder
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return fastjson.dumps(data, default=_drf_default)
+
+
+def _read(stream) -> bytes:
+    limit = fastjson.MAX_BODY_BYTES
+    body = stream.read(limit + 1) if limit else stream.read()
+    if limit and len(body) > limit:
+        raise RequestTooLarge(f'request body exceeds {limit} bytes')
+    return body
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = _read(stream)
+        if not body.strip():
+            return {}
+        try:
+            return fastjson.loads(body)
+        except ValueError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class _BinaryRenderer(BaseRenderer):
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return formats.CODECS[self.media_type][0](data)
+
+
+class _BinaryParser(BaseParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        body = _read(stream)
+        if not body:
+            return {}
+        try:
+            return formats.CODECS[self.media_type][1](body)
+        except Exception as exc:
+            raise ParseError(f'{self.format} parse error - {exc}')
+
+
+class MessagePackRenderer(_BinaryRenderer):
+    media_type = formats.MSGPACK
+    format = 'msgpack'
+
+
+class MessagePackParser(_BinaryParser):
+    media_type = formats.MSGPACK
+    format = 'msgpack'
+
+
+class CBORRenderer(_BinaryRenderer):
+    media_type = formats.CBOR
+    format = 'cbor'
+
+
+class CBORParser(_BinaryParser):
+    media_type = formats.CBOR
+    format = 'cbor'
+
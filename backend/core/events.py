@@ -0,0 +1,164 @@
+"""
+In-process, per-user change notifications served as Server-Sent Events.
+
+Model signals ``publish()`` events once the surrounding transaction commits;
+every open ``/api/events/`` stream of that user receives them immediately.
+The broker lives in this process, which covers the desktop app and
+single-process deployments. Several worker processes would each see only
+their own writes.
+"""
+import asyncio
+import itertools
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import transaction
+
+from . import fastjson
+
+HEARTBEAT_SECONDS = float(os.getenv('EVENTS_HEARTBEAT_SECONDS', '15'))
+# Streams are closed after this long and the browser reconnects (with
+# Last-Event-ID), so an idle tab never pins a server thread forever
+MAX_STREAM_SECONDS = float(os.getenv('EVENTS_MAX_STREAM_SECONDS', '300'))
+REPLAY_SIZE = int(os.getenv('EVENTS_REPLAY_SIZE', '100'))
+QUEUE_SIZE = 1000
+
+
+class Subscription:
+    def __init__(self, broker, user_id, loop=None):
+        self.broker = broker
+        self.user_id = user_id
+        self.events = deque(maxlen=QUEUE_SIZE)
+        self.cond = threading.Condition()
+        # Async subscribers are woken on their event loop; publishers may be
+        # on any thread
+        self.loop = loop
+        self.ready = asyncio.Event() if loop is not None else None
+
+    def push(self, event) -> None:
+        with self.cond:
+            self.events.append(event)
+            self.cond.notify()
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.ready.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+    def get(self, timeout: float) -> list:
+        """Every pending event, waiting up to ``timeout`` for the first."""
+        with self.cond:
+            if not self.events:
+                self.cond.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    async def aget(self, timeout: float) -> list:
+        if not self.events:
+            try:
+                await asyncio.wait_for(self.ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        with self.cond:
+            self.ready.clear()
+            events = list(self.events)
+            self.events.clear()
+        return events
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = {}
+        self._recent = {}
+
+    def subscribe(self, user_id, last_event_id: int | None = None, loop=None) -> Subscription:
+        sub = Subscription(self, user_id, loop)
+        with self._lock:
+            self._subscribers.setdefault(user_id, set()).add(sub)
+            if last_event_id is not None:
+                for event in self._recent.get(user_id, ()):
+                    if event[0] > last_event_id:
+                        sub.events.append(event)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            subs = self._subscribers.get(sub.user_id)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._subscribers[sub.user_id]
+
+    def publish(self, user_id, name: str, payload: dict) -> None:
+        with self._lock:
+            event = (next(self._ids), name, payload)
+            self._recent.setdefault(user_id, deque(maxlen=REPLAY_SIZE)).append(event)
+            subs = list(self._subscribers.get(user_id, ()))
+        for sub in subs:
+            sub.push(event)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
+
+
+broker = Broker()
+
+
+def publish_on_commit(user_id, name: str, payload: dict, using: str = 'default') -> None:
+    transaction.on_commit(lambda: broker.publish(user_id, name, payload), using=using)
+
+
+def format_event(event) -> bytes:
+    event_id, name, payload = event
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (event_id, name.encode(), fastjson.dumps(payload))
+
+
+def stream(user_id, last_event_id: int | None = None):
+    """SSE body for a user: events as they arrive, comment heartbeats in between.
+
+    Subscribes on first iteration, so a stream that is never sent never
+    registers (and the ``finally`` always gets to unsubscribe).
+    """
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    sub = broker.subscribe(user_id, last_event_id)
+    try:
+        yield b'retry: 2000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = sub.get(min(HEARTBEAT_SECONDS, remaining))
+            if events:
+                yield b''.join(format_event(e) for e in events)
+            else:
+                yield b': ping\n\n'
+    finally:
+        sub.close()
+
+
+async def astream(user_id, last_event_id: int | None = None):
+    """Async ``stream()`` for ASGI: waiting costs no thread, only a task."""
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    sub = broker.subscribe(user_id, last_event_id, loop=asyncio.get_running_loop())
+    try:
+        yield b'retry: 2000\n\n'
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            events = await sub.aget(min(HEARTBEAT_SECONDS, remaining))
+            if events:
+                yield b''.join(format_event(e) for e in events)
+            else:
+                yield b': ping\n\n'
+    finally:
+        sub.close()
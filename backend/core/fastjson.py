@@ -0,0 +1,97 @@
+"""
+JSON encoding/decoding shared by the API views.
+
+Uses orjson when it is installed and the stdlib otherwise. Values orjson
+rejects (integers beyond 64 bits, NaN) fall back to the stdlib so both paths
+accept the same documents. Request bodies are decoded straight from bytes and
+capped at API_MAX_BODY_BYTES.
+"""
+import json
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, JsonResponse
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is always available
+    orjson = None
+
+MAX_BODY_BYTES = int(os.getenv('API_MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+
+encode_default = DjangoJSONEncoder().default
+
+
+class JsonBodyError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+    def response(self) -> JsonResponse:
+        return JsonResponse({'error': str(self)}, status=self.status)
+
+
+def dumps(obj, default=encode_default) -> bytes:
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(obj, default=default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def loads(data: bytes | str):
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def read_body(request, limit: int | None = None) -> bytes:
+    """Read the raw body, enforcing ``limit`` (default API_MAX_BODY_BYTES, 0 = none).
+
+    Reads the stream directly, so this limit applies instead of Django's
+    DATA_UPLOAD_MAX_MEMORY_SIZE; ``request.body`` stays usable afterwards.
+    """
+    limit = MAX_BODY_BYTES if limit is None else limit
+    too_large = JsonBodyError(f'request body exceeds {limit} bytes', status=413)
+    if hasattr(request, '_body'):
+        body = request._body
+    else:
+        try:
+            declared = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            declared = 0
+        if limit and declared > limit:
+            raise too_large
+        body = request.read(limit + 1) if limit else request.read()
+        request._body = body
+    if limit and len(body) > limit:
+        raise too_large
+    return body
+
+
+def read_json(request, limit: int | None = None) -> dict:
+    """Decode the request body, which must be a JSON object (empty means ``{}``)."""
+    body = read_body(request, limit)
+    if not body.strip():
+        return {}
+    try:
+        data = loads(body)
+    except ValueError:
+        raise JsonBodyError('invalid JSON')
+    if not isinstance(data, dict):
+        raise JsonBodyError('expected a JSON object')
+    return data
+
+
+class FastJsonResponse(HttpResponse):
+    """Drop-in for ``JsonResponse`` that serializes with ``dumps``."""
+
+    def __init__(self, data, safe: bool = True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
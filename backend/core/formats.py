@@ -0,0 +1,106 @@
+"""
+Content negotiation for API bodies: JSON by default, MessagePack or CBOR when
+the client asks for them (``Accept``) or sends them (``Content-Type``).
+
+Binary formats are only offered when ``msgpack`` / ``cbor2`` are installed.
+Request bodies go through the same size limit as ``fastjson.read_json``.
+"""
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from . import fastjson
+from .fastjson import JsonBodyError, encode_default
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional
+    cbor2 = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+
+_ALIASES = {'application/x-msgpack': MSGPACK, 'application/vnd.msgpack': MSGPACK}
+
+
+def _msgpack_dumps(obj) -> bytes:
+    return msgpack.packb(obj, default=encode_default, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes):
+    return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+
+def _cbor_dumps(obj) -> bytes:
+    return cbor2.dumps(obj, default=lambda encoder, value: encoder.encode(encode_default(value)))
+
+
+# media type -> (dumps, loads); JSON first so it wins ties
+CODECS = {JSON: (fastjson.dumps, fastjson.loads)}
+if msgpack is not None:
+    CODECS[MSGPACK] = (_msgpack_dumps, _msgpack_loads)
+if cbor2 is not None:
+    CODECS[CBOR] = (_cbor_dumps, cbor2.loads)
+
+
+def _media_type(value: str) -> str:
+    media_type = value.split(';')[0].strip().lower()
+    return _ALIASES.get(media_type, media_type)
+
+
+def negotiate(accept: str) -> str:
+    """Best supported media type for an Accept header; JSON when nothing matches."""
+    best, best_q = JSON, 0.0
+    for part in accept.split(','):
+        media_type = _media_type(part)
+        q = 1.0
+        for param in part.split(';')[1:]:
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if media_type in CODECS and q > best_q:
+            best, best_q = media_type, q
+    return best
+
+
+def read_data(request, limit: int | None = None) -> dict:
+    """Decode a JSON, MessagePack or CBOR request body into a dict."""
+    media_type = _media_type(request.content_type or JSON)
+    if media_type not in (MSGPACK, CBOR):
+        return fastjson.read_json(request, limit)
+    if media_type not in CODECS:
+        raise JsonBodyError(f'{media_type} is not supported by this server', status=415)
+    body = fastjson.read_body(request, limit)
+    if not body:
+        return {}
+    try:
+        data = CODECS[media_type][1](body)
+    except Exception:
+        raise JsonBodyError(f'invalid {media_type} body')
+    if not isinstance(data, dict):
+        raise JsonBodyError('expected an object')
+    return data
+
+
+def api_response(request, data, safe: bool = True, **kwargs) -> HttpResponse:
+    """Serialize ``data`` in the format the client's Accept header prefers."""
+    if safe and not isinstance(data, dict):
+        raise TypeError('In order to allow non-dict objects to be serialized set the safe parameter to False.')
+    media_type = negotiate(request.headers.get('Accept', ''))
+    try:
+        content = CODECS[media_type][0](data)
+    except OverflowError:
+        # Integers too large for MessagePack/CBOR still encode as JSON
+        media_type, content = JSON, fastjson.dumps(data)
+    response = HttpResponse(content, content_type=media_type, **kwargs)
+    if len(CODECS) > 1:
+        patch_vary_headers(response, ('Accept',))
+    return response
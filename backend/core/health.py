@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+from .metrics import registry
+
+READY_TTL = float(os.getenv('HEALTH_READY_TTL', '5'))
+NOT_READY_TTL = float(os.getenv('HEALTH_NOT_READY_TTL', '1'))
+
+
+def check_database(alias: str = DEFAULT_DB_ALIAS) -> None:
+    with connections[alias].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_migrations(alias: str = DEFAULT_DB_ALIAS) -> None:
+    executor = MigrationExecutor(connections[alias])
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} unapplied migration(s)')
+
+
+def check_cache() -> None:
+    key = 'health:warmup'
+    cache.set(key, 1, 30)
+    if cache.get(key) != 1:
+        raise RuntimeError('cache round-trip failed')
+
+
+class Readiness:
+    """Runs readiness checks at most once per TTL window.
+
+    Migrations and cache warmup are one-time startup conditions, so they
+    are only re-checked until they first pass; afterwards each window
+    costs a single ``SELECT 1``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._result = None
+        self._expires = 0.0
+        self._warm = False
+
+    def _run(self) -> dict:
+        checks = {}
+        steps = [('database', check_database)]
+        if not self._warm:
+            steps += [('migrations', check_migrations), ('cache', check_cache)]
+        for name, check in steps:
+            try:
+                check()
+                checks[name] = 'ok'
+            except Exception as exc:
+                checks[name] = str(exc) or exc.__class__.__name__
+        ok = all(v == 'ok' for v in checks.values())
+        if ok:
+            self._warm = True
+        return {'ok': ok, 'checks': checks}
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        result = self._result
+        if result is not None and now < self._expires:
+            registry.record_lookup('readiness', True)
+            return result
+        with self._lock:
+            if self._result is not None and time.monotonic() < self._expires:
+                registry.record_lookup('readiness', True)
+                return self._result
+            registry.record_lookup('readiness', False)
+            result = self._run()
+            self._result = result
+            self._expires = time.monotonic() + (READY_TTL if result['ok'] else NOT_READY_TTL)
+            return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._result = None
+            self._expires = 0.0
+            self._warm = False
+
+
+readiness = Readiness()
@@ -0,0 +1,58 @@
+"""
+Inter-process locks on files.
+
+A ``FileLock`` is held for as long as its file stays open and is released
+by the OS when the process exits, so a crashed holder never leaves it taken.
+The daemon uses one to own DAEMON_FILE, and the maintenance scheduler uses
+one to run in a single worker process.
+"""
+import os
+import time
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+class FileLock:
+    """Exclusive, non-blocking lock on a file, released when the process exits."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._file = None
+
+    @property
+    def held(self) -> bool:
+        return self._file is not None
+
+    def acquire(self, wait: float = 0) -> bool:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = time.monotonic() + wait
+        self._file = open(self.path, 'a+b')
+        while True:
+            try:
+                if os.name == 'nt':
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except OSError:
+                if time.monotonic() >= deadline:
+                    self._file.close()
+                    self._file = None
+                    return False
+                time.sleep(0.2)
+
+    def release(self) -> None:
+        if self._file is None:
+            return
+        if os.name == 'nt':
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
@@ -0,0 +1,312 @@
+"""
+Online backups and housekeeping for the SQLite database.
+
+``migrate`` puts SQLite databases in WAL mode, and new ones get incremental
+auto_vacuum (``prepare_database``). Both settings persist in the file.
+Backups use SQLite's backup API a few pages at a time from a separate
+read-only connection, so the app keeps reading and writing while a copy is
+taken (a copy restarts if a write lands mid-way; it never blocks the writer).
+Housekeeping deletes expired sessions in small batches, returns free pages to
+the filesystem with ``PRAGMA incremental_vacuum`` and refreshes planner
+statistics with ``PRAGMA optimize``. Set DB_MAINTENANCE_INTERVAL to run it
+periodically in the server process, or use ``manage.py db_maintenance``.
+Only one worker process runs the schedule: the one holding the lock on
+``<database>.maintenance.lock``.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, router, transaction
+from django.utils import timezone
+
+from .locks import FileLock
+
+logger = logging.getLogger(__name__)
+
+# Seconds between scheduled runs; 0 disables the scheduler
+INTERVAL = float(os.getenv('DB_MAINTENANCE_INTERVAL', '0'))
+# Directory for scheduled backups; empty skips them
+BACKUP_DIR = os.getenv('DB_BACKUP_DIR', '')
+BACKUP_KEEP = int(os.getenv('DB_BACKUP_KEEP', '7'))
+BACKUP_PAGES = int(os.getenv('DB_BACKUP_PAGES', '256'))
+BACKUP_MAX_RESTARTS = int(os.getenv('DB_BACKUP_MAX_RESTARTS', '10'))
+# Longest pause between backup steps once a copy keeps restarting
+BACKUP_MAX_BACKOFF = 1.0
+SESSION_BATCH = int(os.getenv('DB_SESSION_PURGE_BATCH', '500'))
+# Pages released per incremental_vacuum call (0 releases the whole freelist)
+VACUUM_PAGES = int(os.getenv('DB_VACUUM_PAGES', '2000'))
+
+_AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+def prepare_database(sender, using: str = DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """``pre_migrate`` hook: WAL mode, and incremental auto_vacuum for a new database.
+
+    WAL lets readers, backups included, run alongside the writer. auto_vacuum
+    only takes effect before the first table is created (or after a VACUUM),
+    so existing databases keep theirs until
+    ``db_maintenance --enable-incremental-vacuum``. Both are no-ops once set.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if _pragma(cursor, 'page_count') == 0:
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        if _pragma(cursor, 'journal_mode') not in ('wal', 'memory'):
+            cursor.execute('PRAGMA journal_mode = WAL')
+
+
+def _connection(alias: str):
+    connection = connections[alias]
+    if connection.vendor != 'sqlite':
+        raise RuntimeError(f"database '{alias}' is {connection.vendor}, not SQLite")
+    return connection
+
+
+def database_path(alias: str = DEFAULT_DB_ALIAS) -> Path:
+    return Path(_connection(alias).settings_dict['NAME'])
+
+
+def _pragma(cursor, name: str):
+    cursor.execute(f'PRAGMA {name}')
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class _TooManyRestarts(Exception):
+    pass
+
+
+def backup(dest, alias: str = DEFAULT_DB_ALIAS, pages: int = BACKUP_PAGES, progress=None) -> Path:
+    """Copy the live database to ``dest`` ``pages`` pages at a time.
+
+    Every write from another connection restarts a stepped copy, so under
+    constant writes it might never finish. After BACKUP_MAX_RESTARTS restarts
+    a database in WAL mode (see ``prepare_database``) is copied in one step
+    instead, which reads a snapshot without blocking writers. In any other
+    journal mode that step would hold a read lock, and so block writers, for
+    the whole copy. The copy therefore keeps stepping instead, pausing
+    longer after each further restart so writers get through. The copy is
+    written next to ``dest`` and renamed into place once complete, so
+    ``dest`` is never a half-written file.
+    """
+    source_path = database_path(alias)
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(dest.name + '.tmp')
+    tmp.unlink(missing_ok=True)
+    restarts = 0
+    last_remaining = None
+    backoff = 0.0
+
+    def step(status, remaining, total):
+        nonlocal restarts, last_remaining, backoff
+        # No progress on a successful step means the copy started over
+        if status == sqlite3.SQLITE_OK and last_remaining is not None and remaining >= last_remaining:
+            restarts += 1
+            if restarts > BACKUP_MAX_RESTARTS:
+                if wal:
+                    raise _TooManyRestarts
+                backoff = min(BACKUP_MAX_BACKOFF, max(0.01, backoff * 2))
+        last_remaining = remaining
+        if progress is not None:
+            progress(status, remaining, total)
+        if backoff:
+            # No lock is held between steps
+            time.sleep(backoff)
+
+    source = sqlite3.connect(f'{source_path.resolve().as_uri()}?mode=ro', uri=True, timeout=30)
+    target = sqlite3.connect(tmp)
+    try:
+        wal = source.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        try:
+            # sleep: back off between steps when a writer holds the lock
+            source.backup(target, pages=max(1, pages), progress=step, sleep=0.01)
+        except _TooManyRestarts:
+            logger.info('backup of %s restarted %d times, copying the WAL snapshot in one step', source_path, restarts)
+            source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    os.replace(tmp, dest)
+    return dest
+
+
+def rotate_backups(directory, keep: int = BACKUP_KEEP) -> list:
+    """Delete all but the newest ``keep`` ``*.sqlite3`` backups in ``directory``."""
+    files = sorted(Path(directory).glob('*.sqlite3'), key=lambda p: p.stat().st_mtime, reverse=True)
+    removed = files[keep:] if keep > 0 else []
+    for path in removed:
+        path.unlink(missing_ok=True)
+    return removed
+
+
+def scheduled_backup(directory, alias: str = DEFAULT_DB_ALIAS) -> Path:
+    name = f'{database_path(alias).stem}-{timezone.now():%Y%m%d-%H%M%S}.sqlite3'
+    path = backup(Path(directory) / name, alias)
+    rotate_backups(directory)
+    return path
+
+
+def purge_sessions(alias: str = DEFAULT_DB_ALIAS, batch_size: int = SESSION_BATCH) -> int:
+    """Delete expired sessions, one short transaction per ``batch_size`` rows.
+
+    Unlike ``clearsessions`` this never holds the write lock for the whole
+    table, so requests keep saving their sessions in between batches.
+    """
+    from django.contrib.sessions.models import Session
+
+    now = timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic(using=alias):
+            keys = list(Session.objects.using(alias).filter(expire_date__lt=now).values_list('pk', flat=True)[:batch_size])
+            if not keys:
+                return total
+            total += Session.objects.using(alias).filter(pk__in=keys).delete()[0]
+
+
+def auto_vacuum_mode(alias: str = DEFAULT_DB_ALIAS) -> str:
+    with _connection(alias).cursor() as cursor:
+        return _AUTO_VACUUM_MODES.get(_pragma(cursor, 'auto_vacuum'), 'unknown')
+
+
+def enable_incremental_vacuum(alias: str = DEFAULT_DB_ALIAS) -> None:
+    """Switch an existing database to ``auto_vacuum=INCREMENTAL``.
+
+    This needs a full ``VACUUM``, which rewrites the file and blocks writers
+    while it runs; do it once, while the app is idle.
+    """
+    with _connection(alias).cursor() as cursor:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+
+
+def incremental_vacuum(alias: str = DEFAULT_DB_ALIAS, pages: int = VACUUM_PAGES) -> int:
+    """Release up to ``pages`` free pages; returns how many were released."""
+    with _connection(alias).cursor() as cursor:
+        if _pragma(cursor, 'auto_vacuum') != 2:
+            return 0
+        before = _pragma(cursor, 'freelist_count')
+        # The pragma frees one page per step; executescript() runs it to completion
+        cursor.connection.executescript(f'PRAGMA incremental_vacuum({max(0, int(pages))})')
+        return before - _pragma(cursor, 'freelist_count')
+
+
+def optimize(alias: str = DEFAULT_DB_ALIAS) -> None:
+    with _connection(alias).cursor() as cursor:
+        cursor.execute('PRAGMA optimize')
+
+
+def report(alias: str = DEFAULT_DB_ALIAS) -> dict:
+    """File sizes, free pages and, where SQLite has ``dbstat``, per-table sizes."""
+    path = database_path(alias)
+    wal = path.with_name(path.name + '-wal')
+    with _connection(alias).cursor() as cursor:
+        page_size = _pragma(cursor, 'page_size')
+        page_count = _pragma(cursor, 'page_count')
+        free_pages = _pragma(cursor, 'freelist_count')
+        info = {
+            'path': str(path),
+            'size_bytes': page_size * page_count,
+            'wal_bytes': wal.stat().st_size if wal.exists() else 0,
+            'page_size': page_size,
+            'page_count': page_count,
+            'free_pages': free_pages,
+            'free_bytes': page_size * free_pages,
+            'fragmentation': round(free_pages / page_count, 4) if page_count else 0.0,
+            'auto_vacuum': _AUTO_VACUUM_MODES.get(_pragma(cursor, 'auto_vacuum'), 'unknown'),
+            'journal_mode': _pragma(cursor, 'journal_mode'),
+        }
+        try:
+            cursor.execute(
+                "SELECT name, SUM(pgsize), SUM(unused) FROM dbstat GROUP BY name ORDER BY SUM(pgsize) DESC"
+            )
+            info['tables'] = [{'name': n, 'bytes': size, 'unused_bytes': unused} for n, size, unused in cursor.fetchall()]
+        except DatabaseError:  # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB
+            info['tables'] = None
+    return info
+
+
+def run(alias: str = DEFAULT_DB_ALIAS, backup_dir: str = BACKUP_DIR) -> dict:
+    """One scheduled pass: backup (if configured), purge, vacuum, optimize."""
+    result = {}
+    if backup_dir:
+        result['backup'] = str(scheduled_backup(backup_dir, alias))
+    from django.contrib.sessions.models import Session
+
+    if router.allow_migrate_model(alias, Session):  # not on project shards
+        result['sessions_purged'] = purge_sessions(alias)
+    result['pages_released'] = incremental_vacuum(alias)
+    optimize(alias)
+    return result
+
+
+class Scheduler:
+    """Daemon thread calling ``run()`` for each alias every ``interval`` seconds.
+
+    Every worker process of a server starts one, but only the one holding
+    ``lock`` runs maintenance. The others try to take the lock each interval,
+    so another worker takes over when the holder exits.
+    """
+
+    def __init__(self, interval: float, aliases=(DEFAULT_DB_ALIAS,), lock: FileLock | None = None):
+        self.interval = interval
+        self.aliases = list(aliases)
+        self.lock = lock
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='db-maintenance', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self.lock is not None:
+            self.lock.release()
+
+    def leading(self) -> bool:
+        return self.lock is None or self.lock.held or self.lock.acquire()
+
+    def _loop(self) -> None:
+        # The first pass waits a full interval so startup stays fast
+        while not self._stop.wait(self.interval):
+            if not self.leading():
+                continue
+            for alias in self.aliases:
+                started = time.monotonic()
+                try:
+                    result = run(alias)
+                    logger.info('database maintenance of %s finished in %.1fs: %s', alias, time.monotonic() - started, result)
+                except Exception:
+                    logger.exception('database maintenance of %s failed', alias)
+            connections.close_all()
+
+
+_scheduler = None
+
+
+def lock_path(alias: str = DEFAULT_DB_ALIAS) -> Path:
+    path = database_path(alias)
+    return path.with_name(path.name + '.maintenance.lock')
+
+
+def start_scheduler() -> None:
+    """Start periodic maintenance of every SQLite database (default and any
+    shards, but not replicas) when DB_MAINTENANCE_INTERVAL is set."""
+    global _scheduler
+    aliases = [
+        alias for alias in connections
+        if connections[alias].vendor == 'sqlite' and not connections[alias].settings_dict['TEST'].get('MIRROR')
+    ]
+    if INTERVAL <= 0 or _scheduler is not None or not aliases:
+        return
+    _scheduler = Scheduler(INTERVAL, aliases, lock=FileLock(lock_path(aliases[0])))
+    _scheduler.start()
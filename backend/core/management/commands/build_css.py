@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import assets
+
+
+class Command(BaseCommand):
+    help = 'Compile and purge Tailwind/DaisyUI CSS and publish it as a content-hashed static bundle.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip-npm', action='store_true',
+                            help='Hash the existing static/css/compiled.css without running npm.')
+
+    def handle(self, *args, **options):
+        try:
+            if not options['skip_npm']:
+                assets.compile_css()
+            path = assets.publish_bundle()
+        except assets.AssetBuildError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f'Published {path}'))
@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import fastjson, maintenance
+
+
+class Command(BaseCommand):
+    help = ('Back up, purge expired sessions, vacuum and optimize the SQLite database. '
+            'Without options runs the routine tasks and prints a size report.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument('--backup', metavar='PATH', help='Write an online backup to PATH.')
+        parser.add_argument('--backup-pages', type=int, default=maintenance.BACKUP_PAGES,
+                            help='Pages copied per backup step (defaults to DB_BACKUP_PAGES).')
+        parser.add_argument('--report', action='store_true', help='Only print the size/fragmentation report.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                            help='Switch the database to auto_vacuum=INCREMENTAL (runs a full, blocking VACUUM).')
+
+    def handle(self, *args, **options):
+        db = options['database']
+        try:
+            maintenance.database_path(db)
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        if options['backup']:
+            def progress(status, remaining, total):
+                if total:
+                    self.stderr.write(f'\rbackup {100 * (total - remaining) // total}%', ending='')
+            path = maintenance.backup(options['backup'], db, pages=options['backup_pages'], progress=progress)
+            self.stderr.write('')
+            self.stdout.write(self.style.SUCCESS(f'Backed up to {path}'))
+            return
+        if options['enable_incremental_vacuum']:
+            maintenance.enable_incremental_vacuum(db)
+            self.stdout.write(self.style.SUCCESS('auto_vacuum is now incremental'))
+        elif not options['report']:
+            result = maintenance.run(db, backup_dir='')
+            self.stdout.write(self.style.SUCCESS(
+                f"Purged {result.get('sessions_purged', 0)} expired sessions, released {result['pages_released']} free pages"))
+            if maintenance.auto_vacuum_mode(db) != 'incremental':
+                self.stdout.write(self.style.WARNING(
+                    'auto_vacuum is not incremental; run with --enable-incremental-vacuum once to reclaim space'))
+        info = maintenance.report(db)
+        if options['json']:
+            self.stdout.write(fastjson.dumps(info).decode())
+            return
+        self.stdout.write(
+            f"{info['path']}: {info['size_bytes'] / 1024 ** 2:.1f} MiB "
+            f"(+{info['wal_bytes'] / 1024 ** 2:.1f} MiB WAL), "
+            f"{info['free_pages']}/{info['page_count']} pages free ({info['fragmentation']:.1%}), "
+            f"auto_vacuum={info['auto_vacuum']}, journal_mode={info['journal_mode']}"
+        )
+        for table in (info['tables'] or [])[:15]:
+            self.stdout.write(f"  {table['name']:<48} {table['bytes'] / 1024:>10.0f} KiB  ({table['unused_bytes'] / 1024:.0f} KiB unused)")
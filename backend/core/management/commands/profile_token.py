@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = 'Print a signed token for the X-Profile-Token header (valid for PROFILING_TOKEN_MAX_AGE seconds).'
+
+    def handle(self, *args, **options):
+        self.stdout.write(profiling.make_token())
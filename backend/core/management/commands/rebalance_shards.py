@@ -0,0 +1,45 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core import sharding
+from preferences.models import UserPreference
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = ("Migrate every shard, then move each user's projects and preferences to the shard "
+            "DB_SHARDS assigns them. Run after enabling sharding or raising DB_SHARDS.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report which users would move.')
+
+    def handle(self, *args, **options):
+        if not sharding.enabled():
+            raise CommandError('Set DB_SHARDS to enable sharding first')
+        for alias in sharding.SHARD_ALIASES:
+            call_command('migrate', database=alias, verbosity=0)
+        sources = list(sharding.SHARD_ALIASES)
+        # Rows written to 'default' before sharding was turned on
+        if Project._meta.db_table in connections[DEFAULT_DB_ALIAS].introspection.table_names():
+            sources.insert(0, DEFAULT_DB_ALIAS)
+            if not options['dry_run']:
+                # Migrated without DB_SHARDS, so the user FKs are still enforced there
+                with connections[DEFAULT_DB_ALIAS].schema_editor() as editor:
+                    for model in (Project, UserPreference):
+                        sharding.user_constraint_matches(model, editor)
+        users = projects = 0
+        for source in sources:
+            for user_id in sorted(sharding.owners(source)):
+                target = sharding.db_for_user(user_id)
+                if target == source:
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(f'user {user_id}: {source} -> {target}')
+                else:
+                    projects += sharding.move_user(user_id, source, target)
+                users += 1
+        if options['dry_run']:
+            self.stdout.write(f'{users} users would move')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Moved {users} users ({projects} projects)'))
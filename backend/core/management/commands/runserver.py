@@ -0,0 +1,19 @@
+from django.contrib.staticfiles.management.commands.runserver import Command as StaticfilesRunserverCommand
+
+from core import reloader
+
+
+class Command(StaticfilesRunserverCommand):
+    help = (StaticfilesRunserverCommand.help + ' Reloads on filesystem events when the watchfiles '
+            'package is installed.')
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--stat-reloader', action='store_true',
+                            help="Use Django's polling reloader even if watchfiles is installed.")
+
+    def run(self, **options):
+        if options['use_reloader'] and reloader.available() and not options['stat_reloader']:
+            reloader.run_with_reloader(self.inner_run, **options)
+        else:
+            super().run(**options)
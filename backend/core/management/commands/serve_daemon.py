@@ -0,0 +1,37 @@
+import signal
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import daemon
+
+
+class Command(BaseCommand):
+    help = ('Run a resident backend that desktop app launches attach to through DAEMON_FILE. '
+            'It exits after DAEMON_IDLE_TIMEOUT seconds without requests.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--addr', default='127.0.0.1', help='Address to bind (default 127.0.0.1).')
+        parser.add_argument('--port', type=int, default=0, help='Port to bind (default: any free port).')
+        parser.add_argument('--tag', default='',
+                            help='Recorded in DAEMON_FILE; launchers replace a daemon with another tag.')
+        parser.add_argument('--idle-timeout', type=float, default=daemon.IDLE_TIMEOUT,
+                            help='Seconds without requests before exiting (defaults to DAEMON_IDLE_TIMEOUT; 0 never).')
+        parser.add_argument('--migrate', action='store_true', help='Apply migrations before serving.')
+
+    def handle(self, *args, **options):
+        # Clean up DAEMON_FILE when a launcher replaces this daemon
+        signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+        try:
+            daemon.serve(options['addr'], options['port'], tag=options['tag'], idle_timeout=options['idle_timeout'],
+                         migrate=options['migrate'], on_ready=self._ready)
+        except daemon.AlreadyRunning as e:
+            raise CommandError(str(e))
+        except OSError as e:
+            raise CommandError(f'Cannot serve: {e}')
+        self.stdout.write('Stopped.')
+
+    def _ready(self, state):
+        self.stdout.write(self.style.SUCCESS(f"Serving {state['url']} (pid {state['pid']}); state in {daemon.DAEMON_FILE}"))
+        # Launchers redirect output to a log file
+        self.stdout.flush()
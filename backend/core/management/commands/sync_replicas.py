@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import maintenance, replicas
+
+
+class Command(BaseCommand):
+    help = ('Refresh the SQLite read replicas (DATABASE_REPLICA_URLS) with an online copy '
+            'of the default database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', action='append', dest='aliases', metavar='ALIAS',
+                            help='Replica to refresh (repeatable; defaults to all of them).')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep refreshing every INTERVAL seconds instead of once.')
+        parser.add_argument('--backup-pages', type=int, default=maintenance.BACKUP_PAGES,
+                            help='Pages copied per backup step (defaults to DB_BACKUP_PAGES).')
+
+    def handle(self, *args, **options):
+        aliases = options['aliases'] or replicas.REPLICA_ALIASES
+        if not aliases:
+            raise CommandError('No replicas configured; set DATABASE_REPLICA_URLS.')
+        unknown = sorted(set(aliases) - set(replicas.REPLICA_ALIASES))
+        if unknown:
+            raise CommandError(f"Not a replica: {', '.join(unknown)}")
+        while True:
+            for alias in aliases:
+                started = time.monotonic()
+                try:
+                    path = replicas.sync(alias, options['backup_pages'])
+                except RuntimeError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(self.style.SUCCESS(f'{alias}: refreshed {path} in {time.monotonic() - started:.2f}s'))
+            if options['interval'] <= 0:
+                return
+            time.sleep(options['interval'])
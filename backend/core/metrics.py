@@ -0,0 +1,308 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+from django.db import connections
+
+try:
+    import psutil
+except ImportError:  # optional; /proc or resource are used instead
+    psutil = None
+
+_IMPORTED_AT = time.time()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(self.buckets + (float('inf'),), self.counts):
+            total += n
+            yield bound, total
+
+
+class Registry:
+    """Process-local metrics store. All mutation happens under one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.process_started_at = _process_start_time()
+        self.startup_seconds = None
+        self.in_flight = 0
+        self.requests = {}
+        self.latency = {}
+        self.db_queries = {}
+        self.db_seconds = {}
+        self.lookups = {}
+
+    def mark_started(self) -> None:
+        self.startup_seconds = time.time() - self.process_started_at
+
+    def begin_request(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def end_request(self, route: str, method: str, status: int, seconds: float, queries: int, db_seconds: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            hist = self.latency.get((route, method))
+            if hist is None:
+                hist = self.latency[(route, method)] = Histogram()
+            hist.observe(seconds)
+            self.db_queries[route] = self.db_queries.get(route, 0) + queries
+            self.db_seconds[route] = self.db_seconds.get(route, 0.0) + db_seconds
+
+    def record_lookup(self, name: str, hit: bool) -> None:
+        """Count a hit or miss for a named cache (``session``, ``user``, ...)."""
+        with self._lock:
+            counts = self.lookups.setdefault(name, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'requests': dict(self.requests),
+                'latency': {k: (h.buckets, list(h.cumulative()), h.sum, h.count) for k, h in self.latency.items()},
+                'db_queries': dict(self.db_queries),
+                'db_seconds': dict(self.db_seconds),
+                'lookups': {k: tuple(v) for k, v in self.lookups.items()},
+                'process': {
+                    'rss_bytes': rss_bytes(),
+                    'startup_seconds': self.startup_seconds,
+                    'uptime_seconds': time.time() - self.process_started_at,
+                },
+            }
+
+
+def _process_start_time() -> float:
+    if psutil is not None:
+        try:
+            return psutil.Process().create_time()
+        except Exception:
+            pass
+    try:
+        with open('/proc/self/stat') as fh:
+            start_ticks = int(fh.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat') as fh:
+            boot = next(int(line.split()[1]) for line in fh if line.startswith('btime'))
+        return boot + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return _IMPORTED_AT
+
+
+def rss_bytes():
+    """Current resident set size, or peak RSS where only that is available."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as fh:
+            return int(fh.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes elsewhere
+    return peak if os.uname().sysname == 'Darwin' else peak * 1024
+
+
+registry = Registry()
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _route(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return '/' + match.route if match.route else (match.view_name or 'unmatched')
+
+
+def _record_session(request) -> None:
+    session = getattr(request, 'session', None)
+    cookie = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session is None or not cookie or not session.accessed:
+        return
+    registry.record_lookup('session', session.session_key == cookie)
+
+
+class MetricsMiddleware:
+    """Records per-route latency, DB query counts and in-flight requests."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with self._measure(request) as result:
+            result['response'] = self.get_response(request)
+        return result['response']
+
+    async def __acall__(self, request):
+        with self._measure(request) as result:
+            result['response'] = await self.get_response(request)
+        return result['response']
+
+    @contextmanager
+    def _measure(self, request):
+        counter = _QueryCounter()
+        registry.begin_request()
+        start = time.perf_counter()
+        result = {}
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(counter))
+                yield result
+        finally:
+            response = result.get('response')
+            registry.end_request(
+                _route(request), request.method, response.status_code if response is not None else 500,
+                time.perf_counter() - start, counter.count, counter.seconds,
+            )
+            _record_session(request)
+
+
+def _labels(**labels) -> str:
+    def esc(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{k}="{esc(v)}"' for k, v in labels.items()) + '}'
+
+
+def _fmt_bound(bound: float) -> str:
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def render_prometheus(snap: dict) -> str:
+    lines = [
+        '# HELP http_requests_total Completed HTTP requests.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (route, method, status), n in sorted(snap['requests'].items()):
+        lines.append(f'http_requests_total{_labels(route=route, method=method, status=status)} {n}')
+
+    lines += [
+        '# HELP http_request_duration_seconds Request latency by route.',
+        '# TYPE http_request_duration_seconds histogram',
+    ]
+    for (route, method), (_, buckets, total, count) in sorted(snap['latency'].items()):
+        for bound, n in buckets:
+            lines.append(f'http_request_duration_seconds_bucket{_labels(route=route, method=method, le=_fmt_bound(bound))} {n}')
+        lines.append(f'http_request_duration_seconds_sum{_labels(route=route, method=method)} {total}')
+        lines.append(f'http_request_duration_seconds_count{_labels(route=route, method=method)} {count}')
+
+    lines += [
+        '# HELP http_requests_in_flight Requests currently being served.',
+        '# TYPE http_requests_in_flight gauge',
+        f"http_requests_in_flight {snap['in_flight']}",
+        '# HELP db_queries_total Database queries issued while serving a route.',
+        '# TYPE db_queries_total counter',
+    ]
+    for route, n in sorted(snap['db_queries'].items()):
+        lines.append(f'db_queries_total{_labels(route=route)} {n}')
+    lines += [
+        '# HELP db_query_seconds_total Time spent in database queries per route.',
+        '# TYPE db_query_seconds_total counter',
+    ]
+    for route, seconds in sorted(snap['db_seconds'].items()):
+        lines.append(f'db_query_seconds_total{_labels(route=route)} {seconds}')
+
+    lines += [
+        '# HELP cache_lookups_total Cache lookups by cache name and result.',
+        '# TYPE cache_lookups_total counter',
+    ]
+    for name, (hits, misses) in sorted(snap['lookups'].items()):
+        lines.append(f'cache_lookups_total{_labels(cache=name, result="hit")} {hits}')
+        lines.append(f'cache_lookups_total{_labels(cache=name, result="miss")} {misses}')
+    lines += [
+        '# HELP cache_hit_ratio Hits divided by lookups.',
+        '# TYPE cache_hit_ratio gauge',
+    ]
+    for name, (hits, misses) in sorted(snap['lookups'].items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'cache_hit_ratio{_labels(cache=name)} {ratio}')
+
+    proc = snap['process']
+    if proc['rss_bytes'] is not None:
+        lines += [
+            '# HELP process_resident_memory_bytes Resident memory size in bytes.',
+            '# TYPE process_resident_memory_bytes gauge',
+            f"process_resident_memory_bytes {proc['rss_bytes']}",
+        ]
+    if proc['startup_seconds'] is not None:
+        lines += [
+            '# HELP process_startup_seconds Time from process start until Django was ready.',
+            '# TYPE process_startup_seconds gauge',
+            f"process_startup_seconds {proc['startup_seconds']}",
+        ]
+    lines += [
+        '# HELP process_uptime_seconds Seconds since process start.',
+        '# TYPE process_uptime_seconds gauge',
+        f"process_uptime_seconds {proc['uptime_seconds']}",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def render_json(snap: dict) -> dict:
+    routes = {}
+    for (route, method), (bounds, buckets, total, count) in snap['latency'].items():
+        entry = routes.setdefault(route, {'methods': {}})
+        entry['methods'][method] = {
+            'count': count,
+            'sum_seconds': total,
+            'buckets': {_fmt_bound(b): n for b, n in buckets},
+            'statuses': {s: n for (r, m, s), n in snap['requests'].items() if r == route and m == method},
+        }
+    for route in routes:
+        routes[route]['db_queries'] = snap['db_queries'].get(route, 0)
+        routes[route]['db_seconds'] = snap['db_seconds'].get(route, 0.0)
+    caches = {
+        name: {'hits': hits, 'misses': misses, 'hit_ratio': hits / (hits + misses) if hits + misses else 0.0}
+        for name, (hits, misses) in snap['lookups'].items()
+    }
+    return {
+        'in_flight': snap['in_flight'],
+        'routes': routes,
+        'caches': caches,
+        'process': snap['process'],
+    }
@@ -0,0 +1,194 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+SALT = 'core.profiling'
+ENABLED = os.getenv('PROFILING_ENABLED', '0') == '1'
+PROFILE_DIR = Path(os.getenv('PROFILING_DIR') or settings.BASE_DIR / 'profiles')
+MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', '50'))
+SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+TOKEN_MAX_AGE = int(os.getenv('PROFILING_TOKEN_MAX_AGE', str(60 * 60 * 24)))
+# Comma-separated URL names (e.g. "api_project_detail"); empty means every view
+VIEWS = {v.strip() for v in os.getenv('PROFILING_VIEWS', '').split(',') if v.strip()}
+
+_NAME_RE = re.compile(r'^[\w.-]+\.prof$')
+_write_lock = threading.Lock()
+# cProfile hooks are process-wide on newer Pythons; profile one request at a time
+_profile_lock = threading.Lock()
+
+
+def make_token() -> str:
+    return signing.dumps({'scope': 'profile'}, salt=SALT)
+
+
+def token_valid(token: str) -> bool:
+    try:
+        return signing.loads(token, salt=SALT, max_age=TOKEN_MAX_AGE).get('scope') == 'profile'
+    except signing.BadSignature:
+        return False
+
+
+def _requested(request, user) -> bool:
+    token = request.headers.get('X-Profile-Token')
+    if token:
+        return token_valid(token)
+    wants = request.headers.get('X-Profile') == '1' or request.GET.get('_profile') == '1'
+    return wants and user.is_staff
+
+
+def _view_selected(request) -> bool:
+    match = request.resolver_match
+    return not VIEWS or (match is not None and match.view_name in VIEWS)
+
+
+def _prune() -> None:
+    profiles = sorted(PROFILE_DIR.glob('*.prof'))
+    for old in profiles[:max(0, len(profiles) - MAX_FILES)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix('.json').unlink(missing_ok=True)
+
+
+def save_profile(profiler: cProfile.Profile, meta: dict) -> str:
+    slug = re.sub(r'[^\w-]+', '_', meta['view'] or 'unmatched').strip('_')[:60]
+    now = time.time()
+    stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(now)) + f'{int(now * 1e6) % 1000000:06d}'
+    name = f"{stamp}-{uuid.uuid4().hex[:4]}-{meta['method']}-{slug}.prof"
+    with _write_lock:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        path = PROFILE_DIR / name
+        profiler.dump_stats(path)
+        path.with_suffix('.json').write_text(json.dumps(meta))
+        _prune()
+    return name
+
+
+def list_profiles() -> list:
+    items = []
+    for path in sorted(PROFILE_DIR.glob('*.prof'), reverse=True):
+        try:
+            meta = json.loads(path.with_suffix('.json').read_text())
+        except (OSError, ValueError):
+            meta = {}
+        items.append({'name': path.name, 'size': path.stat().st_size, **meta})
+    return items
+
+
+def profile_path(name: str) -> Path | None:
+    if not _NAME_RE.match(name):
+        return None
+    path = PROFILE_DIR / name
+    return path if path.is_file() else None
+
+
+def render_stats(path: Path, sort: str = 'cumulative', limit: int = 60) -> str:
+    out = io.StringIO()
+    stats = pstats.Stats(str(path), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """Profiles selected view calls with cProfile.
+
+    Removed from the stack entirely unless PROFILING_ENABLED=1. A request is
+    profiled when a staff user asks for it (``X-Profile: 1`` or
+    ``?_profile=1``), when it carries a valid ``X-Profile-Token`` (see the
+    ``profile_token`` command), or when PROFILING_SAMPLE_RATE picks it.
+    Must be the last entry in MIDDLEWARE so every other ``process_view``
+    (CSRF in particular) runs before the view is invoked here.
+
+    Under ASGI, async views are profiled while they are awaited, which also
+    counts other requests running on the event loop meanwhile. Under WSGI an
+    async view runs on another thread's event loop, out of the profiler's
+    sight, so it is not profiled.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+            # The handler awaits a coroutine process_view as is
+            self.process_view = self._aprocess_view
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    @staticmethod
+    def _wanted(request, user) -> bool:
+        if not _view_selected(request):
+            return False
+        return _requested(request, user) or bool(SAMPLE_RATE and random.random() < SAMPLE_RATE)
+
+    @staticmethod
+    def _meta(request, user, response, elapsed: float) -> dict:
+        return {
+            'path': request.path,
+            'method': request.method,
+            'view': request.resolver_match.view_name if request.resolver_match else None,
+            'user_id': user.pk,
+            'status': getattr(response, 'status_code', None),
+            'duration_ms': round(elapsed * 1000, 3),
+            'created': time.time(),
+        }
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if iscoroutinefunction(view_func) or not self._wanted(request, request.user):
+            return None
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            response = profiler.runcall(view_func, request, *view_args, **view_kwargs)
+            elapsed = time.perf_counter() - start
+        finally:
+            _profile_lock.release()
+        response['X-Profile-Id'] = save_profile(profiler, self._meta(request, request.user, response, elapsed))
+        return response
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        user = await request.auser()
+        if not self._wanted(request, user):
+            return None
+        if not _profile_lock.acquire(blocking=False):
+            return None
+        try:
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            if iscoroutinefunction(view_func):
+                profiler.enable()
+                try:
+                    response = await view_func(request, *view_args, **view_kwargs)
+                finally:
+                    profiler.disable()
+            else:
+                response = await sync_to_async(profiler.runcall)(view_func, request, *view_args, **view_kwargs)
+            elapsed = time.perf_counter() - start
+        finally:
+            _profile_lock.release()
+        meta = self._meta(request, user, response, elapsed)
+        response['X-Profile-Id'] = await sync_to_async(save_profile)(profiler, meta)
+        return response
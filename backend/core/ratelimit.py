@@ -0,0 +1,199 @@
+"""
+Admission control: per-client rate limits and a cap on requests in flight.
+
+Every client (the logged-in user, else the remote address) gets a token
+bucket per route and method class, refilled at RATE_LIMIT_READ per second
+(GET/HEAD/OPTIONS) or RATE_LIMIT_WRITE per second (everything else) up to
+the matching ``*_BURST``. An empty bucket answers ``429`` with a
+``Retry-After``. Views can set their own limits with ``@rate_limit`` or opt
+out with ``@rate_limit_exempt``.
+
+Buckets live in the process by default. RATE_LIMIT_STORE=cache keeps
+fixed-window counters in the shared cache (see ``core.caching``) instead, so
+the limits hold across workers at the cost of a cache round-trip per request.
+
+Independently, once MAX_IN_FLIGHT requests are being handled, further ones
+get ``503`` straight away rather than queueing behind them, which keeps
+latency bounded when load spikes.
+"""
+import math
+import os
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.core.cache import cache
+
+from .fastjson import FastJsonResponse
+
+READ_RATE = float(os.getenv('RATE_LIMIT_READ', '20'))
+READ_BURST = int(os.getenv('RATE_LIMIT_READ_BURST', '60'))
+WRITE_RATE = float(os.getenv('RATE_LIMIT_WRITE', '5'))
+WRITE_BURST = int(os.getenv('RATE_LIMIT_WRITE_BURST', '20'))
+# 'local' (per process) or 'cache' (shared by all workers)
+STORE = os.getenv('RATE_LIMIT_STORE', 'local')
+# Requests handled at once per process before shedding with 503; 0 disables
+MAX_IN_FLIGHT = int(os.getenv('MAX_IN_FLIGHT', '64'))
+MAX_BUCKETS = 10000
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def rate_limit(rate: float, burst: int, methods=None):
+    """Give a view its own limit (for ``methods``, default all of them)."""
+    def decorator(view):
+        limits = dict(getattr(view, 'rate_limits', {}))
+        for method in methods or ('*',):
+            limits[method.upper()] = (rate, burst)
+        view.rate_limits = limits
+        return view
+    return decorator
+
+
+def rate_limit_exempt(view):
+    """Skip both rate limits and the in-flight cap (health checks, metrics)."""
+    view.rate_limit_exempt = True
+    return view
+
+
+class TokenBuckets:
+    """In-process token buckets keyed by arbitrary strings."""
+
+    def __init__(self, max_buckets: int = MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    def take(self, key: str, rate: float, burst: int, now: float | None = None) -> float:
+        """Take a token: 0 on success, else seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, last, _ = self._buckets.get(key, (burst, now, rate))
+            tokens = min(burst, tokens + (now - last) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now, rate)
+                return 0.0
+            self._buckets[key] = (tokens, now, rate)
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+            return (1 - tokens) / rate
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled completely is the same as no bucket
+        full = [k for k, (tokens, last, rate) in self._buckets.items() if tokens + (now - last) * rate >= 1]
+        for key in full:
+            del self._buckets[key]
+
+
+buckets = TokenBuckets()
+
+
+def take_shared(key: str, rate: float, burst: int, now: float | None = None) -> float:
+    """Fixed-window approximation of ``TokenBuckets.take`` in the shared cache:
+    at most ``burst`` requests per ``burst / rate`` seconds."""
+    now = time.time() if now is None else now
+    period = burst / rate
+    window = int(now // period)
+    counter = f'ratelimit:{key}:{window}'
+    cache.add(counter, 0, math.ceil(period) + 1)
+    try:
+        count = cache.incr(counter)
+    except ValueError:  # evicted between add() and incr()
+        cache.set(counter, 1, math.ceil(period) + 1)
+        count = 1
+    return 0.0 if count <= burst else (window + 1) * period - now
+
+
+class _InFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def acquire(self, limit: int) -> bool:
+        with self._lock:
+            if self.count >= limit:
+                return False
+            self.count += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.count -= 1
+
+
+in_flight = _InFlight()
+
+
+def _client(request) -> str:
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'u{user.pk}'
+    return f"a{request.META.get('REMOTE_ADDR', '')}"
+
+
+def _limit(request, view_func):
+    limits = getattr(view_func, 'rate_limits', {})
+    limit = limits.get(request.method, limits.get('*'))
+    if limit is not None:
+        return limit
+    return (READ_RATE, READ_BURST) if request.method in SAFE_METHODS else (WRITE_RATE, WRITE_BURST)
+
+
+def _refuse(status: int, error: str, retry_after: float) -> FastJsonResponse:
+    response = FastJsonResponse({'error': error}, status=status)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class AdmissionMiddleware:
+    """Sheds load over MAX_IN_FLIGHT with 503 and rate-limits with 429.
+
+    Both decisions are made in ``process_view``, once the view (and so any
+    exemption or per-view limit) is known; nothing is counted for requests
+    that do not resolve to a view.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self._release(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            self._release(request)
+
+    @staticmethod
+    def _release(request) -> None:
+        if getattr(request, '_admitted', False):
+            in_flight.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, 'rate_limit_exempt', False):
+            return None
+        if MAX_IN_FLIGHT > 0:
+            if not in_flight.acquire(MAX_IN_FLIGHT):
+                return _refuse(503, 'server busy', 1)
+            request._admitted = True
+        rate, burst = _limit(request, view_func)
+        if rate <= 0 or burst <= 0:
+            return None
+        method_class = 'r' if request.method in SAFE_METHODS else 'w'
+        key = f'{_client(request)}:{request.resolver_match.route}:{method_class}'
+        take = take_shared if STORE == 'cache' else buckets.take
+        retry_after = take(key, rate, burst)
+        if retry_after:
+            return _refuse(429, 'rate limit exceeded', retry_after)
+        return None
@@ -0,0 +1,99 @@
+"""
+Event-driven code reloading for ``runserver``.
+
+Django's ``StatReloader`` stats every imported module about once a second,
+which costs CPU even when nothing changes and delays reloads by up to a
+second. ``WatchfilesReloader`` waits on filesystem events (inotify, FSEvents,
+ReadDirectoryChangesW) through the optional ``watchfiles`` package. It
+watches only the backend's Python sources and templates, so database files,
+media, collected static files and virtualenvs never trigger a reload. Template edits
+still only reset the template loaders, as with Django's own reloaders.
+"""
+import logging
+import os
+import signal
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import autoreload
+
+try:
+    import watchfiles
+except ImportError:  # optional; Django's StatReloader is used without it
+    watchfiles = None
+
+logger = logging.getLogger('django.utils.autoreload')
+
+# Milliseconds of quiet before a batch of changes is reported
+DEBOUNCE_MS = int(os.getenv('RELOAD_DEBOUNCE_MS', '50'))
+# On top of watchfiles' own list (.git, .venv, caches, ...); the README puts
+# the virtualenv in backend/.venv, under BASE_DIR
+IGNORED_DIRS = {'media', 'staticfiles', 'node_modules', '__pycache__', '.venv', 'venv', 'env',
+                '.git', '.mypy_cache', '.pytest_cache'}
+
+
+def available() -> bool:
+    return watchfiles is not None
+
+
+def _roots() -> list:
+    """BASE_DIR plus any template directory outside it, without nesting."""
+    base = Path(settings.BASE_DIR).resolve()
+    roots = [base]
+    for engine in settings.TEMPLATES:
+        for directory in engine.get('DIRS', []):
+            directory = Path(directory).resolve()
+            if directory.is_dir() and not directory.is_relative_to(base):
+                roots.append(directory)
+    return roots
+
+
+class WatchfilesReloader(autoreload.BaseReloader):
+    def __init__(self):
+        super().__init__()
+        self._default_filter = watchfiles.DefaultFilter(
+            ignore_dirs=(*watchfiles.DefaultFilter.ignore_dirs, *IGNORED_DIRS),
+        )
+
+    def _template_dirs(self) -> list:
+        # Registered by django.template.autoreload on autoreload_started
+        return [directory.resolve() for directory in self.directory_globs]
+
+    def _relevant(self, change, path: str) -> bool:
+        if not self._default_filter(change, path):
+            return False
+        path = Path(path)
+        if path.suffix == '.py':
+            return True
+        return any(path.is_relative_to(directory) for directory in self._template_dirs())
+
+    def tick(self):
+        changes = watchfiles.watch(
+            *_roots(),
+            watch_filter=self._relevant,
+            debounce=DEBOUNCE_MS,
+            stop_event=self._stop_condition,
+            # Return regularly so run_loop() can notice stop()
+            rust_timeout=1000,
+            yield_on_timeout=True,
+            raise_interrupt=False,
+        )
+        for batch in changes:
+            for _, path in sorted(batch):
+                self.notify_file_changed(Path(path))
+            yield
+
+
+def run_with_reloader(main_func, *args, **kwargs):
+    """``autoreload.run_with_reloader`` with ``WatchfilesReloader``."""
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        if os.environ.get(autoreload.DJANGO_AUTORELOAD_ENV) == 'true':
+            reloader = WatchfilesReloader()
+            logger.info('Watching for file changes with %s', reloader.__class__.__name__)
+            autoreload.start_django(reloader, main_func, *args, **kwargs)
+        else:
+            sys.exit(autoreload.restart_with_reloader())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,166 @@
+"""
+Optional read replicas of the ``default`` database.
+
+With DATABASE_REPLICA_URLS set (comma-separated, same syntax as
+DATABASE_URL), settings adds databases ``replica0`` … ``replica<N-1>`` and
+installs ``ReplicaRouter``. During a request, reads of project and preference
+rows go to one replica picked for that request; writes, and every read of
+auth and session rows, stay on ``default``.
+
+A client that has just written reads from ``default`` for
+REPLICA_STICKY_SECONDS afterwards (a cookie carries the deadline), so it
+always sees its own changes while the replicas catch up. So does everything
+else in a request with an unsafe method, code inside a transaction on
+``default``, and anything outside a request (commands, background threads).
+
+Locally, SQLite files refreshed by ``manage.py sync_replicas`` stand in for
+streaming replicas; keep the sticky window longer than the sync interval.
+Replicas cover the unsharded layout; with DB_SHARDS, sharded rows are left
+to ``core.sharding.ShardRouter``.
+"""
+import contextvars
+import os
+import random
+import sqlite3
+import time
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from . import maintenance, sharding
+
+REPLICA_ALIASES = [f'replica{n}' for n in range(len(getattr(settings, 'DATABASE_REPLICA_URLS', [])))]
+REPLICATED_APPS = {'projects', 'preferences'}
+STICKY_SECONDS = float(os.getenv('REPLICA_STICKY_SECONDS', '10'))
+STICKY_COOKIE = 'primary_until'
+
+
+def enabled() -> bool:
+    return bool(REPLICA_ALIASES)
+
+
+class _RequestState:
+    __slots__ = ('replica', 'wrote')
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+# None outside requests, which keeps those reads on the primary
+_state = contextvars.ContextVar('replica_state', default=None)
+
+
+def _sticky(request) -> bool:
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaMiddleware:
+    """Picks the replica a request reads from and sets the sticky cookie
+    after it writes."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not REPLICA_ALIASES:
+            return self.get_response(request)
+        state, token = self._begin(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    async def __acall__(self, request):
+        if not REPLICA_ALIASES:
+            return await self.get_response(request)
+        state, token = self._begin(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._finish(state, response)
+
+    def _begin(self, request):
+        primary = request.method not in ('GET', 'HEAD', 'OPTIONS') or _sticky(request)
+        state = _RequestState(None if primary else random.choice(REPLICA_ALIASES))
+        return state, _state.set(state)
+
+    def _finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + STICKY_SECONDS:.3f}', max_age=max(1, round(STICKY_SECONDS)),
+                httponly=True, samesite='Lax', secure=settings.SESSION_COOKIE_SECURE,
+            )
+        return response
+
+
+def _replicated(model) -> bool:
+    return model._meta.app_label in REPLICATED_APPS and not (sharding.enabled() and sharding.is_sharded(model))
+
+
+class ReplicaRouter:
+    """Sends reads of REPLICATED_APPS to the request's replica and every
+    write to ``default``."""
+
+    def db_for_read(self, model, **hints):
+        if not _replicated(model):
+            return None
+        state = _state.get()
+        if state is None or state.replica is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        if not _replicated(model):
+            return None
+        state = _state.get()
+        if state is not None:
+            # Read-your-writes: the rest of this request, then the sticky window
+            state.replica = None
+            state.wrote = True
+        # Instances read from a replica are saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        group = {DEFAULT_DB_ALIAS, *REPLICA_ALIASES}
+        if obj1._state.db in group and obj2._state.db in group:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas are copies of default, never migrated on their own
+        return False if db in REPLICA_ALIASES else None
+
+
+def sync(alias: str, pages: int = maintenance.BACKUP_PAGES) -> Path:
+    """Refresh the SQLite replica ``alias`` with an online copy of ``default``.
+
+    The copy replaces the replica file atomically; connections already open
+    on it finish on the old copy.
+    """
+    dest = maintenance.database_path(alias)
+    tmp = dest.with_name(dest.name + '.sync')
+    maintenance.backup(tmp, DEFAULT_DB_ALIAS, pages)
+    # A rollback journal, so readers never leave a -wal file behind that a
+    # later copy would be paired with
+    conn = sqlite3.connect(tmp)
+    try:
+        conn.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        conn.close()
+    os.replace(tmp, dest)
+    return dest
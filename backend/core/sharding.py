@@ -0,0 +1,299 @@
+"""
+Optional per-user sharding of project and preference data.
+
+With DB_SHARDS=N, settings adds databases ``shard0`` … ``shard<N-1>`` (one
+SQLite file each) and installs ``ShardRouter``. Every row owned by a user
+(projects, their revisions, blobs and attachments, and preferences) lives in
+the shard picked by a jump consistent hash of the user id, so writers for
+different users no longer queue on one file lock. Auth, sessions and admin
+stay in ``default``. Unsharded (the default), everything routes to
+``default`` and ``db_for_user`` costs nothing.
+
+Queries without an instance to route by must name their user, which is what
+``for_user()`` on the owning models does. Each shard hands out ids from its
+own range (``ID_BLOCK``), so ids stay unique across shards and survive
+``rebalance_shards`` moving a user after the shard count changes.
+"""
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
+
+SHARD_ALIASES = [f'shard{n}' for n in range(getattr(settings, 'DB_SHARDS', 0))]
+SHARDED_APPS = {'projects', 'preferences'}
+# Ids below the first block belong to rows created before sharding was enabled
+ID_BLOCK = 1 << 40
+
+# Everything that follows its owner between shards, parents first, with the
+# lookup from each model to the owning user's id
+OWNED_MODELS = [
+    ('projects.DataBlob', 'projects__user_id'),
+    ('projects.StoredFile', 'attachments__project__user_id'),
+    ('projects.Project', 'user_id'),
+    ('projects.ProjectRevision', 'project__user_id'),
+    ('projects.Attachment', 'project__user_id'),
+    ('projects.UploadSession', 'project__user_id'),
+    ('preferences.UserPreference', 'user_id'),
+]
+
+
+def enabled() -> bool:
+    return bool(SHARD_ALIASES)
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Lamping & Veach's jump consistent hash: growing from N to N+1 buckets
+    moves only ~1/(N+1) of the keys."""
+    key &= 0xFFFFFFFFFFFFFFFF
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def user_fk_options() -> dict:
+    """``on_delete`` and ``db_constraint`` for an owned model's user field.
+
+    Unsharded, the database enforces the FK and the ORM cascades as usual.
+    With DB_SHARDS the user row lives in another database, so there is no
+    constraint and the owning app's ``pre_delete`` receiver deletes the rows.
+    """
+    if SHARD_ALIASES:
+        return {'on_delete': models.DO_NOTHING, 'db_constraint': False}
+    return {'on_delete': models.CASCADE}
+
+
+class _OwnerField:
+    """Applies ``user_fk_options()`` and keeps them out of migration state.
+
+    Migrations therefore read the same whatever DB_SHARDS was when they were
+    written. The migration that introduced them, and ``rebalance_shards``,
+    run ``user_constraint_matches`` to bring the live schema in line.
+    """
+
+    def __init__(self, to, **kwargs):
+        kwargs.update(user_fk_options())
+        super().__init__(to, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop('on_delete', None)
+        kwargs.pop('db_constraint', None)
+        return name, path, args, kwargs
+
+
+class OwnerForeignKey(_OwnerField, models.ForeignKey):
+    pass
+
+
+class OwnerOneToOneField(_OwnerField, models.OneToOneField):
+    pass
+
+
+def user_constraint_matches(model, schema_editor) -> None:
+    """Add or drop the FK on ``model.user`` to match ``user_fk_options()``.
+
+    Inspects the live table rather than migration state, which cannot tell
+    whether the table was last migrated with or without DB_SHARDS.
+    """
+    connection = schema_editor.connection
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return  # the app lives in other databases
+        constraints = connection.introspection.get_constraints(cursor, table)
+    field = model._meta.get_field('user')
+    has_fk = any(c['foreign_key'] and c['columns'] == [field.column] for c in constraints.values())
+    if has_fk != field.db_constraint:
+        # Plain fields, as the owner fields hide db_constraint from the diff
+        schema_editor.alter_field(model, _plain_user_field(model, has_fk), _plain_user_field(model, field.db_constraint))
+
+
+def _plain_user_field(model, db_constraint: bool) -> models.ForeignKey:
+    field = model._meta.get_field('user')
+    cls = models.OneToOneField if field.one_to_one else models.ForeignKey
+    plain = cls(field.remote_field.model, on_delete=models.DO_NOTHING, db_constraint=db_constraint)
+    plain.set_attributes_from_name(field.name)
+    plain.model = model
+    return plain
+
+
+def db_for_user(user) -> str:
+    """Alias of the database holding ``user``'s rows (a user or a user id)."""
+    if not SHARD_ALIASES:
+        return DEFAULT_DB_ALIAS
+    user_id = getattr(user, 'pk', user)
+    return SHARD_ALIASES[jump_hash(int(user_id), len(SHARD_ALIASES))]
+
+
+def is_sharded(model) -> bool:
+    """True for models (or instances) of SHARDED_APPS."""
+    return model._meta.app_label in SHARDED_APPS
+
+
+def databases_for(model) -> list:
+    """Every alias that can hold rows of ``model``."""
+    if SHARD_ALIASES and is_sharded(model):
+        return list(SHARD_ALIASES)
+    return [DEFAULT_DB_ALIAS]
+
+
+_pinned = contextvars.ContextVar('pinned_shard', default=None)
+
+
+@contextmanager
+def pinned(alias: str | None):
+    """Route queries that carry no instance hint to ``alias`` for a while."""
+    token = _pinned.set(alias)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class UserShardedManager(models.Manager):
+    def for_user(self, user):
+        """Rows owned by ``user``. The ``user`` hint lets the routers pick
+        their shard (or a read replica, see ``core.replicas``)."""
+        return self.db_manager(hints={'user': user}).filter(user=user)
+
+
+class ShardRouter:
+    """Routes models of SHARDED_APPS by the user that owns the instance."""
+
+    def _db_for(self, model, **hints):
+        instance = hints.get('instance')
+        if not is_sharded(model):
+            # e.g. ``project.user``: the user is in default, not the project's shard
+            return DEFAULT_DB_ALIAS if instance is not None and is_sharded(instance) else None
+        if instance is None:
+            user = hints.get('user')
+            return _pinned.get() if user is None else db_for_user(user)
+        if is_sharded(instance) and instance._state.db:
+            return instance._state.db
+        if isinstance(instance, get_user_model()):
+            return db_for_user(instance.pk)
+        user_id = getattr(instance, 'user_id', None)
+        if user_id is not None:
+            return db_for_user(user_id)
+        return instance._state.db
+
+    db_for_read = _db_for
+    db_for_write = _db_for
+
+    def allow_relation(self, obj1, obj2, **hints):
+        sharded1, sharded2 = is_sharded(obj1), is_sharded(obj2)
+        if sharded1 and sharded2:
+            return obj1._state.db is None or obj2._state.db is None or obj1._state.db == obj2._state.db
+        if sharded1 or sharded2:
+            # Owned rows point at their user in ``default`` (no FK constraint)
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in SHARD_ALIASES:
+            return app_label in SHARDED_APPS
+        if db == DEFAULT_DB_ALIAS and SHARD_ALIASES:
+            return app_label not in SHARDED_APPS
+        return None
+
+
+def seed_sequences(sender, using=DEFAULT_DB_ALIAS, **kwargs) -> None:
+    """``post_migrate`` hook: start each shard's ids in its own ID_BLOCK."""
+    if using not in SHARD_ALIASES or sender.label not in SHARDED_APPS or connections[using].vendor != 'sqlite':
+        return
+    start = (SHARD_ALIASES.index(using) + 1) * ID_BLOCK
+    with connections[using].cursor() as cursor:
+        for model in sender.get_models():
+            if not isinstance(model._meta.pk, models.AutoField):
+                continue
+            table = model._meta.db_table
+            cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s', [start, table, start])
+            cursor.execute(
+                'INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s '
+                'WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = %s)',
+                [table, start, table],
+            )
+
+
+# -- rebalancing ------------------------------------------------------------
+
+def owners(using: str) -> set:
+    """Ids of the users with rows in ``using``."""
+    from django.apps import apps
+
+    ids = set()
+    for label, lookup in OWNED_MODELS:
+        if lookup == 'user_id':
+            ids.update(apps.get_model(label).objects.using(using).values_list('user_id', flat=True).distinct())
+    return ids
+
+
+def _owned(user_id: int, using: str):
+    from django.apps import apps
+
+    for label, lookup in OWNED_MODELS:
+        model = apps.get_model(label)
+        pks = model.objects.using(using).filter(**{lookup: user_id}).values('pk')
+        yield model, model.objects.using(using).filter(pk__in=pks)
+
+
+def _select(qs):
+    """SQL for the raw column values of ``qs``: copied as stored, so
+    auto_now timestamps and offloaded data keep their values."""
+    fields = qs.model._meta.concrete_fields
+    qs = qs.values_list(*(f.attname for f in fields))
+    sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+    return [f.column for f in fields], sql, params
+
+
+def _delete(cursor, qs) -> None:
+    meta = qs.model._meta
+    qs = qs.values('pk')
+    sql, params = qs.query.get_compiler(using=qs.db).as_sql()
+    cursor.execute(f'DELETE FROM {meta.db_table} WHERE {meta.pk.column} IN ({sql})', params)
+
+
+def move_user(user_id: int, source: str, target: str) -> int:
+    """Copy every row ``user_id`` owns from ``source`` to ``target``, then delete
+    it from ``source``. Returns the number of projects moved.
+
+    Rows are copied first and conflicts ignored, so a move interrupted
+    between the two steps is completed by running it again.
+    """
+    from projects import search
+    from projects.models import DataBlob, Project, StoredFile
+
+    owned = list(_owned(user_id, source))
+    with transaction.atomic(using=target), connections[target].cursor() as out:
+        with connections[source].cursor() as cursor:
+            for model, qs in owned:
+                columns, sql, params = _select(qs)
+                cursor.execute(sql, params)
+                insert = (f'INSERT INTO {model._meta.db_table} ({", ".join(columns)}) '
+                          f'VALUES ({", ".join(["%s"] * len(columns))}) ON CONFLICT DO NOTHING')
+                while rows := cursor.fetchmany(500):
+                    out.executemany(insert, rows)
+        search.index_projects(Project.objects.using(target).filter(user_id=user_id).iterator(), target)
+
+    moved_blobs = list(dict(owned)[DataBlob].values_list('pk', flat=True))
+    moved_files = list(dict(owned)[StoredFile].values_list('pk', flat=True))
+    project_ids = list(Project.objects.using(source).filter(user_id=user_id).values_list('pk', flat=True))
+    with transaction.atomic(using=source), connections[source].cursor() as cursor:
+        # Raw deletes: the rows live on in ``target``, so no delete signals
+        # (events, search, attachment file cleanup) may fire for them
+        for model, qs in reversed(owned):
+            if model not in (DataBlob, StoredFile):
+                _delete(cursor, qs)
+        for pk in project_ids:
+            search.unindex_project(pk, source)
+        # Content still shared with other users' projects in ``source`` stays
+        if moved_blobs:
+            _delete(cursor, DataBlob.objects.using(source).filter(pk__in=moved_blobs, projects__isnull=True))
+        if moved_files:
+            _delete(cursor, StoredFile.objects.using(source).filter(pk__in=moved_files, attachments__isnull=True))
+    return len(project_ids)
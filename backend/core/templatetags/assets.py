@@ -0,0 +1,25 @@
+import logging
+
+from django import template
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+from core import assets
+
+logger = logging.getLogger(__name__)
+
+register = template.Library()
+
+
+@register.simple_tag
+def stylesheet_bundle():
+    path = assets.bundle_path()
+    if path is None:
+        # Never fall back to a CDN: the app has to work offline
+        if settings.DEBUG:
+            raise ImproperlyConfigured('No CSS bundle; run `python manage.py build_css`')
+        logger.error('No CSS bundle; run `python manage.py build_css`')
+        return ''
+    return format_html('<link href="{}" rel="stylesheet" type="text/css" />', static(path))
@@ -0,0 +1,28 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core import assets
+
+TEMPLATE = Template('{% load assets %}{% stylesheet_bundle %}')
+
+
+class StylesheetBundleTests(SimpleTestCase):
+    def render(self, path):
+        with mock.patch.object(assets, 'bundle_path', return_value=path):
+            return TEMPLATE.render(Context())
+
+    def test_bundle(self):
+        self.assertEqual(self.render('css/app.0123456789ab.css'),
+                         '<link href="/static/css/app.0123456789ab.css" rel="stylesheet" type="text/css" />')
+
+    def test_missing_bundle_loads_nothing_remote(self):
+        with self.assertLogs('core.templatetags.assets', 'ERROR'):
+            self.assertEqual(self.render(None), '')
+
+    @override_settings(DEBUG=True)
+    def test_missing_bundle_raises_in_debug(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.render(None)
@@ -0,0 +1,69 @@
+import tempfile
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from core import daemon
+from core.locks import FileLock
+
+
+class TempDaemonFile:
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'daemon.json'
+
+    def hold_lock(self):
+        lock = FileLock(daemon._lock_path(self.path))
+        self.assertTrue(lock.acquire())
+        self.addCleanup(lock.release)
+
+
+class StateTests(TempDaemonFile, SimpleTestCase):
+    def test_stale_file_without_lock(self):
+        self.path.write_text('{"pid": 1, "url": "http://127.0.0.1:1"}')
+        self.assertIsNone(daemon.read_state(self.path))
+
+    def test_locked(self):
+        self.hold_lock()
+        self.assertIsNone(daemon.read_state(self.path))  # still starting up
+        self.path.write_text('{"pid": 1, "url": "http://127.0.0.1:1"}')
+        self.assertEqual(daemon.read_state(self.path), {'pid': 1, 'url': 'http://127.0.0.1:1'})
+
+    def test_serve_refuses_a_second_daemon(self):
+        self.hold_lock()
+        self.enterContext(mock.patch.object(daemon, 'LOCK_WAIT', 0))
+        with self.assertRaises(daemon.AlreadyRunning):
+            daemon.serve(path=self.path, idle_timeout=0.1)
+        self.assertFalse(self.path.exists())
+
+
+class ActivityTests(SimpleTestCase):
+    def test_open_stream_is_not_idle(self):
+        def app(environ, start_response):
+            start_response('200 OK', [])
+            yield b'event'
+            yield b'event'
+
+        activity = daemon.Activity(app)
+        response = activity({}, lambda status, headers: None)
+        chunks = iter(response)
+        next(chunks)
+        time.sleep(0.05)
+        self.assertEqual(activity.idle_for(), 0.0)
+        response.close()
+        time.sleep(0.05)
+        self.assertGreater(activity.idle_for(), 0.0)
+        self.assertEqual(activity.active, 0)
+
+
+class ServeTests(TempDaemonFile, TestCase):
+    def test_exits_when_idle(self):
+        seen = []
+        daemon.serve(path=self.path, idle_timeout=0.3, on_ready=lambda state: seen.append(daemon.read_state(self.path)))
+        self.assertEqual(len(seen), 1)
+        self.assertTrue(seen[0]['url'].startswith('http://127.0.0.1:'))
+        self.assertFalse(self.path.exists())
+        self.assertIsNone(daemon.read_state(self.path))
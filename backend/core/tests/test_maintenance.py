@@ -0,0 +1,111 @@
+import sqlite3
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.db import connections
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase
+
+from core import maintenance
+from core.locks import FileLock
+
+
+class MaintenanceTestCase(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+
+class PrepareDatabaseTests(MaintenanceTestCase):
+    def prepare(self, path):
+        wrapper = DatabaseWrapper({**connections['default'].settings_dict, 'NAME': str(path)}, alias='other')
+        try:
+            with mock.patch.object(maintenance, 'connections', {'other': wrapper}):
+                maintenance.prepare_database(None, using='other')
+        finally:
+            wrapper.close()
+
+    def pragmas(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('PRAGMA journal_mode').fetchone()[0], conn.execute('PRAGMA auto_vacuum').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_new_database(self):
+        path = self.dir / 'new.sqlite3'
+        self.prepare(path)
+        self.assertEqual(self.pragmas(path), ('wal', 2))
+
+    def test_existing_database_keeps_auto_vacuum(self):
+        path = self.dir / 'old.sqlite3'
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE t (x)')
+        conn.close()
+        self.prepare(path)
+        self.prepare(path)
+        self.assertEqual(self.pragmas(path), ('wal', 0))
+
+
+class BackupTests(MaintenanceTestCase):
+    def make_database(self, journal_mode):
+        path = self.dir / 'src.sqlite3'
+        conn = sqlite3.connect(path, isolation_level=None)
+        conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+        conn.execute('CREATE TABLE t (x)')
+        conn.executemany('INSERT INTO t VALUES (?)', [(b'x' * 1000,)] * 500)
+        self.addCleanup(conn.close)
+        return path, conn
+
+    def backup(self, path, writes, progress_writer):
+        calls = []
+
+        def progress(status, remaining, total):
+            # Every write from another connection restarts the copy
+            if len(calls) < writes:
+                progress_writer.execute('INSERT INTO t VALUES (1)')
+            calls.append(remaining)
+
+        with mock.patch.object(maintenance, 'database_path', return_value=path), \
+                mock.patch.object(maintenance, 'BACKUP_MAX_RESTARTS', 2), \
+                mock.patch.object(maintenance, 'BACKUP_MAX_BACKOFF', 0.001):
+            dest = maintenance.backup(self.dir / 'copy.sqlite3', pages=4, progress=progress)
+        self.assertFalse((self.dir / 'copy.sqlite3.tmp').exists())
+        return dest, calls
+
+    def rows(self, path):
+        conn = sqlite3.connect(path)
+        try:
+            return conn.execute('SELECT COUNT(*) FROM t').fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_wal_falls_back_to_one_step(self):
+        path, conn = self.make_database('wal')
+        with self.assertLogs('core.maintenance', 'INFO') as logs:
+            dest, calls = self.backup(path, writes=1000, progress_writer=conn)
+        self.assertIn('in one step', logs.output[0])
+        self.assertEqual(self.rows(dest), self.rows(path))
+
+    def test_rollback_journal_keeps_stepping(self):
+        path, conn = self.make_database('delete')
+        with mock.patch.object(maintenance.time, 'sleep') as sleep:
+            dest, calls = self.backup(path, writes=20, progress_writer=conn)
+        self.assertTrue(sleep.called)
+        self.assertGreater(len(calls), 20)
+        self.assertEqual(self.rows(dest), 520)
+
+
+class SchedulerTests(MaintenanceTestCase):
+    def test_one_leader(self):
+        path = self.dir / 'db.sqlite3.maintenance.lock'
+        first = maintenance.Scheduler(60, lock=FileLock(path))
+        second = maintenance.Scheduler(60, lock=FileLock(path))
+        self.addCleanup(second.stop)
+        self.assertTrue(first.leading())
+        self.assertTrue(first.leading())
+        self.assertFalse(second.leading())
+        first.stop()
+        self.assertTrue(second.leading())
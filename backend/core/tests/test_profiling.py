@@ -0,0 +1,76 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory, RequestFactory, SimpleTestCase
+
+from core import profiling
+
+
+def sync_view(request):
+    return HttpResponse('sync')
+
+
+async def async_view(request):
+    return HttpResponse('async')
+
+
+async def async_get_response(request):
+    return HttpResponse('unprofiled')
+
+
+class ProfilingMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for name, value in (('ENABLED', True), ('PROFILE_DIR', Path(directory.name))):
+            patcher = mock.patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.staff = User(pk=1, username='staff', is_staff=True)
+
+    def _async_request(self):
+        request = AsyncRequestFactory().get('/api/projects/', {'_profile': '1'})
+        request.resolver_match = None
+
+        async def auser():
+            return self.staff
+
+        request.auser = auser
+        return request
+
+    async def test_async_view_under_asgi(self):
+        middleware = profiling.ProfilingMiddleware(async_get_response)
+        response = await middleware.process_view(self._async_request(), async_view, (), {})
+        self.assertEqual(response.content, b'async')
+        self.assertIsNotNone(profiling.profile_path(response['X-Profile-Id']))
+
+    async def test_sync_view_under_asgi(self):
+        middleware = profiling.ProfilingMiddleware(async_get_response)
+        response = await middleware.process_view(self._async_request(), sync_view, (), {})
+        self.assertEqual(response.content, b'sync')
+        self.assertIn('X-Profile-Id', response)
+
+    def test_sync_view_under_wsgi(self):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/', {'_profile': '1'})
+        request.resolver_match = None
+        request.user = self.staff
+        response = middleware.process_view(request, sync_view, (), {})
+        self.assertIn('X-Profile-Id', response)
+
+    def test_async_view_under_wsgi_passes_through(self):
+        middleware = profiling.ProfilingMiddleware(lambda request: HttpResponse())
+        request = RequestFactory().get('/', {'_profile': '1'})
+        request.resolver_match = None
+        request.user = self.staff
+        self.assertIsNone(middleware.process_view(request, async_view, (), {}))
+
+    async def test_not_requested(self):
+        middleware = profiling.ProfilingMiddleware(async_get_response)
+        request = self._async_request()
+        request.GET = request.GET.copy()
+        del request.GET['_profile']
+        self.assertIsNone(await middleware.process_view(request, async_view, (), {}))
@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase, TestCase
+
+from core import ratelimit
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_burst_then_refill(self):
+        buckets = ratelimit.TokenBuckets()
+        self.assertEqual([buckets.take('k', 2, 3, now=0) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(buckets.take('k', 2, 3, now=0), 0.5)
+        self.assertAlmostEqual(buckets.take('k', 2, 3, now=0.25), 0.25)
+        self.assertEqual(buckets.take('k', 2, 3, now=0.5), 0)
+        # Refills up to the burst, not beyond
+        self.assertEqual([buckets.take('k', 2, 3, now=100) for _ in range(3)], [0, 0, 0])
+        self.assertGreater(buckets.take('k', 2, 3, now=100), 0)
+
+    def test_keys_are_independent(self):
+        buckets = ratelimit.TokenBuckets()
+        self.assertEqual(buckets.take('a', 1, 1, now=0), 0)
+        self.assertGreater(buckets.take('a', 1, 1, now=0), 0)
+        self.assertEqual(buckets.take('b', 1, 1, now=0), 0)
+
+    def test_prunes_full_buckets(self):
+        buckets = ratelimit.TokenBuckets(max_buckets=2)
+        for key in 'abc':
+            buckets.take(key, 1, 1, now=0)
+            buckets.take(key, 1, 1, now=0)
+        self.assertEqual(len(buckets._buckets), 3)
+        buckets.take('d', 1, 1, now=10)
+        buckets.take('d', 1, 1, now=10)
+        self.assertEqual(list(buckets._buckets), ['d'])
+
+
+class SharedWindowTests(SimpleTestCase):
+    def test_fixed_window(self):
+        with mock.patch.object(ratelimit, 'cache', LocMemCache('ratelimit-tests', {})):
+            self.assertEqual([ratelimit.take_shared('k', 1, 2, now=10.5) for _ in range(2)], [0, 0])
+            self.assertAlmostEqual(ratelimit.take_shared('k', 1, 2, now=10.5), 1.5)
+            self.assertEqual(ratelimit.take_shared('k', 1, 2, now=12), 0)
+
+
+class MiddlewareTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(ratelimit, 'buckets', ratelimit.TokenBuckets()))
+        self.enterContext(mock.patch.object(ratelimit, 'STORE', 'local'))
+        self.client.force_login(User.objects.create_user('alice', password='p'))
+
+    def test_per_view_limit(self):
+        # The export view allows a burst of 2
+        for _ in range(2):
+            self.assertEqual(self.client.get('/api/projects/export/').status_code, 200)
+        response = self.client.get('/api/projects/export/')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_default_limit_and_exemption(self):
+        with mock.patch.object(ratelimit, 'READ_BURST', 1), mock.patch.object(ratelimit, 'MAX_IN_FLIGHT', 0):
+            for _ in range(3):
+                self.assertEqual(self.client.get('/api/health/live/').status_code, 200)
+            self.assertEqual(self.client.get('/api/projects/').status_code, 200)
+            self.assertEqual(self.client.get('/api/projects/').status_code, 429)
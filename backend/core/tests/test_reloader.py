@@ -0,0 +1,34 @@
+from pathlib import Path
+from unittest import skipUnless
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from core import reloader
+
+BASE_DIR = Path(settings.BASE_DIR).resolve()
+
+
+@skipUnless(reloader.available(), 'watchfiles is not installed')
+class RelevantTests(SimpleTestCase):
+    def setUp(self):
+        self.reloader = reloader.WatchfilesReloader()
+
+    def relevant(self, *parts):
+        return self.reloader._relevant(reloader.watchfiles.Change.modified, str(BASE_DIR.joinpath(*parts)))
+
+    def test_python_sources(self):
+        self.assertTrue(self.relevant('core', 'reloader.py'))
+        self.assertFalse(self.relevant('db.sqlite3'))
+        self.assertFalse(self.relevant('core', '__pycache__', 'reloader.cpython-311.pyc'))
+
+    def test_ignored_dirs(self):
+        for directory in ('.venv', 'venv', 'env', '.git', '.mypy_cache', '.pytest_cache', '.tox', 'media'):
+            with self.subTest(directory=directory):
+                self.assertFalse(self.relevant(directory, 'lib', 'site.py'))
+
+    def test_templates(self):
+        template_dir = BASE_DIR / 'templates'
+        self.reloader.watch_dir(template_dir, '**/*')
+        self.assertTrue(self.relevant('templates', 'base.html'))
+        self.assertFalse(self.relevant('static', 'app.css'))
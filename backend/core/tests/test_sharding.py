@@ -0,0 +1,98 @@
+from django.db import connection, models
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+
+from core import sharding
+from preferences.models import UserPreference
+from projects.models import Project
+
+
+class JumpHashTests(SimpleTestCase):
+    def test_in_range_and_stable(self):
+        for buckets in (1, 2, 7, 64):
+            for key in range(500):
+                bucket = sharding.jump_hash(key, buckets)
+                self.assertTrue(0 <= bucket < buckets)
+                self.assertEqual(sharding.jump_hash(key, buckets), bucket)
+
+    def test_known_values(self):
+        # Pinned so existing users never silently move shard
+        self.assertEqual([sharding.jump_hash(key, 10) for key in range(10)], [0, 6, 6, 8, 1, 4, 9, 0, 4, 7])
+
+    def test_growing_moves_keys_only_to_the_new_bucket(self):
+        keys = range(10000)
+        for buckets in (1, 2, 5, 9):
+            moved = 0
+            for key in keys:
+                before, after = sharding.jump_hash(key, buckets), sharding.jump_hash(key, buckets + 1)
+                if before != after:
+                    self.assertEqual(after, buckets)
+                    moved += 1
+            expected = len(keys) / (buckets + 1)
+            self.assertLess(abs(moved - expected), expected * 0.1)
+
+    def test_spread(self):
+        counts = [0] * 4
+        for key in range(8000):
+            counts[sharding.jump_hash(key, 4)] += 1
+        self.assertTrue(all(1800 < count < 2200 for count in counts), counts)
+
+
+class UserFkTests(SimpleTestCase):
+    def test_constraint_and_cascade_unless_sharded(self):
+        sharded = sharding.enabled()
+        for model in (Project, UserPreference):
+            field = model._meta.get_field('user')
+            self.assertIs(field.db_constraint, not sharded)
+            self.assertIs(field.remote_field.on_delete, models.DO_NOTHING if sharded else models.CASCADE)
+
+    def test_options_stay_out_of_migrations(self):
+        for model in (Project, UserPreference):
+            name, path, args, kwargs = model._meta.get_field('user').deconstruct()
+            self.assertNotIn('on_delete', kwargs)
+            self.assertNotIn('db_constraint', kwargs)
+
+
+class UserConstraintTests(TransactionTestCase):
+    def has_fk(self, model):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return any(c['foreign_key'] == ('auth_user', 'id') for c in constraints.values())
+
+    def alter(self, model, db_constraint):
+        with connection.schema_editor() as editor:
+            editor.alter_field(model, sharding._plain_user_field(model, not db_constraint),
+                               sharding._plain_user_field(model, db_constraint))
+
+    def test_restores_live_schema(self):
+        sharded = sharding.enabled()
+        for model in (Project, UserPreference):
+            self.assertIs(self.has_fk(model), not sharded)
+            self.alter(model, sharded)  # as migrated with the other setting
+            self.assertIs(self.has_fk(model), sharded)
+            with connection.schema_editor() as editor:
+                sharding.user_constraint_matches(model, editor)
+            self.assertIs(self.has_fk(model), not sharded)
+
+
+class UserDeleteTests(TestCase):
+    def create_user(self, username):
+        user = User.objects.create_user(username, password='p')
+        Project.objects.create(user=user, title='p', data={})
+        UserPreference.objects.create(user=user, last_project_id=sharding.ID_BLOCK + 1)
+        return user
+
+    def test_cascades(self):
+        user = self.create_user('a')
+        keep = self.create_user('b')
+        self.assertEqual(UserPreference.objects.get(user=user).last_project_id, sharding.ID_BLOCK + 1)
+        user.delete()
+        self.assertFalse(Project.objects.filter(user_id=user.id).exists())
+        self.assertFalse(UserPreference.objects.filter(user_id=user.id).exists())
+        self.assertTrue(Project.objects.filter(user=keep).exists())
+
+    def test_queryset_delete_cascades(self):
+        user = self.create_user('a')
+        User.objects.filter(pk=user.pk).delete()
+        self.assertFalse(Project.objects.filter(user_id=user.id).exists())
+        self.assertFalse(UserPreference.objects.filter(user_id=user.id).exists())
@@ -0,0 +1,106 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
+from django.views.decorators.http import require_GET
+
+from . import events, profiling
+from .health import readiness
+from .metrics import registry, render_json, render_prometheus
+from .ratelimit import rate_limit_exempt
+
+
+@rate_limit_exempt
+def liveness_view(_):
+    return JsonResponse({'ok': True})
+
+
+@rate_limit_exempt
+def readiness_view(_):
+    result = readiness.status()
+    return JsonResponse(result, status=200 if result['ok'] else 503)
+
+
+def _metrics_allowed(request: HttpRequest) -> bool:
+    if settings.DEBUG or request.user.is_staff:
+        return True
+    token = os.getenv('METRICS_TOKEN')
+    auth = request.headers.get('Authorization', '')
+    return bool(token) and auth.startswith('Bearer ') and hmac.compare_digest(auth[7:], token)
+
+
+@rate_limit_exempt
+@require_GET
+def metrics_view(request: HttpRequest):
+    if not _metrics_allowed(request):
+        return JsonResponse({'error': 'forbidden'}, status=403)
+    snap = registry.snapshot()
+    if request.GET.get('format') == 'json':
+        return JsonResponse(render_json(snap))
+    return HttpResponse(render_prometheus(snap), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@login_required
+@require_GET
+def events_view(request: HttpRequest):
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    return _event_stream_response(events.stream(request.user.pk, last_event_id))
+
+
+@login_required
+@require_GET
+async def async_events_view(request: HttpRequest):
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    user = await request.auser()
+    return _event_stream_response(events.astream(user.pk, last_event_id))
+
+
+def _event_stream_response(body) -> StreamingHttpResponse:
+    response = StreamingHttpResponse(body, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@staff_member_required
+def profile_list_view(request: HttpRequest):
+    return render(request, 'core/profile_list.html', {
+        'title': 'Request profiles',
+        'profiles': profiling.list_profiles(),
+        'enabled': profiling.ENABLED,
+        'max_files': profiling.MAX_FILES,
+    })
+
+
+@staff_member_required
+def profile_detail_view(request: HttpRequest, name: str):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404('Profile not found')
+    sort = request.GET.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls'):
+        sort = 'cumulative'
+    return render(request, 'core/profile_detail.html', {
+        'title': name,
+        'name': name,
+        'sort': sort,
+        'stats': profiling.render_stats(path, sort=sort),
+    })
+
+
+@staff_member_required
+def profile_download_view(request: HttpRequest, name: str):
+    path = profiling.profile_path(name)
+    if path is None:
+        raise Http404('Profile not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name, content_type='application/octet-stream')
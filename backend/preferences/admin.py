@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from core.admin_utils import LargeTableAdmin
+
+from .models import UserPreference
+
+
+@admin.register(UserPreference)
+class UserPreferenceAdmin(LargeTableAdmin):
+    list_display = ('user', 'theme', 'updated_at')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    ordering = ('-pk',)
+    # Prefix match on the unique username index rather than a LIKE '%...%' scan
+    search_fields = ('^user__username',)
+    readonly_fields = ('updated_at',)
@@ -1,5 +1,10 @@
+from django.conf import settings
 from django.urls import path
-from .views import preferences_view
+
+if settings.ASYNC_VIEWS:
+    from .async_views import preferences_view
+else:
+    from .views import preferences_view
 
 urlpatterns = [
     path('preferences/', preferences_view, name='preferences'),
@@ -0,0 +1,35 @@
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest
+from django.views.decorators.http import require_http_methods
+from .models import UserPreference
+from core.fastjson import FastJsonResponse, JsonBodyError, read_json
+
+# Async counterpart of views.preferences_view (see settings.ASYNC_VIEWS)
+
+@login_required
+@require_http_methods(["GET", "POST"])
+async def preferences_view(request: HttpRequest):
+    user = await request.auser()
+    prefs = await UserPreference.objects.for_user(user).afirst() if request.method == 'GET' else None
+    if prefs is None:
+        prefs, _ = await UserPreference.objects.for_user(user).aget_or_create(user=user)
+    if request.method == 'GET':
+        return FastJsonResponse({
+            'theme': prefs.theme,
+            'last_project_id': prefs.last_project_id,
+            'window_bounds': prefs.window_bounds,
+            'updated_at': prefs.updated_at.isoformat(),
+        })
+    # POST
+    try:
+        data = read_json(request)
+    except JsonBodyError as e:
+        if e.status == 413:
+            return e.response()
+        data = {}
+    allowed = {'theme', 'last_project_id', 'window_bounds'}
+    for key in allowed:
+        if key in data:
+            setattr(prefs, key, data[key])
+    await prefs.asave()
+    return FastJsonResponse({'ok': True})
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import migrations, models
+
+import core.sharding
+
+
+def user_constraint_matches(apps, schema_editor):
+    core.sharding.user_constraint_matches(apps.get_model('preferences', 'UserPreference'), schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('preferences', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userpreference',
+            name='user',
+            field=core.sharding.OwnerOneToOneField(to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='userpreference',
+            name='last_project_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(user_constraint_matches, migrations.RunPython.noop),
+    ]
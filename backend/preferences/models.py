@@ -1,12 +1,19 @@
 from django.conf import settings
 from django.db import models
 
+from core.sharding import OwnerOneToOneField, UserShardedManager
+
 class UserPreference(models.Model):
-    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # With DB_SHARDS the user lives in another database, so there is no FK
+    # constraint and preferences.signals deletes the row with its user
+    user = OwnerOneToOneField(settings.AUTH_USER_MODEL)
     theme = models.CharField(max_length=64, default='light')
-    last_project_id = models.IntegerField(null=True, blank=True)
+    # Sharded project ids start at 2**40 (see core.sharding.ID_BLOCK)
+    last_project_id = models.BigIntegerField(null=True, blank=True)
     window_bounds = models.JSONField(default=dict, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserShardedManager()
+
     def __str__(self) -> str:
         return f"Prefs<{self.user_id}>"
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import sharding
+from core.events import publish_on_commit
+
+from .models import UserPreference
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_user_preferences(sender, instance, **kwargs):
+    # Stands in for the FK cascade, which cannot reach across shards
+    if not sharding.enabled():
+        return
+    UserPreference.objects.for_user(instance).delete()
+
+
+@receiver(post_save, sender=UserPreference)
+def announce_preferences_saved(sender, instance: UserPreference, using, raw=False, **kwargs):
+    if raw:
+        return
+    publish_on_commit(instance.user_id, 'preferences', {
+        'action': 'updated',
+        'theme': instance.theme,
+        'last_project_id': instance.last_project_id,
+        'window_bounds': instance.window_bounds,
+        'updated_at': instance.updated_at.isoformat(),
+    }, using=using)
+
+
+@receiver(post_delete, sender=UserPreference)
+def announce_preferences_deleted(sender, instance: UserPreference, using, **kwargs):
+    publish_on_commit(instance.user_id, 'preferences', {'action': 'deleted'}, using=using)
@@ -1,17 +1,20 @@
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpRequest
+from django.http import HttpRequest
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from .models import UserPreference
-import json
+from core.fastjson import FastJsonResponse, JsonBodyError, read_json
 
 @login_required
 @require_http_methods(["GET", "POST"])
 def preferences_view(request: HttpRequest):
-    prefs, _ = UserPreference.objects.get_or_create(user=request.user)
+    # Reads may be served by a replica (see core.replicas); only create on a miss
+    prefs = UserPreference.objects.for_user(request.user).first() if request.method == 'GET' else None
+    if prefs is None:
+        prefs, _ = UserPreference.objects.for_user(request.user).get_or_create(user=request.user)
     if request.method == 'GET':
-        return JsonResponse({
+        return FastJsonResponse({
             'theme': prefs.theme,
             'last_project_id': prefs.last_project_id,
             'window_bounds': prefs.window_bounds,
@@ -19,12 +22,14 @@ def preferences_view(request: HttpRequest):
         })
     # POST
     try:
-        data = json.loads(request.body.decode('utf-8') or '{}')
-    except Exception:
+        data = read_json(request)
+    except JsonBodyError as e:
+        if e.status == 413:
+            return e.response()
         data = {}
     allowed = {'theme', 'last_project_id', 'window_bounds'}
     for key in allowed:
         if key in data:
             setattr(prefs, key, data[key])
     prefs.save()
-    return JsonResponse({'ok': True})
+    return FastJsonResponse({'ok': True})
@@ -0,0 +1,37 @@
+from django.contrib import admin
+
+from core.admin_utils import LargeTableAdmin
+
+from . import search
+from .models import Project
+
+SEARCH_LIMIT = 1000
+
+
+@admin.register(Project)
+class ProjectAdmin(LargeTableAdmin):
+    list_display = ('id', 'title', 'user', 'data_size', 'data_keys', 'updated_at')
+    list_display_links = ('id', 'title')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
+    date_hierarchy = 'updated_at'
+    ordering = ('-updated_at',)
+    search_fields = ('title',)
+    search_help_text = 'Full-text search over title, description and data; a number matches the project id.'
+    readonly_fields = ('data_size', 'data_keys', 'data_preview', 'created_at', 'updated_at')
+    fields = ('user', 'title', 'description', 'data', 'data_size', 'data_keys', 'data_preview', 'created_at', 'updated_at')
+
+    def get_queryset(self, request):
+        # The changelist shows the summary columns; data is read only on the change form
+        return super().get_queryset(request).defer('data')
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        ids = search.match_ids(search_term, limit=SEARCH_LIMIT, using=queryset.db)
+        if ids is None:
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids), False
@@ -1,7 +1,26 @@
+from django.conf import settings
 from django.urls import path
-from .api_views import project_list_api, project_detail_api
+
+from . import api_views
+
+if settings.ASYNC_VIEWS:
+    from . import async_api_views as views
+else:
+    from . import api_views as views
 
 urlpatterns = [
-    path('projects/', project_list_api, name='api_projects'),
-    path('projects/<int:pk>/', project_detail_api, name='api_project_detail'),
+    path('projects/', views.project_list_api, name='api_projects'),
+    path('projects/search/', views.project_search_api, name='api_project_search'),
+    # Sync views; under ASGI, export still streams from an async iterator (see archive)
+    path('projects/export/', api_views.project_export_api, name='api_project_export'),
+    path('projects/import/', api_views.project_import_api, name='api_project_import'),
+    path('projects/<int:pk>/', views.project_detail_api, name='api_project_detail'),
+    path('projects/<int:pk>/revisions/', views.project_revisions_api, name='api_project_revisions'),
+    path('projects/<int:pk>/revisions/<int:number>/', views.project_revision_api, name='api_project_revision'),
+    path('projects/<int:pk>/revisions/<int:number>/restore/', views.project_revision_restore_api, name='api_project_revision_restore'),
+    # Sync views; under ASGI, downloads still stream from an async iterator (see serve_attachment)
+    path('projects/<int:pk>/attachments/', api_views.project_attachments_api, name='api_project_attachments'),
+    path('projects/<int:pk>/attachments/<int:attachment_id>/', api_views.project_attachment_api, name='api_project_attachment'),
+    path('projects/<int:pk>/uploads/', api_views.project_uploads_api, name='api_project_uploads'),
+    path('projects/<int:pk>/uploads/<uuid:upload_id>/', api_views.project_upload_api, name='api_project_upload'),
 ]
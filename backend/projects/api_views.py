@@ -1,43 +1,291 @@
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpRequest
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router, transaction
+from django.http import FileResponse, Http404, HttpRequest, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.views.decorators.http import require_http_methods
-from .models import Project
-import json
+from .models import LIST_FIELDS, Attachment, DataBlob, Project, UploadSession
+from . import archive, attachments, datafilter, revisions, search
+from core import sharding
+from core.fastjson import JsonBodyError
+from core.ratelimit import rate_limit
+from core.formats import api_response, read_data
+
+# Shared with async_api_views, which runs these in a worker thread
+
+def create_project(user, title: str, data: dict) -> Project:
+    with transaction.atomic(using=sharding.db_for_user(user)):
+        p = Project.objects.for_user(user).create(user=user, title=title, description=data.get('description',''), data=data.get('data', {}))
+        revisions.record(p)
+    return p
+
+def update_project(p: Project, data: dict) -> None:
+    with transaction.atomic(using=router.db_for_write(Project, instance=p)):
+        if not revisions.has_history(p):
+            revisions.record(p)
+        for key in ['title', 'description', 'data']:
+            if key in data:
+                setattr(p, key, data[key])
+        p.save()
+        revisions.record(p)
+
+def project_payload(p: Project) -> dict:
+    return {
+        'id': p.id,
+        'title': p.title,
+        'description': p.description,
+        'data': p.data,
+        'created_at': p.created_at.isoformat(),
+        'updated_at': p.updated_at.isoformat(),
+    }
+
+def attach_blob_data(items: list, offloaded: dict) -> list:
+    for item in items:
+        digest = item.pop('data_blob_id')
+        if digest:
+            item['data'] = offloaded[digest].load()
+    return items
+
+def search_results(hits: list, projects: dict) -> list:
+    return [
+        {
+            'id': pk,
+            'title': projects[pk].title,
+            'description': projects[pk].description,
+            'updated_at': projects[pk].updated_at.isoformat(),
+            'rank': rank,
+            'snippet': snippet,
+        }
+        for pk, rank, snippet in hits if pk in projects
+    ]
 
 @login_required
 @require_http_methods(["GET", "POST"])
 def project_list_api(request: HttpRequest):
     if request.method == 'GET':
-        items = list(Project.objects.filter(user=request.user).order_by('-updated_at').values())
-        return JsonResponse(items, safe=False)
-    data = json.loads(request.body.decode('utf-8') or '{}')
+        # Summaries only by default; ?include=data opts back into full blobs
+        qs = Project.objects.for_user(request.user).order_by('-updated_at')
+        try:
+            qs = datafilter.filter_projects(qs, request.GET)
+        except datafilter.FilterError as e:
+            return api_response(request, { 'error': str(e) }, status=400)
+        if request.GET.get('include') != 'data':
+            return api_response(request, list(qs.values(*LIST_FIELDS)), safe=False)
+        items = list(qs.values(*LIST_FIELDS, 'data', 'data_blob_id'))
+        offloaded = DataBlob.objects.using(qs.db).in_bulk({i['data_blob_id'] for i in items if i['data_blob_id']})
+        return api_response(request, attach_blob_data(items, offloaded), safe=False)
+    try:
+        data = read_data(request)
+    except JsonBodyError as e:
+        return e.response()
     title = data.get('title')
     if not title:
-        return JsonResponse({ 'error': 'title required' }, status=400)
-    p = Project.objects.create(user=request.user, title=title, description=data.get('description',''), data=data.get('data', {}))
-    return JsonResponse({ 'id': p.id }, status=201)
+        return api_response(request, { 'error': 'title required' }, status=400)
+    p = create_project(request.user, title, data)
+    return api_response(request, { 'id': p.id }, status=201)
 
 @login_required
 @require_http_methods(["GET", "PUT", "DELETE"])    
 def project_detail_api(request: HttpRequest, pk: int):
-    p = get_object_or_404(Project, pk=pk, user=request.user)
+    p = get_object_or_404(Project.objects.for_user(request.user), pk=pk)
     if request.method == 'GET':
-        return JsonResponse({
-            'id': p.id,
-            'title': p.title,
-            'description': p.description,
-            'data': p.data,
-            'created_at': p.created_at.isoformat(),
-            'updated_at': p.updated_at.isoformat(),
-        })
+        return api_response(request, project_payload(p))
     if request.method == 'DELETE':
         p.delete()
-        return JsonResponse({ 'ok': True })
+        return api_response(request, { 'ok': True })
     # PUT
-    data = json.loads(request.body.decode('utf-8') or '{}')
-    for key in ['title', 'description', 'data']:
-        if key in data:
-            setattr(p, key, data[key])
-    p.save()
-    return JsonResponse({ 'ok': True })
+    try:
+        data = read_data(request)
+    except JsonBodyError as e:
+        return e.response()
+    update_project(p, data)
+    return api_response(request, { 'ok': True })
+
+@login_required
+@require_http_methods(["GET"])
+def project_revisions_api(request: HttpRequest, pk: int):
+    p = get_object_or_404(Project.objects.for_user(request.user).only('id'), pk=pk)
+    items = [
+        { **r, 'created_at': r['created_at'].isoformat() }
+        for r in p.revisions.values('number', 'kind', 'size', 'created_at')
+    ]
+    return api_response(request, items, safe=False)
+
+@login_required
+@require_http_methods(["GET"])
+def project_revision_api(request: HttpRequest, pk: int, number: int):
+    p = get_object_or_404(Project.objects.for_user(request.user).only('id'), pk=pk)
+    revision = get_object_or_404(p.revisions.only('number', 'created_at'), number=number)
+    state = revisions.reconstruct(p, number)
+    return api_response(request, { 'number': number, 'created_at': revision.created_at.isoformat(), **state })
+
+@login_required
+@require_http_methods(["POST"])
+def project_revision_restore_api(request: HttpRequest, pk: int, number: int):
+    p = get_object_or_404(Project.objects.for_user(request.user), pk=pk)
+    get_object_or_404(p.revisions.only('id'), number=number)
+    revision = revisions.restore(p, number)
+    return api_response(request, { 'ok': True, 'revision': revision.number if revision else number })
+
+@login_required
+@require_http_methods(["GET"])
+def project_search_api(request: HttpRequest):
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        return api_response(request, { 'error': 'page and page_size must be integers' }, status=400)
+    hits, has_next = search.search(request.user, request.GET.get('q', ''), page=page, page_size=page_size)
+    projects = Project.objects.for_user(request.user).only('id', 'title', 'description', 'updated_at').in_bulk([pk for pk, _, _ in hits])
+    return api_response(request, { 'results': search_results(hits, projects), 'page': max(1, page), 'has_next': has_next })
+
+def attachment_payload(a: Attachment) -> dict:
+    return {
+        'id': a.id,
+        'name': a.name,
+        'content_type': a.content_type,
+        'size': a.size,
+        'sha256': a.file_id,
+        'created_at': a.created_at.isoformat(),
+        'url': reverse('api_project_attachment', args=[a.project_id, a.id]),
+    }
+
+def upload_payload(u: UploadSession) -> dict:
+    return { 'id': str(u.id), 'name': u.name, 'size': u.size, 'offset': u.received, 'chunk_size': attachments.MAX_CHUNK_BYTES }
+
+@login_required
+@require_http_methods(["GET"])
+def project_attachments_api(request: HttpRequest, pk: int):
+    p = get_object_or_404(Project.objects.for_user(request.user).only('id'), pk=pk)
+    return api_response(request, [attachment_payload(a) for a in p.attachments.all()], safe=False)
+
+@login_required
+@require_http_methods(["POST"])
+def project_uploads_api(request: HttpRequest, pk: int):
+    p = get_object_or_404(Project.objects.for_user(request.user).only('id'), pk=pk)
+    try:
+        data = read_data(request)
+    except JsonBodyError as e:
+        return e.response()
+    name = str(data.get('name') or '').strip()[:255]
+    size = data.get('size')
+    if not name or not isinstance(size, int) or size < 0:
+        return api_response(request, { 'error': 'name and a non-negative integer size required' }, status=400)
+    if size > attachments.MAX_FILE_BYTES:
+        return api_response(request, { 'error': f'files are limited to {attachments.MAX_FILE_BYTES} bytes' }, status=413)
+    upload = p.uploads.create(
+        name=name, size=size,
+        content_type=str(data.get('content_type') or 'application/octet-stream')[:127],
+    )
+    if size == 0:
+        attachments.part_path(upload).parent.mkdir(parents=True, exist_ok=True)
+        attachments.part_path(upload).touch()
+        return api_response(request, attachment_payload(attachments.finalize(upload)), status=201)
+    return api_response(request, upload_payload(upload), status=201)
+
+@login_required
+@require_http_methods(["GET", "PUT", "DELETE"])
+def project_upload_api(request: HttpRequest, pk: int, upload_id):
+    upload = get_object_or_404(UploadSession.objects.using(sharding.db_for_user(request.user)), pk=upload_id, project_id=pk, project__user=request.user)
+    if request.method == 'GET':
+        return api_response(request, upload_payload(upload))
+    if request.method == 'DELETE':
+        upload.delete()
+        return api_response(request, { 'ok': True })
+    # PUT: one chunk, "Content-Range: bytes <start>-<end>/<size>"
+    span = attachments.parse_content_range(request.headers.get('Content-Range', ''), upload.size)
+    if span is None:
+        return api_response(request, { 'error': 'valid Content-Range required', 'offset': upload.received }, status=400)
+    start, end = span
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = -1
+    if length != end - start:
+        return api_response(request, { 'error': 'Content-Length must match Content-Range' }, status=400)
+    try:
+        attachments.write_chunk(upload, request, start, length)
+    except attachments.UploadError as e:
+        return api_response(request, { 'error': str(e), 'offset': upload.received }, status=e.status)
+    if upload.received < upload.size:
+        return api_response(request, upload_payload(upload))
+    try:
+        attachment = attachments.finalize(upload)
+    except attachments.UploadError as e:
+        return api_response(request, { 'error': str(e) }, status=e.status)
+    return api_response(request, attachment_payload(attachment), status=201)
+
+@login_required
+@require_http_methods(["GET", "DELETE"])
+def project_attachment_api(request: HttpRequest, pk: int, attachment_id: int):
+    a = get_object_or_404(Attachment.objects.using(sharding.db_for_user(request.user)), pk=attachment_id, project_id=pk, project__user=request.user)
+    if request.method == 'DELETE':
+        a.delete()
+        return api_response(request, { 'ok': True })
+    return serve_attachment(request, a)
+
+def serve_attachment(request: HttpRequest, a: Attachment) -> HttpResponse:
+    etag = f'"{a.file_id}"'
+    headers = {
+        'ETag': etag,
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, max-age=31536000, immutable',
+        'Content-Disposition': content_disposition_header(True, a.name),
+    }
+    if request.headers.get('If-None-Match') == etag:
+        return HttpResponseNotModified(headers={ 'ETag': etag })
+    if attachments.SENDFILE_HEADER:
+        # The front server streams the file (and handles Range) itself
+        response = HttpResponse(content_type=a.content_type, headers=headers)
+        response[attachments.SENDFILE_HEADER] = attachments.sendfile_target(a.file_id)
+        return response
+    path = attachments.stored_path(a.file_id)
+    if not path.is_file():
+        raise Http404('Attachment content missing')
+    span = None
+    if 'Range' in request.headers and request.headers.get('If-Range', etag) == etag:
+        try:
+            span = attachments.parse_range(request.headers['Range'], a.size)
+        except attachments.UploadError:
+            return HttpResponse(status=416, headers={ 'Content-Range': f'bytes */{a.size}' })
+    # The ASGI handler would buffer a sync iterator whole, so give it an async one
+    asgi = isinstance(request, ASGIRequest)
+    if span is None:
+        # FileResponse lets the WSGI server use sendfile via wsgi.file_wrapper
+        response = FileResponse(attachments.aiter_range(path, 0, a.size) if asgi else open(path, 'rb'),
+                                content_type=a.content_type)
+        response['Content-Length'] = str(a.size)
+    else:
+        start, end = span
+        body = (attachments.aiter_range if asgi else attachments.iter_range)(path, start, end)
+        response = StreamingHttpResponse(body, status=206, content_type=a.content_type)
+        response['Content-Range'] = f'bytes {start}-{end - 1}/{a.size}'
+        response['Content-Length'] = str(end - start)
+    for key, value in headers.items():
+        response[key] = value
+    return response
+
+# Each one walks all of a user's projects
+@rate_limit(1 / 30, 2)
+@login_required
+@require_http_methods(["GET"])
+def project_export_api(request: HttpRequest):
+    # The ASGI handler would buffer a sync iterator whole, so give it an async one
+    stream = archive.aexport_stream if isinstance(request, ASGIRequest) else archive.export_stream
+    response = StreamingHttpResponse(stream(request.user), content_type='application/gzip')
+    response['Content-Disposition'] = content_disposition_header(True, f'projects-{timezone.now():%Y%m%d-%H%M%S}.ndjson.gz')
+    return response
+
+@rate_limit(1 / 30, 2)
+@login_required
+@require_http_methods(["POST"])
+def project_import_api(request: HttpRequest):
+    # The body is the archive itself (gzip or plain NDJSON), parsed as it is read
+    try:
+        result = archive.import_stream(request.user, request)
+    except archive.ArchiveError as e:
+        return api_response(request, { 'error': str(e), 'imported': e.imported }, status=400)
+    return api_response(request, result, status=201)
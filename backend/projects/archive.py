@@ -0,0 +1,227 @@
+"""
+Streaming export/import of a user's projects and preferences.
+
+The archive is gzip-compressed NDJSON: a ``header`` line, an optional
+``preferences`` line, then one ``project`` line per project. Export walks the
+projects with ``QuerySet.iterator()`` and compresses as it goes; import
+decompresses and parses line by line and inserts with ``bulk_create`` in
+batches, one transaction per batch, so memory use does not grow with the
+number of projects. Imported projects are new rows (new ids and timestamps);
+attachments and revision history are not part of the archive.
+
+``bulk_create`` sends no ``post_save`` signals. Import does their work itself
+for each batch: it indexes the projects for search and records each one's
+first revision. Instead of one ``created`` event per project it publishes a
+single ``imported`` event at the end.
+
+Under ASGI, Django reads a sync response iterator whole before sending it,
+so the export view streams ``aexport_stream`` there instead.
+"""
+import os
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.db import router, transaction
+from django.utils import timezone
+
+from core import fastjson, sharding
+from core.events import broker
+
+from . import blobs, revisions, search
+
+FORMAT = 'projects-export'
+VERSION = 1
+BATCH_SIZE = int(os.getenv('PROJECT_IMPORT_BATCH_SIZE', '500'))
+READ_BYTES = 64 * 1024
+FLUSH_BYTES = 256 * 1024
+MAX_LINE_BYTES = fastjson.MAX_BODY_BYTES or 64 * 1024 * 1024
+
+
+class ArchiveError(Exception):
+    def __init__(self, message: str, imported: int = 0):
+        super().__init__(message)
+        self.imported = imported
+
+
+def _line(obj) -> bytes:
+    return fastjson.dumps(obj) + b'\n'
+
+
+def export_lines(user, using: str | None = None):
+    from preferences.models import UserPreference
+    from .models import Project
+
+    using = using or router.db_for_read(Project, user=user)
+    yield _line({'type': 'header', 'format': FORMAT, 'version': VERSION, 'exported_at': timezone.now().isoformat()})
+    prefs = UserPreference.objects.using(using).filter(user=user).first()
+    if prefs is not None:
+        yield _line({
+            'type': 'preferences',
+            'theme': prefs.theme,
+            'window_bounds': prefs.window_bounds,
+        })
+    qs = (Project.objects.using(using).filter(user=user).order_by('pk')
+          .select_related('data_blob').only('id', 'title', 'description', 'data', 'data_blob', 'created_at', 'updated_at'))
+    for p in qs.iterator(chunk_size=BATCH_SIZE):
+        yield _line({
+            'type': 'project',
+            'id': p.pk,
+            'title': p.title,
+            'description': p.description,
+            'data': p.data,
+            'created_at': p.created_at.isoformat(),
+            'updated_at': p.updated_at.isoformat(),
+        })
+
+
+def export_stream(user, using: str | None = None):
+    """gzip-compressed ``export_lines``, emitted in chunks of ~FLUSH_BYTES."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = []
+    size = 0
+    for line in export_lines(user, using):
+        out = compressor.compress(line)
+        if out:
+            pending.append(out)
+            size += len(out)
+        if size >= FLUSH_BYTES:
+            yield b''.join(pending)
+            pending, size = [], 0
+    pending.append(compressor.flush())
+    yield b''.join(pending)
+
+
+async def aexport_stream(user, using: str | None = None):
+    """``export_stream`` as an async iterator, for ASGI responses.
+
+    Every chunk is made in the same (thread-sensitive) worker thread, which
+    keeps the export's query cursor on one database connection.
+    """
+    chunks = export_stream(user, using)
+    step = sync_to_async(next)
+    try:
+        while (chunk := await step(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
+
+
+def _chunks(stream):
+    """Decompressed (if gzip) blocks of ``stream``, each of bounded size."""
+    block = stream.read(READ_BYTES)
+    if block[:2] != b'\x1f\x8b':
+        while block:
+            yield block
+            block = stream.read(READ_BYTES)
+        return
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    limit = READ_BYTES * 4
+    try:
+        while block:
+            data = block
+            # Bounded output per call, so a decompression bomb cannot inflate
+            # into memory all at once
+            while True:
+                out = decompressor.decompress(data, limit)
+                if out:
+                    yield out
+                data = decompressor.unconsumed_tail
+                if not data and len(out) < limit:
+                    break
+            block = stream.read(READ_BYTES)
+        tail = decompressor.flush()
+    except zlib.error:
+        raise ArchiveError('corrupt gzip stream')
+    if tail:
+        yield tail
+    if not decompressor.eof:
+        raise ArchiveError('truncated gzip stream')
+
+
+def iter_lines(stream):
+    """Lines of a gzip (or plain) NDJSON stream, read incrementally."""
+    # Pieces of the unfinished line, joined once it ends: appending chunk by
+    # chunk to one bytes object would copy a long line over and over
+    pending = []
+    size = 0
+    for chunk in _chunks(stream):
+        start = 0
+        while (end := chunk.find(b'\n', start)) != -1:
+            pending.append(chunk[start:end])
+            yield b''.join(pending)
+            pending, size = [], 0
+            start = end + 1
+        if start < len(chunk):
+            pending.append(chunk[start:])
+            size += len(chunk) - start
+            if size > MAX_LINE_BYTES:
+                raise ArchiveError(f'line longer than {MAX_LINE_BYTES} bytes')
+    line = b''.join(pending)
+    if line.strip():
+        yield line
+
+
+def import_stream(user, stream, using: str | None = None) -> dict:
+    """Create projects (and update preferences) from an export archive."""
+    from preferences.models import UserPreference
+    from .models import Project
+
+    using = using or sharding.db_for_user(user)
+    imported = 0
+    batch = []
+    seen_header = False
+
+    def flush():
+        nonlocal imported
+        if not batch:
+            return
+        with transaction.atomic(using=using):
+            created = Project.objects.using(using).bulk_create(batch)
+            # bulk_create skips save() and signals; do what they would have
+            search.index_projects(created, using)
+            revisions.record_created(created, using)
+        imported += len(batch)
+        batch.clear()
+
+    try:
+        for lineno, raw in enumerate(iter_lines(stream), 1):
+            if not raw.strip():
+                continue
+            try:
+                record = fastjson.loads(raw)
+            except ValueError:
+                raise ArchiveError(f'line {lineno}: invalid JSON', imported)
+            kind = record.get('type') if isinstance(record, dict) else None
+            if not seen_header:
+                if kind != 'header' or record.get('format') != FORMAT:
+                    raise ArchiveError('not a projects export archive', imported)
+                version = record.get('version', 0)
+                if not isinstance(version, int) or isinstance(version, bool):
+                    raise ArchiveError(f'invalid archive version {version!r}', imported)
+                if version > VERSION:
+                    raise ArchiveError(f'archive version {version} is newer than supported', imported)
+                seen_header = True
+            elif kind == 'preferences':
+                fields = {k: record[k] for k in ('theme', 'window_bounds') if k in record}
+                UserPreference.objects.using(using).update_or_create(user=user, defaults=fields)
+            elif kind == 'project':
+                title = record.get('title')
+                if not isinstance(title, str) or not title:
+                    raise ArchiveError(f'line {lineno}: project without a title', imported)
+                p = Project(user=user, title=title[:200], description=record.get('description') or '', data=record.get('data', {}))
+                p.update_summary()
+                blobs.offload(p, using=using)
+                batch.append(p)
+                if len(batch) >= BATCH_SIZE:
+                    flush()
+    except ArchiveError as e:
+        # Raised while reading the stream too, where the count is not known
+        e.imported = imported
+        raise
+    flush()
+    if not seen_header:
+        raise ArchiveError('empty archive')
+    if imported:
+        # Every batch has committed by now
+        broker.publish(user.pk, 'project', {'action': 'imported', 'count': imported})
+    return {'imported': imported}
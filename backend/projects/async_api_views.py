@@ -0,0 +1,98 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.http import HttpRequest
+from django.shortcuts import aget_object_or_404
+from django.views.decorators.http import require_http_methods
+from .api_views import attach_blob_data, create_project, project_payload, search_results, update_project
+from .models import LIST_FIELDS, DataBlob, Project
+from . import datafilter, revisions, search
+from core.fastjson import JsonBodyError
+from core.formats import api_response, read_data
+
+# Async counterparts of api_views, routed when settings.ASYNC_VIEWS is on
+# (the default under config.asgi). Reads use the async ORM; writes that need
+# a transaction run the shared sync helpers in the ORM's worker thread.
+
+@login_required
+@require_http_methods(["GET", "POST"])
+async def project_list_api(request: HttpRequest):
+    user = await request.auser()
+    if request.method == 'GET':
+        qs = Project.objects.for_user(user).order_by('-updated_at')
+        try:
+            qs = await datafilter.afilter_projects(qs, request.GET)
+        except datafilter.FilterError as e:
+            return api_response(request, { 'error': str(e) }, status=400)
+        if request.GET.get('include') != 'data':
+            return api_response(request, [item async for item in qs.values(*LIST_FIELDS)], safe=False)
+        items = [item async for item in qs.values(*LIST_FIELDS, 'data', 'data_blob_id')]
+        offloaded = await DataBlob.objects.using(qs.db).ain_bulk({i['data_blob_id'] for i in items if i['data_blob_id']})
+        return api_response(request, attach_blob_data(items, offloaded), safe=False)
+    try:
+        data = read_data(request)
+    except JsonBodyError as e:
+        return e.response()
+    title = data.get('title')
+    if not title:
+        return api_response(request, { 'error': 'title required' }, status=400)
+    p = await sync_to_async(create_project)(user, title, data)
+    return api_response(request, { 'id': p.id }, status=201)
+
+@login_required
+@require_http_methods(["GET", "PUT", "DELETE"])
+async def project_detail_api(request: HttpRequest, pk: int):
+    user = await request.auser()
+    if request.method == 'GET':
+        # Joining the blob up front keeps the lazy data load off the event loop
+        p = await aget_object_or_404(Project.objects.for_user(user).select_related('data_blob'), pk=pk)
+        return api_response(request, project_payload(p))
+    p = await aget_object_or_404(Project.objects.for_user(user), pk=pk)
+    if request.method == 'DELETE':
+        await p.adelete()
+        return api_response(request, { 'ok': True })
+    # PUT
+    try:
+        data = read_data(request)
+    except JsonBodyError as e:
+        return e.response()
+    await sync_to_async(update_project)(p, data)
+    return api_response(request, { 'ok': True })
+
+@login_required
+@require_http_methods(["GET"])
+async def project_revisions_api(request: HttpRequest, pk: int):
+    p = await aget_object_or_404(Project.objects.for_user(await request.auser()).only('id'), pk=pk)
+    items = [
+        { **r, 'created_at': r['created_at'].isoformat() }
+        async for r in p.revisions.values('number', 'kind', 'size', 'created_at')
+    ]
+    return api_response(request, items, safe=False)
+
+@login_required
+@require_http_methods(["GET"])
+async def project_revision_api(request: HttpRequest, pk: int, number: int):
+    p = await aget_object_or_404(Project.objects.for_user(await request.auser()).only('id'), pk=pk)
+    revision = await aget_object_or_404(p.revisions.only('number', 'created_at'), number=number)
+    state = await sync_to_async(revisions.reconstruct)(p, number)
+    return api_response(request, { 'number': number, 'created_at': revision.created_at.isoformat(), **state })
+
+@login_required
+@require_http_methods(["POST"])
+async def project_revision_restore_api(request: HttpRequest, pk: int, number: int):
+    p = await aget_object_or_404(Project.objects.for_user(await request.auser()), pk=pk)
+    await aget_object_or_404(p.revisions.only('id'), number=number)
+    revision = await sync_to_async(revisions.restore)(p, number)
+    return api_response(request, { 'ok': True, 'revision': revision.number if revision else number })
+
+@login_required
+@require_http_methods(["GET"])
+async def project_search_api(request: HttpRequest):
+    try:
+        page = int(request.GET.get('page', 1))
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        return api_response(request, { 'error': 'page and page_size must be integers' }, status=400)
+    user = await request.auser()
+    hits, has_next = await sync_to_async(search.search)(user, request.GET.get('q', ''), page=page, page_size=page_size)
+    projects = await Project.objects.for_user(user).only('id', 'title', 'description', 'updated_at').ain_bulk([pk for pk, _, _ in hits])
+    return api_response(request, { 'results': search_results(hits, projects), 'page': max(1, page), 'has_next': has_next })
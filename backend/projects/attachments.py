@@ -0,0 +1,241 @@
+"""
+File attachments for projects.
+
+Uploads are chunked and resumable: a client opens an ``UploadSession`` and
+PUTs consecutive byte ranges, which are streamed onto a ``.part`` file under
+MEDIA_ROOT/uploads. When the last byte arrives the file is hashed and moved
+into a content-addressed store (MEDIA_ROOT/attachments/ab/cd/<sha256>), so
+identical files are kept once however many attachments point at them.
+Downloads honour single HTTP ranges and can be delegated to the front server
+with ATTACHMENTS_SENDFILE_HEADER. Under ASGI they are streamed from
+``aiter_range``: Django reads a sync iterator whole before sending any of it.
+"""
+import hashlib
+import os
+import re
+from datetime import timedelta
+from pathlib import Path
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import ProtectedError
+from django.utils import timezone
+
+from core import sharding
+
+COPY_BUFFER = 1024 * 1024
+MAX_FILE_BYTES = int(os.getenv('ATTACHMENTS_MAX_FILE_BYTES', str(2 * 1024 ** 3)))
+MAX_CHUNK_BYTES = int(os.getenv('ATTACHMENTS_MAX_CHUNK_BYTES', str(16 * 1024 * 1024)))
+UPLOAD_TTL = timedelta(hours=int(os.getenv('ATTACHMENTS_UPLOAD_TTL_HOURS', '24')))
+# e.g. "X-Accel-Redirect" (nginx) or "X-Sendfile" (Apache/lighttpd); empty serves from Django
+SENDFILE_HEADER = os.getenv('ATTACHMENTS_SENDFILE_HEADER', '')
+# nginx internal location mapped onto MEDIA_ROOT/attachments, used with X-Accel-Redirect
+SENDFILE_PREFIX = os.getenv('ATTACHMENTS_SENDFILE_PREFIX', '/protected-attachments/')
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+
+class UploadError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def store_dir() -> Path:
+    return Path(settings.MEDIA_ROOT) / 'attachments'
+
+
+def upload_dir() -> Path:
+    return Path(settings.MEDIA_ROOT) / 'uploads'
+
+
+def stored_path(digest: str) -> Path:
+    return store_dir() / digest[:2] / digest[2:4] / digest
+
+
+def part_path(session) -> Path:
+    return upload_dir() / f'{session.pk}.part'
+
+
+def sendfile_target(digest: str) -> str:
+    if SENDFILE_HEADER.lower() == 'x-accel-redirect':
+        return SENDFILE_PREFIX.rstrip('/') + f'/{digest[:2]}/{digest[2:4]}/{digest}'
+    return str(stored_path(digest))
+
+
+# -- uploads ----------------------------------------------------------------
+
+def parse_content_range(header: str, total: int) -> tuple | None:
+    """``(start, end_exclusive)`` from ``Content-Range: bytes a-b/total``."""
+    match = _CONTENT_RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start, end, declared = match.groups()
+    if declared != '*' and int(declared) != total:
+        return None
+    start, end = int(start), int(end) + 1
+    if end <= start or end > total:
+        return None
+    return start, end
+
+
+def write_chunk(session, stream, start: int, length: int) -> int:
+    """Append ``length`` bytes from ``stream`` at ``start``; returns the new offset.
+
+    The chunk must continue exactly where the session left off. Data is
+    copied in COPY_BUFFER pieces, never held in memory as a whole.
+    """
+    db = session._state.db
+    with transaction.atomic(using=db):
+        # Re-read under a row lock so two PUTs of the same range cannot both pass the check
+        session.received = _locked(session).received
+        if start != session.received:
+            raise UploadError(f'expected offset {session.received}', status=409)
+        if length > MAX_CHUNK_BYTES:
+            raise UploadError(f'chunks are limited to {MAX_CHUNK_BYTES} bytes', status=413)
+        if start + length > session.size:
+            raise UploadError('chunk extends past the declared size', status=416)
+        path = part_path(session)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        written = 0
+        with open(path, 'r+b' if path.exists() else 'wb') as fh:
+            fh.seek(start)
+            fh.truncate()
+            while written < length:
+                block = stream.read(min(COPY_BUFFER, length - written))
+                if not block:
+                    break
+                fh.write(block)
+                written += len(block)
+        if written != length:
+            # Roll the partial chunk back so the client can retry the same range
+            with open(path, 'r+b') as fh:
+                fh.truncate(start)
+            raise UploadError('request body shorter than the Content-Range', status=400)
+        session.received = start + written
+        session.save(update_fields=['received', 'updated_at'])
+    return session.received
+
+
+def _locked(session):
+    """``session`` re-read with ``select_for_update``; 409 once it is gone."""
+    from .models import UploadSession
+
+    try:
+        return UploadSession.objects.using(session._state.db).select_for_update().get(pk=session.pk)
+    except UploadSession.DoesNotExist:
+        raise UploadError('upload already finished or aborted', status=409) from None
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        while block := fh.read(COPY_BUFFER):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize(session):
+    """Turn a complete upload into an Attachment (deduplicating its content).
+
+    Raises UploadError(409) if a concurrent or retried request already
+    finished (or aborted) the upload.
+    """
+    from .models import Attachment, StoredFile
+
+    path = part_path(session)
+    db = session._state.db
+    with transaction.atomic(using=db):
+        _locked(session)
+        try:
+            digest = _hash_file(path)
+        except FileNotFoundError:
+            raise UploadError('upload already finished or aborted', status=409) from None
+        target = stored_path(digest)
+        stored, _ = StoredFile.objects.using(db).get_or_create(digest=digest, defaults={'size': session.size})
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, target)
+        attachment = Attachment.objects.using(db).create(
+            project_id=session.project_id, file=stored, name=session.name,
+            content_type=session.content_type, size=session.size,
+        )
+        session.delete()
+    path.unlink(missing_ok=True)
+    return attachment
+
+
+def release_file(digest: str, using: str = 'default') -> None:
+    """Delete a stored file once no attachment references it."""
+    from .models import StoredFile
+
+    try:
+        deleted, _ = StoredFile.objects.using(using).filter(pk=digest, attachments__isnull=True).delete()
+    except ProtectedError:  # re-attached meanwhile
+        return
+    # Shards share MEDIA_ROOT, so the content may still be stored for another one
+    if deleted and not any(StoredFile.objects.using(db).filter(pk=digest).exists()
+                           for db in sharding.databases_for(StoredFile)):
+        stored_path(digest).unlink(missing_ok=True)
+
+
+def cleanup_uploads(max_age: timedelta = UPLOAD_TTL) -> int:
+    """Abort upload sessions idle for longer than ``max_age``."""
+    from .models import UploadSession
+
+    count = 0
+    for db in sharding.databases_for(UploadSession):
+        for session in UploadSession.objects.using(db).filter(updated_at__lt=timezone.now() - max_age).iterator():
+            session.delete()
+            count += 1
+    return count
+
+
+# -- downloads --------------------------------------------------------------
+
+def parse_range(header: str, size: int) -> tuple | None:
+    """``(start, end_exclusive)`` for a single ``Range: bytes=`` spec.
+
+    Returns None when the header should be ignored (multiple ranges or
+    malformed) and raises UploadError(416) when it cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first == '':
+        length = int(last)
+        if length == 0:
+            raise UploadError('unsatisfiable range', status=416)
+        return max(0, size - length), size
+    start = int(first)
+    end = min(int(last) + 1, size) if last else size
+    if start >= size or end <= start:
+        raise UploadError('unsatisfiable range', status=416)
+    return start, end
+
+
+def iter_range(path: Path, start: int, end: int):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = fh.read(min(COPY_BUFFER, remaining))
+            if not block:
+                return
+            remaining -= len(block)
+            yield block
+
+
+
+async def aiter_range(path: Path, start: int, end: int):
+    """``iter_range`` for ASGI responses, reading each block in a worker thread."""
+    blocks = iter_range(path, start, end)
+    read = sync_to_async(next, thread_sensitive=False)
+    try:
+        while (block := await read(blocks, None)) is not None:
+            yield block
+    finally:
+        blocks.close()
@@ -0,0 +1,93 @@
+"""
+Content-addressed, compressed storage for large ``Project.data`` values.
+
+When PROJECT_DATA_BLOB_THRESHOLD (bytes, 0 = disabled) is set, data whose
+JSON encoding is at least that large is stored once per distinct document in
+``DataBlob`` (keyed by SHA-256 of its canonical JSON) and the inline column
+is left NULL. ``Project.data`` loads the blob lazily on first access, so
+callers never see the difference. A blob is deleted once the last project
+pointing at it is saved with other data or deleted.
+"""
+import hashlib
+import json
+import os
+import zlib
+
+from django.db import router
+from django.db.models import ProtectedError
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+THRESHOLD = int(os.getenv('PROJECT_DATA_BLOB_THRESHOLD', '0'))
+
+
+def canonical_json(data) -> bytes:
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def compress(raw: bytes) -> tuple:
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=6).compress(raw)
+    return 'zlib', zlib.compress(raw, 6)
+
+
+def decompress(codec: str, payload: bytes) -> bytes:
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('zstandard is required to read zstd-compressed project data')
+        return zstandard.ZstdDecompressor().decompress(payload)
+    if codec == 'zlib':
+        return zlib.decompress(payload)
+    raise ValueError(f'unknown blob codec {codec!r}')
+
+
+def store(raw: bytes, using: str):
+    """Return the DataBlob for ``raw``, creating it only if it is new."""
+    from .models import DataBlob
+
+    digest = hashlib.sha256(raw).hexdigest()
+    blob = DataBlob.objects.using(using).only('digest').filter(pk=digest).first()
+    if blob is None:
+        codec, payload = compress(raw)
+        blob, _ = DataBlob.objects.using(using).get_or_create(
+            digest=digest,
+            defaults={'codec': codec, 'raw_size': len(raw), 'size': len(payload), 'payload': payload},
+        )
+    return blob
+
+
+def offload(project, using: str | None = None, threshold: int | None = None) -> None:
+    """Decide where ``project.data`` lives before it is saved.
+
+    Data that was never loaded from a blob is unchanged and left alone.
+    """
+    threshold = THRESHOLD if threshold is None else threshold
+    data = project.__dict__.get('data')
+    if data is None and project.data_blob_id is not None:
+        return
+    if not threshold or project.data_size < threshold:
+        project.data_blob = None
+        return
+    using = using or router.db_for_write(type(project), instance=project)
+    project.data_blob = store(canonical_json(data), using)
+
+
+def release(digest: str, using: str = 'default') -> None:
+    """Delete a blob once no project references it."""
+    from .models import DataBlob
+
+    try:
+        DataBlob.objects.using(using).filter(pk=digest, projects__isnull=True).delete()
+    except ProtectedError:  # referenced again meanwhile
+        pass
+
+
+def garbage_collect(using: str = 'default') -> int:
+    """Delete blobs no project references any more."""
+    from .models import DataBlob
+
+    deleted, _ = DataBlob.objects.using(using).filter(projects__isnull=True).delete()
+    return deleted
@@ -0,0 +1,234 @@
+"""
+Filtering projects on values inside ``Project.data``.
+
+``GET /api/projects/?data.status=active&data.tags__contains=x`` keeps the
+projects whose ``data`` matches every ``data.*`` parameter. A path is a
+dot-separated list of keys, where digits index into arrays. It may end in
+one of LOOKUPS (default ``exact``). Values are parsed as JSON when they can
+be (``5``, ``true``, ``null``, ``"5"``) and are taken as strings otherwise.
+``__in`` takes a comma-separated list.
+
+Paths listed in PROJECT_DATA_INDEXES get an expression index on
+``(user_id, <path>, updated_at)`` from ``python manage.py index_project_data``, which
+makes filters on them index lookups. Conditions render a path as exactly the
+SQL its index is built from. Neither SQLite nor PostgreSQL would match the
+index to an equivalent but differently written expression.
+
+Data offloaded to a DataBlob (PROJECT_DATA_BLOB_THRESHOLD) leaves the column
+NULL, where no condition can see it. Filters are therefore refused while
+offloading is enabled or any of the filtered projects is offloaded.
+"""
+import hashlib
+import os
+import re
+
+from django.db import NotSupportedError, connections
+from django.db.models import BooleanField, Expression, F
+
+from core import fastjson
+
+from . import blobs
+
+PREFIX = 'data.'
+LOOKUPS = ('exact', 'gt', 'gte', 'lt', 'lte', 'in', 'contains', 'isnull')
+MAX_FILTERS = 10
+MAX_DEPTH = 8
+INDEX_PREFIX = 'projects_data_'
+# Comma-separated hot paths to index, e.g. "status,owner.name"
+INDEXED_PATHS = [p.strip() for p in os.getenv('PROJECT_DATA_INDEXES', '').split(',') if p.strip()]
+
+_KEY_RE = re.compile(r'[A-Za-z0-9_-]+')
+_OPERATORS = {'exact': '=', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+_SQLITE_TYPES = {str: ('text',), bool: ('true', 'false'), int: ('integer', 'real'), float: ('integer', 'real')}
+_PG_TYPES = {str: 'string', bool: 'boolean', int: 'number', float: 'number'}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def parse_path(path: str) -> tuple:
+    keys = tuple(path.split('.'))
+    if len(keys) > MAX_DEPTH or not all(_KEY_RE.fullmatch(key) for key in keys):
+        raise FilterError(f'invalid data path {path!r}')
+    return keys
+
+
+def _sqlite_path(keys: tuple) -> str:
+    return '$' + ''.join(f'[{key}]' if key.isdigit() else f'."{key}"' for key in keys)
+
+
+def path_sql(keys: tuple, column: str, vendor: str) -> str:
+    """SQL for the value at ``keys``. Keys are validated, so they are inlined."""
+    if vendor == 'sqlite':
+        return f"JSON_EXTRACT({column}, '{_sqlite_path(keys)}')"
+    if vendor == 'postgresql':
+        return f"({column} #> '{{{','.join(keys)}}}')"
+    raise NotSupportedError(f'Filtering on project data is not supported on {vendor}')
+
+
+def _scalar(raw: str):
+    try:
+        value = fastjson.loads(raw)
+    except ValueError:
+        return raw
+    if isinstance(value, (dict, list)):
+        raise FilterError(f'not a scalar value: {raw!r}')
+    return value
+
+
+def _value(lookup: str, raw: str):
+    if lookup == 'isnull':
+        if raw.lower() not in ('true', 'false', '1', '0'):
+            raise FilterError(f'isnull takes true or false, not {raw!r}')
+        return raw.lower() in ('true', '1')
+    if lookup == 'in':
+        return [_scalar(part) for part in raw.split(',')]
+    value = _scalar(raw)
+    if value is None and lookup != 'exact':
+        raise FilterError(f'{lookup} needs a value other than null')
+    return value
+
+
+class DataCondition(Expression):
+    """WHERE condition on the value at ``keys`` in a JSON column."""
+    conditional = True
+    output_field = BooleanField()
+
+    def __init__(self, keys: tuple, lookup: str, value, column: str = 'data'):
+        super().__init__()
+        self.keys = keys
+        self.lookup = lookup
+        self.value = value
+        self.column = F(column)
+
+    def get_source_expressions(self):
+        return [self.column]
+
+    def set_source_expressions(self, exprs):
+        (self.column,) = exprs
+
+    def as_sql(self, compiler, connection):
+        raise NotSupportedError(f'Filtering on project data is not supported on {connection.vendor}')
+
+    def as_sqlite(self, compiler, connection):
+        column, params = compiler.compile(self.column)
+        target = path_sql(self.keys, column, 'sqlite')
+        lookup, value = self.lookup, self.value
+        if lookup == 'isnull' or value is None:
+            return f'{target} IS {"" if value in (True, None) else "NOT "}NULL', params
+        if lookup == 'in':
+            return f'{target} IN ({", ".join(["%s"] * len(value))})', [*params, *value]
+        if lookup == 'contains':
+            return (f"EXISTS (SELECT 1 FROM json_each({column}, '{_sqlite_path(self.keys)}') "
+                    "WHERE json_each.value = %s)", [*params, value])
+        # SQLite extracts JSON booleans as 1 and 0, which bool params match
+        sql = f'{target} {_OPERATORS[lookup]} %s'
+        if lookup == 'exact':
+            return sql, [*params, value]
+        # Text sorts after every number; only compare like with like
+        types = ', '.join(f"'{t}'" for t in _SQLITE_TYPES[type(value)])
+        return f"({sql} AND json_type({column}, '{_sqlite_path(self.keys)}') IN ({types}))", [*params, value, *params]
+
+    def as_postgresql(self, compiler, connection):
+        column, params = compiler.compile(self.column)
+        target = path_sql(self.keys, column, 'postgresql')
+        lookup, value = self.lookup, self.value
+        if lookup == 'isnull' or value is None:
+            sql = f"COALESCE({target}, 'null'::jsonb) = 'null'::jsonb"
+            return (sql if value in (True, None) else f'NOT {sql}'), params
+        if lookup == 'in':
+            placeholders = ', '.join(['%s::jsonb'] * len(value))
+            return f'{target} IN ({placeholders})', [*params, *(_json(v) for v in value)]
+        if lookup == 'contains':
+            return f'{target} @> %s::jsonb', [*params, _json([value])]
+        if lookup == 'exact':
+            return f'{target} = %s::jsonb', [*params, _json(value)]
+        # jsonb orders values of different types too; only compare like with like
+        return (f'({target} {_OPERATORS[lookup]} %s::jsonb AND jsonb_typeof({target}) = %s)',
+                [*params, _json(value), *params, _PG_TYPES[type(value)]])
+
+
+def _json(value) -> str:
+    return fastjson.dumps(value).decode('utf-8')
+
+
+def conditions(params) -> list:
+    """A DataCondition per ``data.*`` parameter in ``params`` (a QueryDict)."""
+    result = []
+    for name, values in params.lists():
+        if not name.startswith(PREFIX):
+            continue
+        path, _, lookup = name[len(PREFIX):].partition('__')
+        lookup = lookup or 'exact'
+        if lookup not in LOOKUPS:
+            raise FilterError(f"unsupported lookup {lookup!r}; use one of {', '.join(LOOKUPS)}")
+        keys = parse_path(path)
+        result.extend(DataCondition(keys, lookup, _value(lookup, raw)) for raw in values)
+    if len(result) > MAX_FILTERS:
+        raise FilterError(f'at most {MAX_FILTERS} data filters are allowed')
+    return result
+
+
+def _offloaded_error() -> FilterError:
+    return FilterError('data filters are unavailable while project data is offloaded to blobs')
+
+
+def _apply(qs, found: list):
+    for condition in found:
+        qs = qs.filter(condition)
+    return qs
+
+
+def filter_projects(qs, params):
+    """``qs`` narrowed by the ``data.*`` parameters. Raises FilterError."""
+    found = conditions(params)
+    if found and (blobs.THRESHOLD or qs.filter(data_blob__isnull=False).exists()):
+        raise _offloaded_error()
+    return _apply(qs, found)
+
+
+async def afilter_projects(qs, params):
+    found = conditions(params)
+    if found and (blobs.THRESHOLD or await qs.filter(data_blob__isnull=False).aexists()):
+        raise _offloaded_error()
+    return _apply(qs, found)
+
+
+# -- indexes ----------------------------------------------------------------
+
+def index_name(path: str) -> str:
+    slug = re.sub(r'[^a-z0-9]+', '_', path.lower())[:32]
+    return f'{INDEX_PREFIX}{slug}_{hashlib.sha1(path.encode()).hexdigest()[:8]}'
+
+
+def sync_indexes(using: str = 'default', paths=None) -> tuple:
+    """Index each of ``paths`` (default INDEXED_PATHS) and drop the indexes of
+    paths no longer listed. Returns the ``(created, dropped)`` index names."""
+    from .models import Project
+
+    paths = INDEXED_PATHS if paths is None else paths
+    wanted = {index_name(path): parse_path(path) for path in paths}
+    connection = connections[using]
+    vendor = connection.vendor
+    qn = connection.ops.quote_name
+    table = Project._meta.db_table
+    # Don't block writes to the table while an index builds
+    concurrently = ' CONCURRENTLY' if vendor == 'postgresql' else ''
+    with connection.cursor() as cursor:
+        existing = {
+            name for name in connection.introspection.get_constraints(cursor, table)
+            if name.startswith(INDEX_PREFIX)
+        }
+        dropped = sorted(existing - wanted.keys())
+        created = sorted(wanted.keys() - existing)
+        for name in dropped:
+            cursor.execute(f'DROP INDEX{concurrently} {qn(name)}')
+        for name in created:
+            target = path_sql(wanted[name], qn('data'), vendor)
+            # updated_at last, so equality filters come out in list order without a sort
+            cursor.execute(
+                f'CREATE INDEX{concurrently} {qn(name)} ON {qn(table)} '
+                f'({qn("user_id")}, {target}, {qn("updated_at")})'
+            )
+    return created, dropped
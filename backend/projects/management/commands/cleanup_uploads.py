@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from projects import attachments
+
+
+class Command(BaseCommand):
+    help = 'Abort stale attachment uploads and delete their partial files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=int(attachments.UPLOAD_TTL.total_seconds() // 3600),
+                            help='Idle time after which an upload is abandoned (defaults to ATTACHMENTS_UPLOAD_TTL_HOURS).')
+
+    def handle(self, *args, **options):
+        removed = attachments.cleanup_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} stale uploads'))
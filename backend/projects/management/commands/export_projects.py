@@ -0,0 +1,30 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from projects import archive
+
+
+class Command(BaseCommand):
+    help = "Write a user's projects and preferences as a gzip-compressed NDJSON archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username to export.')
+        parser.add_argument('--output', default='-', help="File to write ('-' for stdout).")
+        parser.add_argument('--database', help="Defaults to the user's shard.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        out = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for chunk in archive.export_stream(user, using=options['database']):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+                self.stderr.write(self.style.SUCCESS(f"Exported {options['user']} to {options['output']}"))
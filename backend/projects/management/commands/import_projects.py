@@ -0,0 +1,31 @@
+import sys
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from projects import archive
+
+
+class Command(BaseCommand):
+    help = 'Create projects for a user from an export archive (gzip or plain NDJSON).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Archive to read ('-' for stdin).")
+        parser.add_argument('--user', required=True, help='Username that will own the imported projects.')
+        parser.add_argument('--database', help="Defaults to the user's shard.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+        stream = sys.stdin.buffer if options['path'] == '-' else open(options['path'], 'rb')
+        try:
+            result = archive.import_stream(user, stream, using=options['database'])
+        except archive.ArchiveError as e:
+            raise CommandError(f'{e} ({e.imported} projects imported before the error)')
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+        self.stdout.write(self.style.SUCCESS(f"Imported {result['imported']} projects"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+from projects import datafilter
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = ('Create expression indexes for the project data paths in PROJECT_DATA_INDEXES '
+            'and drop those of paths no longer listed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Defaults to every database holding projects.')
+        parser.add_argument('--path', action='append', dest='paths', metavar='PATH',
+                            help='Path to index instead of PROJECT_DATA_INDEXES (repeatable).')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] if options['paths'] is not None else datafilter.INDEXED_PATHS
+        try:
+            for path in paths:
+                datafilter.parse_path(path)
+        except datafilter.FilterError as e:
+            raise CommandError(str(e))
+        for db in [options['database']] if options['database'] else sharding.databases_for(Project):
+            created, dropped = datafilter.sync_indexes(db, paths)
+            for name in dropped:
+                self.stdout.write(f'{db}: dropped {name}')
+            for name in created:
+                self.stdout.write(self.style.SUCCESS(f'{db}: created {name}'))
+        self.stdout.write(self.style.SUCCESS(f'{len(paths)} data path(s) indexed'))
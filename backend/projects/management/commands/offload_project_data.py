@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+from projects import blobs
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Move existing large Project.data values into the compressed blob store and drop unused blobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Defaults to every database holding projects.')
+        parser.add_argument('--threshold', type=int, default=blobs.THRESHOLD,
+                            help='Size in bytes (defaults to PROJECT_DATA_BLOB_THRESHOLD).')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        threshold = options['threshold']
+        if threshold <= 0:
+            raise CommandError('Set PROJECT_DATA_BLOB_THRESHOLD or pass --threshold')
+        moved = removed = 0
+        for db in [options['database']] if options['database'] else sharding.databases_for(Project):
+            qs = Project.objects.using(db).filter(data_blob__isnull=True, data_size__gte=threshold)
+            for project in qs.iterator(chunk_size=options['batch_size']):
+                blobs.offload(project, using=db, threshold=threshold)
+                Project.objects.using(db).filter(pk=project.pk).update(data=None, data_blob=project.data_blob)
+                moved += 1
+            removed += blobs.garbage_collect(db)
+        self.stdout.write(self.style.SUCCESS(f'Offloaded {moved} projects, removed {removed} unused blobs'))
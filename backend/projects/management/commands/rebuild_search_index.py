@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from core import sharding
+from projects import search
+from projects.models import Project
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the project full-text search index from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Defaults to every database holding projects.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = 0
+        for db in [options['database']] if options['database'] else sharding.databases_for(Project):
+            count += search.rebuild(db, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} projects'))
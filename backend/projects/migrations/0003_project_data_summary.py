@@ -0,0 +1,56 @@
+from django.db import migrations, models
+
+from core import fastjson
+
+PREVIEW_CHARS = 160
+
+
+def summarize_data(data) -> tuple:
+    """Frozen copy of ``projects.models.summarize_data`` as of this migration."""
+    encoded = fastjson.dumps(data, default=str)
+    keys = len(data) if isinstance(data, (dict, list)) else 0
+    if len(encoded) <= PREVIEW_CHARS:
+        preview = encoded.decode('utf-8')
+    else:
+        preview = encoded[:PREVIEW_CHARS * 4].decode('utf-8', 'ignore')[:PREVIEW_CHARS - 1] + '…'
+    return len(encoded), keys, preview
+
+
+def backfill_summaries(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    db = schema_editor.connection.alias
+    batch = []
+    for project in Project.objects.using(db).only('id', 'data').iterator(chunk_size=1000):
+        project.data_size, project.data_keys, project.data_preview = summarize_data(project.data)
+        batch.append(project)
+        if len(batch) >= 1000:
+            Project.objects.using(db).bulk_update(batch, ['data_size', 'data_keys', 'data_preview'])
+            batch = []
+    if batch:
+        Project.objects.using(db).bulk_update(batch, ['data_size', 'data_keys', 'data_preview'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_project_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='data_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='data_keys',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='data_preview',
+            field=models.CharField(blank=True, editable=False, max_length=160),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
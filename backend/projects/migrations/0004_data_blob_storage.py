@@ -0,0 +1,34 @@
+import django.db.models.deletion
+import projects.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_project_data_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(max_length=8)),
+                ('raw_size', models.PositiveBigIntegerField()),
+                ('size', models.PositiveBigIntegerField()),
+                ('payload', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='project',
+            name='data',
+            field=projects.models.BlobJSONField(blank=True, default=dict, null=True),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='data_blob',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='projects', to='projects.datablob'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.db import migrations
+
+import core.sharding
+
+
+def user_constraint_matches(apps, schema_editor):
+    core.sharding.user_constraint_matches(apps.get_model('projects', 'Project'), schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_project_updated_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='project',
+            name='user',
+            field=core.sharding.OwnerForeignKey(to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(user_constraint_matches, migrations.RunPython.noop),
+    ]
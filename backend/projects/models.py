@@ -1,13 +1,185 @@
+import uuid
+
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models.query_utils import DeferredAttribute
+
+from core import fastjson
+from core.sharding import OwnerForeignKey, UserShardedManager
+
+from . import blobs
+
+PREVIEW_CHARS = 160
+SUMMARY_FIELDS = ('data_size', 'data_keys', 'data_preview')
+
+# Columns list views read instead of the (possibly large) ``data`` blob
+LIST_FIELDS = ('id', 'user_id', 'title', 'description', 'created_at', 'updated_at') + SUMMARY_FIELDS
+
+
+def summarize_data(data) -> tuple:
+    """Return ``(size_in_bytes, top_level_key_count, preview)`` for a JSON value."""
+    encoded = fastjson.dumps(data, default=str)
+    keys = len(data) if isinstance(data, (dict, list)) else 0
+    if len(encoded) <= PREVIEW_CHARS:
+        preview = encoded.decode('utf-8')
+    else:
+        preview = encoded[:PREVIEW_CHARS * 4].decode('utf-8', 'ignore')[:PREVIEW_CHARS - 1] + '…'
+    return len(encoded), keys, preview
+
+
+class DataBlob(models.Model):
+    """Compressed, deduplicated ``Project.data`` payload (see ``projects.blobs``)."""
+    digest = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=8)
+    raw_size = models.PositiveBigIntegerField()
+    size = models.PositiveBigIntegerField()
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.digest
+
+    def load(self):
+        return fastjson.loads(blobs.decompress(self.codec, bytes(self.payload)))
+
+
+class BlobDataDescriptor(DeferredAttribute):
+    """Loads offloaded data from its DataBlob the first time it is read."""
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if value is None and instance.data_blob_id is not None:
+            value = instance.data_blob.load()
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        # Defining __set__ makes this a data descriptor, so __get__ still runs
+        # once the (NULL) column value sits in the instance __dict__.
+        instance.__dict__[self.field.attname] = value
+
+
+class BlobJSONField(models.JSONField):
+    """JSONField whose column is left NULL while the value lives in a DataBlob."""
+    descriptor_class = BlobDataDescriptor
+
+    def pre_save(self, model_instance, add):
+        if model_instance.data_blob_id is not None:
+            return None
+        return super().pre_save(model_instance, add)
+
 
 class Project(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # With DB_SHARDS the user row lives in another database, so there is no FK
+    # constraint and projects.signals does the cascade on user delete
+    user = OwnerForeignKey(settings.AUTH_USER_MODEL)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
-    data = models.JSONField(default=dict, blank=True)
+    data = BlobJSONField(default=dict, blank=True, null=True)
+    data_blob = models.ForeignKey(DataBlob, null=True, blank=True, editable=False,
+                                  on_delete=models.PROTECT, related_name='projects')
+    data_size = models.PositiveIntegerField(default=0, editable=False)
+    data_keys = models.PositiveIntegerField(default=0, editable=False)
+    data_preview = models.CharField(max_length=PREVIEW_CHARS, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = UserShardedManager()
+
+    class Meta:
+        indexes = [
+            # Per-user lists newest first, and the admin changelist / date hierarchy.
+            # Ascending, so a backwards scan also yields the "-updated_at, -pk"
+            # tie-break order without a sort step
+            models.Index(fields=['user', 'updated_at'], name='projects_user_updated_idx'),
+            models.Index(fields=['updated_at'], name='projects_updated_idx'),
+        ]
+
     def __str__(self) -> str:
         return self.title
+
+    def update_summary(self) -> None:
+        self.data_size, self.data_keys, self.data_preview = summarize_data(self.data)
+
+    def data_changed(self) -> bool:
+        """False when data is deferred or still sitting unread in its blob."""
+        if 'data' in self.get_deferred_fields():
+            return False
+        return not (self.__dict__['data'] is None and self.data_blob_id is not None)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'data' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | set(SUMMARY_FIELDS) | {'data_blob'}
+        previous_blob = self.data_blob_id
+        if (update_fields is None or 'data' in update_fields) and self.data_changed():
+            self.update_summary()
+            blobs.offload(self, using=kwargs.get('using'))
+        super().save(*args, **kwargs)
+        if previous_blob and previous_blob != self.data_blob_id:
+            using = self._state.db
+            transaction.on_commit(lambda: blobs.release(previous_blob, using), using=using)
+
+
+class ProjectRevision(models.Model):
+    """A full snapshot or a delta against the previous revision (see ``projects.revisions``)."""
+    KIND_CHOICES = [('full', 'Full snapshot'), ('delta', 'Delta')]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='revisions')
+    number = models.PositiveIntegerField()
+    kind = models.CharField(max_length=5, choices=KIND_CHOICES)
+    codec = models.CharField(max_length=8)
+    size = models.PositiveIntegerField()
+    payload = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-number']
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'number'], name='unique_project_revision_number'),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.project_id}@{self.number}'
+
+
+class StoredFile(models.Model):
+    """Attachment content on disk, stored once per SHA-256 (see ``projects.attachments``)."""
+    digest = models.CharField(max_length=64, primary_key=True)
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self) -> str:
+        return self.digest
+
+
+class Attachment(models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='attachments')
+    file = models.ForeignKey(StoredFile, on_delete=models.PROTECT, related_name='attachments')
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=127, default='application/octet-stream')
+    size = models.PositiveBigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class UploadSession(models.Model):
+    """An attachment upload in progress; ``received`` bytes are on disk so far."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='uploads')
+    name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=127, default='application/octet-stream')
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f'{self.name} ({self.received}/{self.size})'
@@ -0,0 +1,278 @@
+"""
+Project revision history.
+
+Every recorded write stores either a full snapshot of ``title``,
+``description`` and ``data`` or a delta against the previous revision, both
+compressed. A full snapshot is forced every PROJECT_REVISION_SNAPSHOT_EVERY
+revisions (or whenever a delta would not be much smaller than the last
+snapshot), so rebuilding any version replays a bounded number of deltas.
+Saves that change nothing are not recorded. Only the newest
+PROJECT_REVISION_KEEP revisions are kept (0 = unlimited); the oldest kept one
+is rewritten as a snapshot when older history is dropped.
+"""
+import json
+import os
+from difflib import SequenceMatcher
+
+from django.db import router, transaction
+
+from core import fastjson
+
+from . import blobs
+
+SNAPSHOT_EVERY = max(1, int(os.getenv('PROJECT_REVISION_SNAPSHOT_EVERY', '20')))
+KEEP = int(os.getenv('PROJECT_REVISION_KEEP', '100'))
+# Longest changed span of a description that is diffed character by character
+DIFF_MAX_CHARS = int(os.getenv('PROJECT_REVISION_DIFF_MAX_CHARS', '1000'))
+FIELDS = ('title', 'description', 'data')
+
+_MISSING = object()
+
+
+# -- deltas -----------------------------------------------------------------
+
+def _diff_ops(old: str, new: str) -> list:
+    ops = []
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            ops.append(i2 - i1)
+            continue
+        if i2 > i1:
+            ops.append(i1 - i2)
+        if j2 > j1:
+            ops.append(new[j1:j2])
+    return ops
+
+
+def text_delta(old: str, new: str) -> list:
+    """Ops turning ``old`` into ``new``: ``n`` copies, ``-n`` skips, str inserts.
+
+    The common prefix and suffix are found in linear time. SequenceMatcher is
+    quadratic, so only a changed span of at most DIFF_MAX_CHARS is diffed
+    further; a larger one is replaced wholesale.
+    """
+    prefix = len(os.path.commonprefix([old, new]))
+    suffix = len(os.path.commonprefix([old[prefix:][::-1], new[prefix:][::-1]]))
+    old_mid = old[prefix:len(old) - suffix]
+    new_mid = new[prefix:len(new) - suffix]
+    ops = [prefix] if prefix else []
+    if old_mid and new_mid and max(len(old_mid), len(new_mid)) <= DIFF_MAX_CHARS:
+        ops += _diff_ops(old_mid, new_mid)
+    else:
+        if old_mid:
+            ops.append(-len(old_mid))
+        if new_mid:
+            ops.append(new_mid)
+    if suffix:
+        ops.append(suffix)
+    return ops
+
+
+def apply_text_delta(old: str, ops: list) -> str:
+    out = []
+    pos = 0
+    for op in ops:
+        if isinstance(op, str):
+            out.append(op)
+        elif op >= 0:
+            out.append(old[pos:pos + op])
+            pos += op
+        else:
+            pos -= op
+    return ''.join(out)
+
+
+def json_delta(old, new):
+    """Recursive delta for dicts; anything else is replaced wholesale."""
+    if not (isinstance(old, dict) and isinstance(new, dict)):
+        return {'=': new}
+    delta = {}
+    removed = [k for k in old if k not in new]
+    if removed:
+        delta['-'] = removed
+    changed = {}
+    nested = {}
+    for key, value in new.items():
+        previous = old.get(key, _MISSING)
+        if previous is _MISSING or type(previous) is not type(value):
+            changed[key] = value
+        elif previous != value:
+            if isinstance(value, dict):
+                nested[key] = json_delta(previous, value)
+            else:
+                changed[key] = value
+    if changed:
+        delta['+'] = changed
+    if nested:
+        delta['~'] = nested
+    return delta
+
+
+def apply_json_delta(old, delta):
+    if '=' in delta:
+        return delta['=']
+    result = dict(old)
+    for key in delta.get('-', ()):
+        result.pop(key, None)
+    result.update(delta.get('+', {}))
+    for key, sub in delta.get('~', {}).items():
+        result[key] = apply_json_delta(result[key], sub)
+    return result
+
+
+def make_delta(old: dict, new: dict) -> dict:
+    delta = {}
+    if old['title'] != new['title']:
+        delta['title'] = new['title']
+    if old['description'] != new['description']:
+        ops = text_delta(old['description'], new['description'])
+        if len(json.dumps(ops)) >= len(new['description']):
+            ops = [-len(old['description']), new['description']]
+        delta['description'] = ops
+    if old['data'] != new['data']:
+        delta['data'] = json_delta(old['data'], new['data'])
+    return delta
+
+
+def apply_delta(state: dict, delta: dict) -> dict:
+    state = dict(state)
+    if 'title' in delta:
+        state['title'] = delta['title']
+    if 'description' in delta:
+        state['description'] = apply_text_delta(state['description'], delta['description'])
+    if 'data' in delta:
+        state['data'] = apply_json_delta(state['data'], delta['data'])
+    return state
+
+
+# -- storage ----------------------------------------------------------------
+
+def _encode(obj) -> tuple:
+    return blobs.compress(fastjson.dumps(obj))
+
+
+def _decode(revision):
+    return fastjson.loads(blobs.decompress(revision.codec, bytes(revision.payload)))
+
+
+def current_state(project) -> dict:
+    return {f: getattr(project, f) for f in FIELDS}
+
+
+def has_history(project) -> bool:
+    return project.revisions.using(_read_db(project)).exists()
+
+
+def _db(project) -> str:
+    # Not ``project._state.db``: that may be the read replica it was loaded from
+    return router.db_for_write(type(project), instance=project)
+
+
+def _read_db(project) -> str:
+    # Asking for the write database would pin the client to the primary
+    # (core.replicas); inside record()'s transaction this is the primary anyway
+    return router.db_for_read(type(project), instance=project)
+
+
+def reconstruct(project, number: int) -> dict | None:
+    """State of ``project`` as of revision ``number`` (None if not kept)."""
+    revisions = project.revisions.using(_read_db(project))
+    base = revisions.filter(number__lte=number, kind='full').order_by('-number').first()
+    if base is None:
+        return None
+    state = _decode(base)
+    for revision in revisions.filter(number__gt=base.number, number__lte=number).order_by('number'):
+        state = apply_delta(state, _decode(revision))
+    return state
+
+
+def record(project):
+    """Store a revision for the project's current (just saved) state.
+
+    Returns the new ProjectRevision, or None if nothing changed. Callers
+    about to edit a project with no history call this first as well, so the
+    pre-edit state is kept as revision 1.
+    """
+    from .models import Project, ProjectRevision
+
+    db = _db(project)
+    data_changed = project.data_changed()
+    with transaction.atomic(using=db):
+        # Concurrent saves of one project take turns picking the next number
+        Project.objects.using(db).select_for_update().filter(pk=project.pk).exists()
+        last = project.revisions.using(db).order_by('-number').first()
+        number = last.number + 1 if last else 1
+        state = {'title': project.title, 'description': project.description}
+        if last is None:
+            kind = 'full'
+            state['data'] = project.data
+        else:
+            previous = reconstruct(project, last.number)
+            # Untouched data is not loaded (it may be sitting in a blob)
+            state['data'] = project.data if data_changed else previous['data']
+            delta = make_delta(previous, state)
+            if not delta:
+                return None
+            base = project.revisions.using(db).filter(kind='full').order_by('-number').values('number', 'size')[0]
+            kind = 'delta' if number - base['number'] < SNAPSHOT_EVERY else 'full'
+        if kind == 'delta':
+            codec, payload = _encode(delta)
+            # The last snapshot's size stands in for the current state's
+            if len(payload) * 2 > base['size']:
+                kind = 'full'
+        if kind == 'full':
+            codec, payload = _encode(state)
+        revision = ProjectRevision.objects.using(db).create(
+            project=project, number=number, kind=kind, codec=codec, payload=payload, size=len(payload),
+        )
+        compact(project, keep=KEEP)
+    return revision
+
+
+def record_created(projects, using: str) -> list:
+    """Revision 1 for each of ``projects``, bulk-created together with them.
+
+    The counterpart of ``record`` for rows that never went through it (see
+    ``archive.import_stream``).
+    """
+    from .models import ProjectRevision
+
+    created = []
+    for project in projects:
+        codec, payload = _encode(current_state(project))
+        created.append(ProjectRevision(project=project, number=1, kind='full', codec=codec, payload=payload,
+                                       size=len(payload)))
+    return ProjectRevision.objects.using(using).bulk_create(created)
+
+
+def compact(project, keep: int = KEEP) -> int:
+    """Drop revisions beyond the newest ``keep``; returns how many were removed."""
+    if keep <= 0:
+        return 0
+    db = _db(project)
+    revisions = project.revisions.using(db)
+    newest = revisions.order_by('-number').values_list('number', flat=True).first()
+    if newest is None or newest <= keep:
+        return 0
+    cutoff = newest - keep + 1
+    oldest_kept = revisions.filter(number=cutoff).first()
+    if oldest_kept is not None and oldest_kept.kind != 'full':
+        state = reconstruct(project, cutoff)
+        oldest_kept.codec, oldest_kept.payload = _encode(state)
+        oldest_kept.kind = 'full'
+        oldest_kept.size = len(oldest_kept.payload)
+        oldest_kept.save(update_fields=['kind', 'codec', 'payload', 'size'])
+    deleted, _ = revisions.filter(number__lt=cutoff).delete()
+    return deleted
+
+
+def restore(project, number: int):
+    """Make revision ``number`` current again (recorded as a new revision)."""
+    state = reconstruct(project, number)
+    if state is None:
+        return None
+    for field, value in state.items():
+        setattr(project, field, value)
+    with transaction.atomic(using=_db(project)):
+        project.save()
+        return record(project)
@@ -0,0 +1,219 @@
+"""
+Full-text search over projects.
+
+SQLite uses an FTS5 virtual table keyed by project id; PostgreSQL uses a side
+table with a GIN-indexed tsvector. Both index the title, description and the
+string leaves of ``Project.data`` and are kept in sync from the model's
+save/delete signals (see ``projects.signals``). Other backends fall back to
+``icontains`` filtering.
+"""
+import re
+
+from django.db import connections, router
+
+
+FTS_TABLE = 'projects_project_fts'
+PG_TABLE = 'projects_project_search'
+MAX_BODY_CHARS = 100_000
+MAX_PAGE_SIZE = 100
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def data_text(value, limit: int = MAX_BODY_CHARS) -> str:
+    """Concatenate the string leaves of a JSON value, up to ``limit`` chars."""
+    parts = []
+    size = 0
+    stack = [value]
+    while stack and size < limit:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            size += len(node) + 1
+        elif isinstance(node, dict):
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return ' '.join(parts)[:limit]
+
+
+def _vendor(using: str) -> str:
+    return connections[using].vendor
+
+
+# -- schema -----------------------------------------------------------------
+
+def create_index(schema_editor) -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+            "title, description, body, owner, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+            "project_id bigint PRIMARY KEY REFERENCES projects_project(id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "user_id bigint NOT NULL, document tsvector NOT NULL)"
+        )
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_doc_gin ON {PG_TABLE} USING gin (document)")
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_user ON {PG_TABLE} (user_id)")
+
+
+def drop_index(schema_editor) -> None:
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    elif vendor == 'postgresql':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {PG_TABLE}')
+
+
+# -- maintenance ------------------------------------------------------------
+
+def _rows(projects):
+    for p in projects:
+        yield p.pk, p.user_id, p.title or '', p.description or '', data_text(p.data)
+
+
+def index_projects(projects, using: str = 'default') -> None:
+    vendor = _vendor(using)
+    rows = list(_rows(projects))
+    if not rows:
+        return
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(r[0],) for r in rows])
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description, body, owner) VALUES (%s, %s, %s, %s, %s)',
+                [(pk, title, desc, body, f'u{user_id}') for pk, user_id, title, desc, body in rows],
+            )
+        elif vendor == 'postgresql':
+            cursor.executemany(
+                f"INSERT INTO {PG_TABLE} (project_id, user_id, document) VALUES (%s, %s, "
+                "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B') "
+                "|| setweight(to_tsvector('simple', %s), 'C')) "
+                "ON CONFLICT (project_id) DO UPDATE SET user_id = EXCLUDED.user_id, document = EXCLUDED.document",
+                [(pk, user_id, title, desc, body) for pk, user_id, title, desc, body in rows],
+            )
+
+
+def unindex_project(pk: int, using: str = 'default') -> None:
+    vendor = _vendor(using)
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+        elif vendor == 'postgresql':
+            cursor.execute(f'DELETE FROM {PG_TABLE} WHERE project_id = %s', [pk])
+
+
+def rebuild(using: str = 'default', batch_size: int = 1000, model=None) -> int:
+    """Reindex every project. Migrations pass their historical ``model``."""
+    if model is None:
+        from .models import Project as model
+
+    vendor = _vendor(using)
+    if vendor not in ('sqlite', 'postgresql'):
+        return 0
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE if vendor == "sqlite" else PG_TABLE}')
+    count = 0
+    batch = []
+    for project in model.objects.using(using).iterator(chunk_size=batch_size):
+        batch.append(project)
+        if len(batch) >= batch_size:
+            index_projects(batch, using)
+            count += len(batch)
+            batch = []
+    index_projects(batch, using)
+    count += len(batch)
+    if vendor == 'sqlite':
+        with connections[using].cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+# -- querying ---------------------------------------------------------------
+
+def tokens(query: str) -> list:
+    return _TOKEN_RE.findall(query or '')
+
+
+def search(user, query: str, page: int = 1, page_size: int = 20, using: str | None = None):
+    """Return ``(hits, has_next)`` where hits are ``(project_id, rank, snippet)``.
+
+    Terms are ANDed; the last term is prefix-matched so results update as
+    the user types.
+    """
+    terms = tokens(query)
+    if not terms:
+        return [], False
+    page = max(1, page)
+    page_size = max(1, min(MAX_PAGE_SIZE, page_size))
+    offset = (page - 1) * page_size
+    if using is None:
+        from .models import Project
+
+        using = router.db_for_read(Project, user=user)
+    vendor = _vendor(using)
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            match = ' '.join(f'"{t}"' for t in terms) + '*'
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, 10.0, 4.0, 1.0, 0.0), "
+                f"snippet({FTS_TABLE}, -1, '[', ']', '…', 12) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY 2 LIMIT %s OFFSET %s",
+                [f'owner:u{user.pk} AND ({{title description body}} : {match})', page_size + 1, offset],
+            )
+            rows = [(pk, -rank, snippet) for pk, rank, snippet in cursor.fetchall()]
+        elif vendor == 'postgresql':
+            tsquery = ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+            cursor.execute(
+                f"SELECT project_id, ts_rank(document, q), '' FROM {PG_TABLE}, to_tsquery('simple', %s) q "
+                "WHERE user_id = %s AND document @@ q ORDER BY 2 DESC LIMIT %s OFFSET %s",
+                [tsquery, user.pk, page_size + 1, offset],
+            )
+            rows = cursor.fetchall()
+        else:
+            return _fallback_search(user, terms, offset, page_size, using)
+    return rows[:page_size], len(rows) > page_size
+
+
+def match_ids(query: str, limit: int = 1000, using: str = 'default') -> list | None:
+    """Ids of the best ``limit`` matches across all users (for staff tooling).
+
+    None when the backend has no full-text index, so callers can fall back to
+    their own filtering.
+    """
+    terms = tokens(query)
+    if not terms:
+        return []
+    vendor = _vendor(using)
+    with connections[using].cursor() as cursor:
+        if vendor == 'sqlite':
+            match = ' '.join(f'"{t}"' for t in terms) + '*'
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s",
+                [f'{{title description body}} : {match}', limit],
+            )
+        elif vendor == 'postgresql':
+            tsquery = ' & '.join(terms[:-1] + [terms[-1] + ':*'])
+            cursor.execute(
+                f"SELECT project_id FROM {PG_TABLE}, to_tsquery('simple', %s) q "
+                "WHERE document @@ q ORDER BY ts_rank(document, q) DESC LIMIT %s",
+                [tsquery, limit],
+            )
+        else:
+            return None
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _fallback_search(user, terms, offset, page_size, using):
+    from django.db.models import Q
+    from .models import Project
+
+    qs = Project.objects.using(using).filter(user=user)
+    for term in terms:
+        qs = qs.filter(Q(title__icontains=term) | Q(description__icontains=term))
+    ids = list(qs.order_by('-updated_at').values_list('pk', flat=True)[offset:offset + page_size + 1])
+    return [(pk, 0.0, '') for pk in ids[:page_size]], len(ids) > page_size
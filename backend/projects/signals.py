@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core import sharding
+from core.events import publish_on_commit
+
+from . import attachments, blobs, search
+from .models import Attachment, Project, UploadSession
+
+SEARCHABLE_FIELDS = {'title', 'description', 'data'}
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def delete_user_projects(sender, instance, **kwargs):
+    # Stands in for the FK cascade, which cannot reach across shards
+    if not sharding.enabled():
+        return
+    Project.objects.for_user(instance).delete()
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance: Project, using, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and not SEARCHABLE_FIELDS & set(update_fields)):
+        return
+    search.index_projects([instance], using)
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance: Project, using, **kwargs):
+    search.unindex_project(instance.pk, using)
+
+
+@receiver(post_delete, sender=Project)
+def release_data_blob(sender, instance: Project, using, **kwargs):
+    digest = instance.data_blob_id
+    if digest:
+        blobs.release(digest, using)
+
+
+@receiver(post_save, sender=Project)
+def announce_project_saved(sender, instance: Project, using, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    publish_on_commit(instance.user_id, 'project', {
+        'action': 'created' if created else 'updated',
+        'id': instance.pk,
+        'title': instance.title,
+        'updated_at': instance.updated_at.isoformat(),
+    }, using=using)
+
+
+@receiver(post_delete, sender=Project)
+def announce_project_deleted(sender, instance: Project, using, **kwargs):
+    publish_on_commit(instance.user_id, 'project', {'action': 'deleted', 'id': instance.pk}, using=using)
+
+
+@receiver(post_delete, sender=Attachment)
+def release_attachment_file(sender, instance: Attachment, using, **kwargs):
+    digest = instance.file_id
+    transaction.on_commit(lambda: attachments.release_file(digest, using), using=using)
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload_part(sender, instance: UploadSession, using, **kwargs):
+    path = attachments.part_path(instance)
+    transaction.on_commit(lambda: path.unlink(missing_ok=True), using=using)
@@ -0,0 +1,114 @@
+import gzip
+import io
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from core import ratelimit
+from preferences.models import UserPreference
+from projects import archive, revisions
+from projects.models import Project
+
+
+class IterLinesTests(SimpleTestCase):
+    def lines(self, data, read_bytes=7):
+        with mock.patch.object(archive, 'READ_BYTES', read_bytes):
+            return list(archive.iter_lines(io.BytesIO(data)))
+
+    def test_split_across_chunks(self):
+        data = b'a\nbb\n\nccccccccccccccccccccccc\nd'
+        expected = [b'a', b'bb', b'', b'c' * 23, b'd']
+        self.assertEqual(self.lines(data), expected)
+        self.assertEqual(self.lines(gzip.compress(data)), expected)
+        self.assertEqual(self.lines(data + b'\n'), expected)
+
+    def test_long_line(self):
+        line = b'x' * 100000
+        self.assertEqual(self.lines(line + b'\ny', read_bytes=1000), [line, b'y'])
+        with mock.patch.object(archive, 'MAX_LINE_BYTES', 1000):
+            with self.assertRaises(archive.ArchiveError):
+                self.lines(line, read_bytes=100)
+
+
+class RoundTripTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(ratelimit, 'buckets', ratelimit.TokenBuckets()))
+        self.alice = User.objects.create_user('alice', password='p')
+        self.bob = User.objects.create_user('bob', password='p')
+        UserPreference.objects.create(user=self.alice, theme='dark', window_bounds={'w': 800})
+        for n in range(5):
+            Project.objects.create(user=self.alice, title=f'p{n}', description='d' * n,
+                                   data={'n': n, 'tags': ['x'] * n})
+
+    def export(self, user):
+        return b''.join(archive.export_stream(user))
+
+    def fields(self, user):
+        return list(Project.objects.filter(user=user).order_by('title').values('title', 'description', 'data'))
+
+    def test_round_trip(self):
+        body = self.export(self.alice)
+        with mock.patch.object(archive, 'BATCH_SIZE', 2):
+            result = archive.import_stream(self.bob, io.BytesIO(body))
+        self.assertEqual(result, {'imported': 5})
+        self.assertEqual(self.fields(self.bob), self.fields(self.alice))
+        prefs = UserPreference.objects.get(user=self.bob)
+        self.assertEqual((prefs.theme, prefs.window_bounds), ('dark', {'w': 800}))
+        for project in Project.objects.filter(user=self.bob):
+            self.assertEqual(revisions.reconstruct(project, 1), revisions.current_state(project))
+
+    def test_plain_ndjson(self):
+        body = gzip.decompress(self.export(self.alice))
+        self.assertEqual(archive.import_stream(self.bob, io.BytesIO(body)), {'imported': 5})
+
+    def test_rejects(self):
+        for body in (b'', b'{"type": "project", "title": "x"}\n', b'not json\n'):
+            with self.assertRaises(archive.ArchiveError):
+                archive.import_stream(self.bob, io.BytesIO(body))
+        self.assertFalse(Project.objects.filter(user=self.bob).exists())
+
+    def assertRejected(self, body, message, imported=0):
+        with self.assertRaisesMessage(archive.ArchiveError, message) as cm:
+            archive.import_stream(self.bob, io.BytesIO(body))
+        self.assertEqual(cm.exception.imported, imported)
+
+    def test_corrupt_gzip(self):
+        body = bytearray(self.export(self.alice))
+        body[20:40] = b'\xff' * 20
+        self.assertRejected(bytes(body), 'corrupt gzip stream')
+        self.client.force_login(self.bob)
+        response = self.client.post('/api/projects/import/', bytes(body), content_type='application/gzip')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'corrupt gzip stream', 'imported': 0})
+
+    def test_truncated_gzip(self):
+        body = self.export(self.alice)
+        with mock.patch.object(archive, 'BATCH_SIZE', 2):
+            self.assertRejected(body[:-12], 'truncated gzip stream', imported=4)
+
+    def test_invalid_version(self):
+        for version in ('"2"', 'true', '1.5', 'null'):
+            body = f'{{"type": "header", "format": "projects-export", "version": {version}}}\n'.encode()
+            self.assertRejected(body, 'invalid archive version')
+
+    def test_api(self):
+        self.client.force_login(self.alice)
+        response = self.client.get('/api/projects/export/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        self.client.force_login(self.bob)
+        response = self.client.post('/api/projects/import/', b''.join(response.streaming_content),
+                                    content_type='application/gzip')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(self.fields(self.bob), self.fields(self.alice))
+
+    async def test_asgi_export_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.alice)
+        response = await self.async_client.get('/api/projects/export/')
+        self.assertEqual(response.status_code, 200)
+        # A sync iterator would be read whole before the first chunk is sent
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        lines = gzip.decompress(body).splitlines()
+        self.assertEqual(len(lines), 7)
@@ -0,0 +1,123 @@
+import hashlib
+import io
+import tempfile
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from projects import attachments
+from projects.models import Attachment, Project, StoredFile, UploadSession
+
+
+class ParseRangeTests(SimpleTestCase):
+    def test_ranges(self):
+        self.assertEqual(attachments.parse_range('bytes=0-9', 100), (0, 10))
+        self.assertEqual(attachments.parse_range('bytes=90-', 100), (90, 100))
+        self.assertEqual(attachments.parse_range('bytes=90-500', 100), (90, 100))
+        self.assertEqual(attachments.parse_range('bytes=-10', 100), (90, 100))
+        self.assertEqual(attachments.parse_range('bytes=-500', 100), (0, 100))
+
+    def test_ignored(self):
+        for header in ('bytes=-', 'bytes=0-1,5-6', 'items=0-1', 'bytes=a-b', ''):
+            self.assertIsNone(attachments.parse_range(header, 100))
+
+    def test_unsatisfiable(self):
+        for header in ('bytes=100-', 'bytes=5-4', 'bytes=-0'):
+            with self.assertRaises(attachments.UploadError) as cm:
+                attachments.parse_range(header, 100)
+            self.assertEqual(cm.exception.status, 416)
+
+    def test_content_range(self):
+        self.assertEqual(attachments.parse_content_range('bytes 0-9/100', 100), (0, 10))
+        self.assertEqual(attachments.parse_content_range('bytes 90-99/*', 100), (90, 100))
+        self.assertIsNone(attachments.parse_content_range('bytes 0-9/99', 100))
+        self.assertIsNone(attachments.parse_content_range('bytes 95-100/100', 100))
+
+
+class DownloadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.content = bytes(range(256)) * (attachments.COPY_BUFFER // 128 + 3)
+        digest = hashlib.sha256(self.content).hexdigest()
+        path = attachments.stored_path(digest)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(self.content)
+        self.user = User.objects.create_user('alice', password='p')
+        project = Project.objects.create(user=self.user, title='p', data={})
+        stored = StoredFile.objects.create(digest=digest, size=len(self.content))
+        self.attachment = Attachment.objects.create(project=project, file=stored, name='a.bin', size=len(self.content))
+        self.url = f'/api/projects/{project.pk}/attachments/{self.attachment.pk}/'
+
+    def check(self, client, streaming):
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(b''.join(streaming(response)), self.content)
+        response = client.get(self.url, headers={'Range': 'bytes=10-2000009'})
+        self.assertEqual(response.status_code, 206)
+        end = min(2000010, len(self.content))
+        self.assertEqual(response['Content-Range'], f'bytes 10-{end - 1}/{len(self.content)}')
+        self.assertEqual(b''.join(streaming(response)), self.content[10:end])
+        return response
+
+    def test_wsgi(self):
+        self.client.force_login(self.user)
+        response = self.check(self.client, lambda r: r.streaming_content)
+        self.assertFalse(response.is_async)
+        response = self.client.get(self.url, headers={'Range': 'bytes=999999999-'})
+        self.assertEqual(response.status_code, 416)
+
+    async def test_asgi_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.user)
+        for headers, expected in (({}, self.content), ({'Range': 'bytes=10-2000009'}, self.content[10:2000010])):
+            response = await self.async_client.get(self.url, headers=headers)
+            # A sync iterator would be read whole before the first chunk is sent
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(b''.join(chunks), expected)
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = User.objects.create_user('alice', password='p')
+        self.project = Project.objects.create(user=self.user, title='p', data={})
+        self.session = self.project.uploads.create(name='a.bin', size=6)
+
+    def stale_copy(self):
+        return UploadSession.objects.get(pk=self.session.pk)
+
+    def test_stale_offset_is_rejected(self):
+        stale = self.stale_copy()
+        self.assertEqual(attachments.write_chunk(self.session, io.BytesIO(b'abc'), 0, 3), 3)
+        with self.assertRaises(attachments.UploadError) as cm:
+            attachments.write_chunk(stale, io.BytesIO(b'xyz'), 0, 3)
+        self.assertEqual(cm.exception.status, 409)
+        self.assertEqual(stale.received, 3)
+        self.assertEqual(attachments.part_path(self.session).read_bytes(), b'abc')
+
+    def test_retried_last_chunk(self):
+        stale = self.stale_copy()
+        attachments.write_chunk(self.session, io.BytesIO(b'abcdef'), 0, 6)
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment = attachments.finalize(self.session)
+        self.assertEqual(attachment.size, 6)
+        for retry in (lambda: attachments.write_chunk(stale, io.BytesIO(b'abcdef'), 0, 6),
+                      lambda: attachments.finalize(stale)):
+            with self.assertRaises(attachments.UploadError) as cm:
+                retry()
+            self.assertEqual(cm.exception.status, 409)
+        self.assertEqual(Attachment.objects.count(), 1)
+
+    def test_finalize_without_part_file(self):
+        # e.g. another request finalized it while this one was hashing
+        self.session.received = 6
+        with self.assertRaises(attachments.UploadError) as cm:
+            attachments.finalize(self.session)
+        self.assertEqual(cm.exception.status, 409)
+        self.assertFalse(Attachment.objects.exists())
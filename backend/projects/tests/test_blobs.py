@@ -0,0 +1,53 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from projects import blobs
+from projects.models import DataBlob, Project
+
+
+class BlobReleaseTests(TestCase):
+    def setUp(self):
+        self.enterContext(mock.patch.object(blobs, 'THRESHOLD', 100))
+        self.user = User.objects.create_user('alice', password='p')
+
+    def big(self, n):
+        return {'n': n, 'text': 'x' * 500}
+
+    def test_edits_keep_one_blob(self):
+        project = Project.objects.create(user=self.user, title='p', data=self.big(0))
+        self.assertEqual(DataBlob.objects.count(), 1)
+        for n in (1, 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                project = Project.objects.get(pk=project.pk)
+                project.data = self.big(n)
+                project.save()
+            self.assertEqual(DataBlob.objects.count(), 1)
+        self.assertEqual(Project.objects.get(pk=project.pk).data, self.big(2))
+
+    def test_shrinking_releases_the_blob(self):
+        project = Project.objects.create(user=self.user, title='p', data=self.big(0))
+        with self.captureOnCommitCallbacks(execute=True):
+            project.data = {'n': 1}
+            project.save()
+        self.assertFalse(DataBlob.objects.exists())
+
+    def test_shared_blob_is_kept(self):
+        first = Project.objects.create(user=self.user, title='a', data=self.big(0))
+        Project.objects.create(user=self.user, title='b', data=self.big(0))
+        with self.captureOnCommitCallbacks(execute=True):
+            first.data = self.big(1)
+            first.save()
+        self.assertEqual(DataBlob.objects.count(), 2)
+        first.delete()
+        self.assertEqual(DataBlob.objects.count(), 1)
+
+    def test_unchanged_save_keeps_the_blob(self):
+        project = Project.objects.create(user=self.user, title='p', data=self.big(0))
+        with self.captureOnCommitCallbacks(execute=True):
+            project = Project.objects.get(pk=project.pk)
+            project.title = 'renamed'
+            project.save()
+        self.assertEqual(Project.objects.get(pk=project.pk).data, self.big(0))
+        self.assertEqual(DataBlob.objects.count(), 1)
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+
+from projects import blobs, datafilter
+from projects.models import Project
+
+
+class ParseTests(SimpleTestCase):
+    def parse(self, query):
+        return [(c.keys, c.lookup, c.value) for c in datafilter.conditions(QueryDict(query))]
+
+    def test_conditions(self):
+        self.assertEqual(self.parse('data.status=active&other=1'), [(('status',), 'exact', 'active')])
+        self.assertEqual(self.parse('data.a.0.b__gte=5'), [(('a', '0', 'b'), 'gte', 5)])
+        self.assertEqual(self.parse('data.a__in=x,"1",2'), [(('a',), 'in', ['x', '1', 2])])
+        self.assertEqual(self.parse('data.a=true&data.b=null'), [(('a',), 'exact', True), (('b',), 'exact', None)])
+        self.assertEqual(self.parse('data.a__isnull=0'), [(('a',), 'isnull', False)])
+
+    def test_rejects(self):
+        for query in ['data.a b=1', "data.a'=1", 'data.=1', 'data.a__regex=x', 'data.a__gt=null',
+                      'data.a={"b":1}', 'data.a__isnull=maybe', 'data.' + '.'.join('a' * 9) + '=1',
+                      '&'.join(f'data.k{n}=1' for n in range(datafilter.MAX_FILTERS + 1))]:
+            with self.subTest(query=query), self.assertRaises(datafilter.FilterError):
+                datafilter.conditions(QueryDict(query))
+
+
+class FilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='p')
+        self.client.force_login(self.user)
+        docs = {
+            'p0': {'status': 'active', 'tags': ['x', 'y'], 'size': 5, 'done': True, 'owner': {'name': 'Ann'}},
+            'p1': {'status': 'archived', 'tags': ['y'], 'size': 50, 'done': False, 'owner': {'name': 'Bob'}},
+            'p2': {'status': 'active', 'tags': [], 'size': '7'},
+            'p3': {'other': 1},
+        }
+        for title, data in docs.items():
+            Project.objects.create(user=self.user, title=title, data=data)
+        Project.objects.create(user=User.objects.create_user('bob'), title='theirs', data={'status': 'active'})
+
+    def titles(self, query):
+        response = self.client.get('/api/projects/?' + query)
+        self.assertEqual(response.status_code, 200, response.content)
+        return sorted(p['title'] for p in response.json())
+
+    def test_lookups(self):
+        cases = {
+            'data.status=active': ['p0', 'p2'],
+            'data.status=active&data.tags__contains=x': ['p0'],
+            'data.size__gt=6': ['p1'],
+            'data.size__gte="5"': ['p2'],
+            'data.done=true': ['p0'],
+            'data.done=false': ['p1'],
+            'data.owner.name=Bob': ['p1'],
+            'data.owner__isnull=true': ['p2', 'p3'],
+            'data.status__in=active,archived': ['p0', 'p1', 'p2'],
+            'data.status=null': ['p3'],
+        }
+        for query, expected in cases.items():
+            with self.subTest(query=query):
+                self.assertEqual(self.titles(query), expected)
+
+    def test_invalid_filter_is_400(self):
+        self.assertEqual(self.client.get('/api/projects/?data.status__regex=x').status_code, 400)
+
+    def test_refused_while_offloading(self):
+        with mock.patch.object(blobs, 'THRESHOLD', 100):
+            response = self.client.get('/api/projects/?data.owner__isnull=true')
+        self.assertEqual(response.status_code, 400)
+
+    def test_refused_with_offloaded_projects(self):
+        project = Project.objects.get(title='p3')
+        with mock.patch.object(blobs, 'THRESHOLD', 1):
+            project.save()
+        self.assertIsNotNone(Project.objects.get(pk=project.pk).data_blob_id)
+        self.assertEqual(self.client.get('/api/projects/?data.owner__isnull=true').status_code, 400)
+        # Unfiltered lists are unaffected
+        self.assertEqual(self.client.get('/api/projects/').status_code, 200)
+
+    def test_indexed_path_is_an_index_lookup(self):
+        created, dropped = datafilter.sync_indexes('default', ['status'])
+        self.assertEqual((created, dropped), ([datafilter.index_name('status')], []))
+        qs = datafilter.filter_projects(Project.objects.filter(user=self.user).order_by('-updated_at'),
+                                        QueryDict('data.status=active'))
+        sql, params = qs.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn(datafilter.index_name('status'), plan)
+        self.assertEqual(datafilter.sync_indexes('default', []), ([], [datafilter.index_name('status')]))
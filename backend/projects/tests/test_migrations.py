@@ -0,0 +1,34 @@
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from core import fastjson
+
+
+class DataSummaryMigrationTests(TransactionTestCase):
+    before = [('projects', '0002_project_search')]
+    after = [('projects', '0003_project_data_summary')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_backfill(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Project = apps.get_model('projects', 'Project')
+        user = User.objects.create(username='alice')
+        data = {'name': 'x' * 500, 'tags': ['a', 'b']}
+        Project.objects.create(user=user, title='t', data=data)
+        apps = self.migrate(self.after)
+        project = apps.get_model('projects', 'Project').objects.get()
+        self.assertEqual(project.data_size, len(fastjson.dumps(data)))
+        self.assertEqual(project.data_keys, 2)
+        self.assertEqual(len(project.data_preview), 160)
+        self.assertTrue(project.data_preview.startswith('{"name":"xxx'))
+        self.assertTrue(project.data_preview.endswith('…'))
@@ -0,0 +1,128 @@
+import random
+import time
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase
+
+from projects import revisions
+from projects.models import Project
+
+
+class TextDeltaTests(SimpleTestCase):
+    def assertRoundTrip(self, old, new):
+        ops = revisions.text_delta(old, new)
+        self.assertEqual(revisions.apply_text_delta(old, ops), new)
+        return ops
+
+    def test_round_trip(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            old = ''.join(rng.choice('ab c\n') for _ in range(rng.randrange(60)))
+            if rng.random() < 0.5:
+                cut = rng.randrange(len(old) + 1)
+                new = old[:cut] + 'xyz' + old[rng.randrange(cut, len(old) + 1):]
+            else:
+                new = ''.join(rng.choice('ab c\n') for _ in range(rng.randrange(60)))
+            self.assertRoundTrip(old, new)
+
+    def test_edge_cases(self):
+        for old, new in [('', ''), ('', 'abc'), ('abc', ''), ('abc', 'abc'), ('aaa', 'aaaa'), ('abab', 'ab')]:
+            self.assertRoundTrip(old, new)
+
+    def test_large_edit_is_linear(self):
+        rng = random.Random(1)
+        old = ''.join(rng.choice('abcde \n') for _ in range(50_000))
+        new = old[:20_000] + 'inserted' + old[20_010:]
+        started = time.monotonic()
+        ops = self.assertRoundTrip(old, new)
+        self.assertLess(time.monotonic() - started, 1)
+        # Only the changed span is diffed; the rest is copied
+        self.assertEqual((ops[0], ops[-1]), (20_000, 29_990))
+
+    def test_large_rewrite_is_replaced(self):
+        rng = random.Random(2)
+        old = ''.join(rng.choice('abcde') for _ in range(50_000))
+        new = ''.join(rng.choice('abcde') for _ in range(50_000))
+        started = time.monotonic()
+        self.assertRoundTrip(old, new)
+        self.assertLess(time.monotonic() - started, 1)
+
+
+class DeltaTests(SimpleTestCase):
+    def test_round_trip(self):
+        old = {'title': 'a', 'description': 'hello world', 'data': {'a': 1, 'b': {'c': [1, 2]}, 'd': 'x'}}
+        new = {'title': 'b', 'description': 'hello there world', 'data': {'a': 1, 'b': {'c': [1, 3], 'e': None}}}
+        self.assertEqual(revisions.apply_delta(old, revisions.make_delta(old, new)), new)
+
+    def test_unchanged_is_empty(self):
+        state = {'title': 'a', 'description': 'b', 'data': {'c': 1}}
+        self.assertEqual(revisions.make_delta(state, dict(state)), {})
+
+
+class RecordTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('alice', password='p')
+
+    def test_reconstruct_every_revision(self):
+        project = Project.objects.create(user=self.user, title='t', description='x' * 5000, data={'n': 0})
+        revisions.record(project)
+        states = [revisions.current_state(project)]
+        for n in range(1, 30):
+            project.description = project.description[:n * 100] + f'edit {n}' + project.description[n * 100 + 3:]
+            project.data = {'n': n}
+            project.save()
+            revisions.record(project)
+            states.append(revisions.current_state(project))
+        for number, state in enumerate(states, start=1):
+            self.assertEqual(revisions.reconstruct(project, number), state)
+
+    def test_reads_do_not_route_as_writes(self):
+        # With read replicas, routing a read as a write pins the client to the primary
+        project = Project.objects.create(user=self.user, title='t', data={})
+        revisions.record(project)
+        self.client.force_login(self.user)
+        db_for_write = revisions.router.db_for_write
+
+        def no_project_writes(model, **hints):
+            self.assertNotEqual(model._meta.app_label, 'projects', 'read routed as a write')
+            return db_for_write(model, **hints)
+
+        with mock.patch.object(revisions.router, 'db_for_write', side_effect=no_project_writes):
+            self.assertTrue(revisions.has_history(project))
+            response = self.client.get(f'/api/projects/{project.pk}/revisions/1/')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['title'], 't')
+            self.assertEqual(self.client.get(f'/api/projects/{project.pk}/revisions/').status_code, 200)
+
+    def test_unchanged_save_is_not_recorded(self):
+        project = Project.objects.create(user=self.user, title='t', description='x' * 5000, data={'n': 0})
+        revisions.record(project)
+        for n in range(1, revisions.SNAPSHOT_EVERY):
+            project.data = {'n': n}
+            project.save()
+            revisions.record(project)
+        project.save()  # a snapshot would be due now
+        self.assertIsNone(revisions.record(project))
+        self.assertEqual(project.revisions.count(), revisions.SNAPSHOT_EVERY)
+
+    def test_snapshot_cadence(self):
+        project = Project.objects.create(user=self.user, title='t', description='x' * 5000, data={})
+        revisions.record(project)
+        kinds = []
+        with mock.patch.object(revisions, '_encode', wraps=revisions._encode) as encode:
+            for n in range(1, revisions.SNAPSHOT_EVERY + 1):
+                project.title = f't{n}'
+                project.save()
+                kinds.append(revisions.record(project).kind)
+        self.assertEqual(kinds, ['delta'] * (revisions.SNAPSHOT_EVERY - 1) + ['full'])
+        # Deltas are not re-encoded as full states just to compare sizes
+        self.assertEqual(encode.call_count, revisions.SNAPSHOT_EVERY)
+
+    def test_locks_the_project(self):
+        project = Project.objects.create(user=self.user, title='t', data={})
+        with mock.patch.object(QuerySet, 'select_for_update', autospec=True,
+                               side_effect=QuerySet.select_for_update) as select_for_update:
+            revisions.record(project)
+        self.assertIs(select_for_update.call_args.args[0].model, Project)
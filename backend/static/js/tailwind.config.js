@@ -1,5 +1,9 @@
 module.exports = {
-    content: ["../templates/**/*.html", "./**/*.js"],
+    // Resolved relative to this file so purging works from any cwd
+    content: {
+        relative: true,
+        files: ["../../templates/**/*.html", "./*.js"],
+    },
     theme: { extend: {} },
     plugins: [require("daisyui")],
     daisyui: {
@@ -69,8 +69,30 @@ function setupOnlineIndicator() {
     update();
 }
 
+// Server-pushed changes (see /api/events/), re-dispatched as window events:
+// `app:project` and `app:preferences`. EventSource reconnects on its own.
+function setupLiveEvents() {
+    const url = document.body.dataset.eventsUrl;
+    if (!url || !window.EventSource) return;
+    const source = new EventSource(url, { withCredentials: true });
+    source.addEventListener('preferences', (e) => {
+        const prefs = JSON.parse(e.data);
+        if (prefs.theme) {
+            localStorage.setItem(THEME_STORAGE_KEY, prefs.theme);
+            applyTheme(prefs.theme);
+            const select = document.getElementById('theme-select');
+            if (select) select.value = prefs.theme;
+        }
+        window.dispatchEvent(new CustomEvent('app:preferences', { detail: prefs }));
+    });
+    source.addEventListener('project', (e) => {
+        window.dispatchEvent(new CustomEvent('app:project', { detail: JSON.parse(e.data) }));
+    });
+}
+
 (function init() {
     setupThemeSelect();
     setupDrawers();
     setupOnlineIndicator();
+    setupLiveEvents();
 })();
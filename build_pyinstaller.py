@@ -29,11 +29,27 @@ def start_django():
         execute_from_command_line(['manage.py', 'migrate'])
         
         # Start server
-        execute_from_command_line(['manage.py', 'runserver', '127.0.0.1:8111'])
+        execute_from_command_line(['manage.py', 'runserver', '127.0.0.1:8111', '--insecure'])
     except Exception as e:
         print(f"Django error: {e}")
         input("Press Enter to exit...")
 
+def ensure_css_bundle():
+    """Build the stylesheet bundle if it is missing; exit if it cannot be built."""
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+    from core import assets
+
+    if assets.bundle_path() is not None:
+        return
+    if getattr(sys, 'frozen', False):
+        sys.exit("The CSS bundle is missing from this build; rebuild with build_pyinstaller_full.py")
+    print("Building CSS bundle ...")
+    try:
+        call_command('build_css')
+    except CommandError as e:
+        sys.exit(f"CSS build failed: {e}")
+
 def wait_for_django_and_start_electron():
     """Wait for Django to be ready, then start Electron."""
     import urllib.request
@@ -41,7 +57,7 @@ def wait_for_django_and_start_electron():
     
     for i in range(30):
         try:
-            with urllib.request.urlopen('http://127.0.0.1:8111/api/health/', timeout=2) as resp:
+            with urllib.request.urlopen('http://127.0.0.1:8111/api/health/ready/', timeout=2) as resp:
                 if resp.status == 200:
                     print("Django is ready! Starting Electron...")
                     start_electron()
@@ -144,6 +160,10 @@ app.on('activate', () => {
 if __name__ == "__main__":
     print("Starting Django + Electron Starter...")
     
+    import django
+    django.setup()
+    ensure_css_bundle()
+    
     # Start Django in background thread
     django_thread = threading.Thread(target=start_django, daemon=True)
     django_thread.start()
@@ -29,6 +29,12 @@ def ensure_django_ready():
     if code != 0:
         print("Migrations failed", file=sys.stderr)
         sys.exit(code)
+
+    print("Building CSS bundle ...")
+    code = run("python backend/manage.py build_css")
+    if code != 0:
+        print("CSS build failed (needs Node 20+ and npm)", file=sys.stderr)
+        sys.exit(code)
     
     return Path(sys.executable)
 
@@ -63,8 +69,61 @@ sys.path.insert(0, str(backend_path))
 # Set Django settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
+# Keep the backend resident between launches (manage.py serve_daemon) and attach to it
+BACKEND_DAEMON = os.environ.get('BACKEND_DAEMON') == '1'
+# Outside the bundle, which may be unpacked to a new temp dir on every launch
+DAEMON_FILE = Path(os.environ.setdefault(
+    'DAEMON_FILE',
+    str(Path(os.environ.get('LOCALAPPDATA') or Path.home()) / 'DjangoElectronStarter' / 'daemon.json'),
+))
+# Replace daemons started by an older build
+BUILD_TAG = str(int(os.path.getmtime(sys.executable if getattr(sys, 'frozen', False) else __file__)))
+
+def attach_daemon():
+    """Reuse a warm backend daemon from an earlier launch of this build."""
+    import json
+    import signal
+    import urllib.request
+    import urllib.error
+
+    try:
+        state = json.loads(DAEMON_FILE.read_text())
+    except (OSError, ValueError):
+        return False
+    if state.get('tag') != BUILD_TAG:
+        # The new daemon waits for this one to exit
+        try:
+            os.kill(state['pid'], signal.SIGTERM)
+        except (OSError, KeyError):
+            pass
+        return False
+    try:
+        with urllib.request.urlopen(state['url'] + '/api/health/ready/', timeout=1) as resp:
+            return resp.status == 200
+    except (urllib.error.URLError, urllib.error.HTTPError, TimeoutError, KeyError):
+        return False
+
+def start_daemon():
+    """Start the backend daemon detached, so it outlives this launcher."""
+    if getattr(sys, 'frozen', False):
+        cmd = [sys.executable, 'serve_daemon']
+    else:
+        cmd = [sys.executable, __file__, 'serve_daemon']
+    cmd += ['--migrate', '--port', '8111', '--tag', BUILD_TAG]
+    DAEMON_FILE.parent.mkdir(parents=True, exist_ok=True)
+    if os.name == 'nt':
+        flags = {'creationflags': subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        flags = {'start_new_session': True}
+    with open(DAEMON_FILE.with_name('daemon.log'), 'a') as log:
+        subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=log, stderr=log, **flags)
+
 def start_django():
     """Start Django in a separate thread."""
+    if BACKEND_DAEMON:
+        if not attach_daemon():
+            start_daemon()
+        return
     try:
         import django
         from django.core.management import execute_from_command_line
@@ -74,7 +133,7 @@ def start_django():
         execute_from_command_line(['manage.py', 'migrate'])
         
         # Start server
-        execute_from_command_line(['manage.py', 'runserver', '127.0.0.1:8111'])
+        execute_from_command_line(['manage.py', 'runserver', '127.0.0.1:8111', '--insecure'])
     except Exception as e:
         print(f"Django error: {e}")
         input("Press Enter to exit...")
@@ -86,7 +145,7 @@ def wait_for_django_and_start_electron():
     
     for i in range(30):
         try:
-            with urllib.request.urlopen('http://127.0.0.1:8111/api/health/', timeout=2) as resp:
+            with urllib.request.urlopen('http://127.0.0.1:8111/api/health/ready/', timeout=2) as resp:
                 if resp.status == 200:
                     print("Django is ready! Starting Electron...")
                     start_electron()
@@ -187,6 +246,12 @@ app.on('activate', () => {
         traceback.print_exc()
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ['serve_daemon']:
+        # Re-invoked by start_daemon()
+        from django.core.management import execute_from_command_line
+        execute_from_command_line(['manage.py', *sys.argv[1:]])
+        sys.exit()
+
     print("Starting Django + Electron Starter...")
     
     # Start Django in background thread
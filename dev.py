@@ -211,6 +211,20 @@ def ensure_dependencies(python_exe: Path, requirements_file: Path | None) -> Non
                 sys.exit(code)
 
 
+def ensure_dev_tools(python_exe: Path) -> None:
+    """Install watchfiles so runserver reloads on filesystem events instead of
+    polling every module (best-effort; runserver falls back to polling)."""
+    try:
+        subprocess.check_call([str(python_exe), "-c", "import watchfiles"], stderr=subprocess.DEVNULL)
+        return
+    except subprocess.CalledProcessError:
+        pass
+    print("Installing watchfiles for the event-driven reloader ...")
+    code = pip_install(python_exe, ["install", "--disable-pip-version-check", "--no-input", "watchfiles"])
+    if code != 0:
+        print("Warning: watchfiles not installed; runserver will poll for changes.", file=sys.stderr)
+
+
 def find_free_port(start_port: int = 8000, max_port: int = 8999) -> int:
     """Find a free TCP port by binding to 0.0.0.0 to catch conflicts across all interfaces."""
     for port in range(start_port, max_port + 1):
@@ -236,6 +250,15 @@ def get_local_ip() -> str:
         return "127.0.0.1"
 
 
+def build_css(python_exe: Path, manage_py: Path) -> None:
+    """Compile the purged Tailwind/DaisyUI bundle; pages have no styles without it."""
+    print("Building CSS bundle (manage.py build_css) ...")
+    code = run([str(python_exe), str(manage_py), "build_css"], cwd=manage_py.parent)
+    if code != 0:
+        print("CSS build failed (needs Node 20+ and npm)", file=sys.stderr)
+        sys.exit(code)
+
+
 def start_server_bg(python_exe: Path, manage_py: Path, port: int) -> subprocess.Popen:
     """Start Django dev server in the background and return the Popen handle."""
     if not manage_py.exists():
@@ -253,12 +276,12 @@ def start_server_bg(python_exe: Path, manage_py: Path, port: int) -> subprocess.
 
 
 def wait_for_health(port: int, timeout_seconds: int = 60) -> bool:
-    """Poll /api/health/ until ok or timeout."""
+    """Poll /api/health/ready/ until the backend can serve or timeout."""
     import time
     import urllib.request
     import urllib.error
 
-    url = f"http://127.0.0.1:{port}/api/health/"
+    url = f"http://127.0.0.1:{port}/api/health/ready/"
     start = time.time()
     while time.time() - start < timeout_seconds:
         try:
@@ -271,12 +294,56 @@ def wait_for_health(port: int, timeout_seconds: int = 60) -> bool:
     return False
 
 
-def start_electron(port: int) -> subprocess.Popen | None:
-    """Build Electron (TypeScript) and start the app pointing to the running Django server."""
+def start_tsc_watch(electron_dir: Path, env: dict, timeout_seconds: int = 120) -> subprocess.Popen | None:
+    """Run `tsc --watch` and return once its first (incremental) build is done.
+
+    Later edits recompile only what changed, and electronmon restarts the app
+    on the new output. Compiler output keeps streaming to the console.
+    """
+    import threading
+    import time
+
+    tsc = electron_dir / "node_modules" / "typescript" / "bin" / "tsc"
+    if not tsc.exists():
+        return None
+    print("Compiling Electron app (tsc --watch) ...")
+    try:
+        # node directly rather than `npm run watch`, so terminate() reaches tsc itself
+        proc = subprocess.Popen(["node", str(tsc), "-p", ".", "--watch", "--preserveWatchOutput"], cwd=electron_dir, env=env,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    except FileNotFoundError:
+        return None
+    ready = threading.Event()
+
+    def forward():
+        for line in proc.stdout:
+            print(f"[tsc] {line.rstrip()}")
+            if "Watching for file changes" in line:
+                ready.set()
+        ready.set()
+
+    threading.Thread(target=forward, daemon=True).start()
+    started = time.time()
+    while not ready.wait(0.2):
+        if time.time() - started > timeout_seconds:
+            print("tsc --watch did not finish its first build in time", file=sys.stderr)
+            break
+    if proc.poll() is not None:
+        print("tsc --watch exited", file=sys.stderr)
+        return None
+    return proc
+
+
+def start_electron(port: int) -> tuple[subprocess.Popen | None, subprocess.Popen | None]:
+    """Build Electron (TypeScript) and start the app pointing to the running Django server.
+
+    Returns the Electron process and, in watch mode (the default; DEV_TSC_WATCH=0
+    does a single `npm run build` instead), the `tsc --watch` process.
+    """
     electron_dir = PROJECT_ROOT / "electron"
     if not electron_dir.exists():
         print("Electron directory not found; skipping Electron startup.")
-        return None
+        return None, None
 
     env = os.environ.copy()
     env["ELECTRON_DJANGO_PORT"] = str(port)
@@ -291,24 +358,30 @@ def start_electron(port: int) -> subprocess.Popen | None:
         subprocess.check_call([npm_exe, "install", "--no-fund", "--no-audit"], cwd=electron_dir)
     except FileNotFoundError:
         print("Node.js npm not found on PATH. Install Node 20+ and ensure npm is available.", file=sys.stderr)
-        return None
+        return None, None
     except subprocess.CalledProcessError:
         print("Warning: npm install failed; continuing and attempting to build.")
 
-    # Build TS → dist (so Electron can run from compiled JS)
-    print("Building Electron app (TypeScript → dist) ...")
-    build_code = subprocess.call([npm_exe, "run", "build", "--silent"], cwd=electron_dir, env=env)
-    if build_code != 0:
-        print("Electron build failed", file=sys.stderr)
-        return None
-
-    # Start Electron using compiled main (package.json main points at dist/main.js)
+    # Build TS → dist (so Electron can run from compiled JS); incremental via tsBuildInfo
+    tsc_proc = None
+    if os.environ.get("DEV_TSC_WATCH", "1") != "0":
+        tsc_proc = start_tsc_watch(electron_dir, env)
+    if tsc_proc is None:
+        print("Building Electron app (TypeScript → dist) ...")
+        build_code = subprocess.call([npm_exe, "run", "build", "--silent"], cwd=electron_dir, env=env)
+        if build_code != 0:
+            print("Electron build failed", file=sys.stderr)
+            return None, None
+
+    # Start Electron using compiled main (package.json main points at dist/main.js);
+    # electronmon restarts it whenever tsc --watch rewrites dist/
     print("Starting Electron ...")
+    launcher = "electronmon" if tsc_proc is not None else "electron"
     try:
-        return subprocess.Popen([npx_exe, "electron", "."], cwd=electron_dir, env=env)
+        return subprocess.Popen([npx_exe, launcher, "."], cwd=electron_dir, env=env), tsc_proc
     except Exception as exc:
         print(f"Failed to start Electron: {exc}", file=sys.stderr)
-        return None
+        return None, tsc_proc
 
 
 def main() -> None:
@@ -338,6 +411,7 @@ def main() -> None:
 
     print("Ensuring dependencies are installed ...")
     ensure_dependencies(python_exe, manage_requirements if manage_requirements.exists() else None)
+    ensure_dev_tools(python_exe)
 
     # Fixed dev port (overridable via DEV_PORT)
     env_port = os.environ.get("DEV_PORT")
@@ -352,6 +426,8 @@ def main() -> None:
         print("Migrations failed; cannot start server", file=sys.stderr)
         sys.exit(migrate_code)
 
+    build_css(python_exe, manage_py)
+
     # Dynamically set dev-friendly env for hosts/CSRF so login sessions work reliably
     local_ip = get_local_ip()
     env = os.environ.copy()
@@ -370,7 +446,7 @@ def main() -> None:
     django_proc = start_server_bg(python_exe, manage_py, port)
 
     # Wait for health endpoint
-    print("Waiting for Django /api/health ...")
+    print("Waiting for Django /api/health/ready ...")
     if not wait_for_health(port, timeout_seconds=90):
         print("Django did not become ready in time.", file=sys.stderr)
         try:
@@ -380,7 +456,7 @@ def main() -> None:
         sys.exit(1)
 
     # Start Electron (desktop app)
-    electron_proc = start_electron(port)
+    electron_proc, tsc_proc = start_electron(port)
 
     # Attach to Electron process; if Electron is not available, fall back to server only
     try:
@@ -398,6 +474,11 @@ def main() -> None:
                 electron_proc.terminate()
         except Exception:
             pass
+        try:
+            if tsc_proc and tsc_proc.poll() is None:
+                tsc_proc.terminate()
+        except Exception:
+            pass
         try:
             if django_proc and django_proc.poll() is None:
                 django_proc.terminate()
@@ -1,5 +1,6 @@
 import { app, BrowserWindow, shell, ipcMain } from 'electron';
 import { spawn, ChildProcess } from 'child_process';
+import * as fs from 'fs';
 import * as path from 'path';
 import * as dotenv from 'dotenv';
 import treeKill from 'tree-kill';
@@ -8,7 +9,12 @@ import treeKill from 'tree-kill';
 dotenv.config();
 
 const DJANGO_PORT = process.env.ELECTRON_DJANGO_PORT || process.env.DEV_PORT || '8111';
-const DJANGO_URL = `http://127.0.0.1:${DJANGO_PORT}`;
+const BACKEND_PATH = path.join(__dirname, '../../backend');
+// Keep the backend resident between launches (manage.py serve_daemon) and attach to it
+const BACKEND_DAEMON = process.env.BACKEND_DAEMON === '1';
+const DAEMON_FILE = process.env.DAEMON_FILE || path.join(BACKEND_PATH, 'daemon.json');
+
+let djangoUrl = `http://127.0.0.1:${DJANGO_PORT}`;
 
 let mainWindow: BrowserWindow | null = null;
 let djangoProcess: ChildProcess | null = null;
@@ -53,7 +59,7 @@ async function waitForDjango(): Promise<void> {
 
     for (let i = 0; i < maxRetries; i++) {
         try {
-            const response = await fetch(`${DJANGO_URL}/api/health/`);
+            const response = await fetch(`${djangoUrl}/api/health/ready/`);
             if (response.ok) {
                 console.log('Django is ready');
                 return;
@@ -66,13 +72,89 @@ async function waitForDjango(): Promise<void> {
     throw new Error('Django failed to start within timeout');
 }
 
+interface DaemonState {
+    pid: number;
+    url: string;
+    tag: string;
+}
+
+function readDaemonState(): DaemonState | null {
+    try {
+        return JSON.parse(fs.readFileSync(DAEMON_FILE, 'utf8')) as DaemonState;
+    } catch {
+        return null;
+    }
+}
+
+async function isReady(url: string): Promise<boolean> {
+    try {
+        const response = await fetch(`${url}/api/health/ready/`, { signal: AbortSignal.timeout(1000) });
+        return response.ok;
+    } catch {
+        return false;
+    }
+}
+
+// Attach to a running backend daemon started by an earlier launch of this version
+async function attachDaemon(): Promise<boolean> {
+    const state = readDaemonState();
+    if (!state) return false;
+    if (state.tag !== app.getVersion()) {
+        // Started by another version of the app; the new daemon waits for it to exit
+        try {
+            process.kill(state.pid, 'SIGTERM');
+        } catch {
+            // Already gone
+        }
+        return false;
+    }
+    if (!(await isReady(state.url))) return false;
+    djangoUrl = state.url;
+    console.log(`Attached to backend daemon at ${djangoUrl} (pid ${state.pid})`);
+    return true;
+}
+
+function startDaemon(): void {
+    const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
+    const log = fs.openSync(path.join(path.dirname(DAEMON_FILE), 'daemon.log'), 'a');
+
+    console.log('Starting backend daemon...');
+    // Detached so it outlives this window; it exits by itself once idle
+    const daemon = spawn(pythonCmd, [
+        'manage.py', 'serve_daemon', '--port', DJANGO_PORT, '--tag', app.getVersion()
+    ], {
+        cwd: BACKEND_PATH,
+        detached: true,
+        stdio: ['ignore', log, log],
+        windowsHide: true
+    });
+    daemon.on('error', (error) => {
+        console.error('Failed to start backend daemon:', error);
+    });
+    daemon.unref();
+    fs.closeSync(log);
+}
+
+// The daemon writes DAEMON_FILE once it is warm
+async function waitForDaemon(): Promise<void> {
+    for (let i = 0; i < 60; i++) {
+        const state = readDaemonState();
+        if (state && state.tag === app.getVersion() && (await isReady(state.url))) {
+            djangoUrl = state.url;
+            return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 500));
+    }
+    throw new Error('Backend daemon failed to start within timeout');
+}
+
 function startDjango(): void {
-    const backendPath = path.join(__dirname, '../../backend');
     const pythonCmd = process.platform === 'win32' ? 'python' : 'python3';
 
     console.log('Starting Django...');
-    djangoProcess = spawn(pythonCmd, ['manage.py', 'runserver', `127.0.0.1:${DJANGO_PORT}`], {
-        cwd: backendPath,
+    // --insecure serves the local CSS/JS bundle even when DEBUG is off
+    djangoProcess = spawn(pythonCmd, ['manage.py', 'runserver', `127.0.0.1:${DJANGO_PORT}`, '--insecure'], {
+        cwd: BACKEND_PATH,
         stdio: 'pipe'
     });
 
@@ -103,7 +185,7 @@ async function saveWindowBounds(): Promise<void> {
             isMaximized
         };
 
-        const response = await fetch(`${DJANGO_URL}/api/preferences/`, {
+        const response = await fetch(`${djangoUrl}/api/preferences/`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -121,12 +203,17 @@ async function saveWindowBounds(): Promise<void> {
 }
 
 app.whenReady().then(async () => {
-    startDjango();
+    if (!BACKEND_DAEMON) {
+        startDjango();
+    } else if (!(await attachDaemon())) {
+        startDaemon();
+        await waitForDaemon();
+    }
     await waitForDjango();
     createWindow();
 
     if (mainWindow) {
-        mainWindow.loadURL(DJANGO_URL);
+        mainWindow.loadURL(djangoUrl);
     }
 });
 